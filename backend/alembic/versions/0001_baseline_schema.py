@@ -0,0 +1,147 @@
+"""Baseline schema: the five tables create_all built before migrations existed.
+
+Databases created by create_all should be stamped at this revision
+(`alembic stamp 0001`) and then upgraded to head. The webhook outbox (0002)
+and batched delivery settings (0003) came later and have their own revisions.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 02:33:49.150634
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('datasets',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('platform', sa.Enum('AMAZON', 'SHOPIFY', 'EBAY', 'WALMART', 'ETSY', name='platform'), nullable=False),
+    sa.Column('category', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('description', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('record_count', sa.Integer(), nullable=False),
+    sa.Column('size', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('is_premium', sa.Boolean(), nullable=False),
+    sa.Column('tags', sa.JSON(), nullable=True),
+    sa.Column('preview_data', sa.JSON(), nullable=True),
+    sa.Column('last_updated', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('datasets', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_datasets_category'), ['category'], unique=False)
+        batch_op.create_index(batch_op.f('ix_datasets_name'), ['name'], unique=False)
+
+    op.create_table('pricing_plans',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('plan_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('period', sa.Enum('MONTH', 'YEAR', name='periodtype'), nullable=False),
+    sa.Column('features', sa.JSON(), nullable=True),
+    sa.Column('api_calls', sa.Integer(), nullable=False),
+    sa.Column('datasets', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('support', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('is_highlighted', sa.Boolean(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('pricing_plans', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_pricing_plans_plan_id'), ['plan_id'], unique=True)
+
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('hashed_password', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('plan', sa.Enum('FREE', 'STARTER', 'PROFESSIONAL', 'ENTERPRISE', name='plantype'), nullable=False),
+    sa.Column('api_key', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('api_calls_used', sa.Integer(), nullable=False),
+    sa.Column('api_calls_reset_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_api_key'), ['api_key'], unique=True)
+        batch_op.create_index(batch_op.f('ix_users_email'), ['email'], unique=True)
+
+    op.create_table('scrape_requests',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('request_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('url', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('platform', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'PROCESSING', 'COMPLETED', 'FAILED', name='scrapestatus'), nullable=False),
+    sa.Column('fields', sa.JSON(), nullable=True),
+    sa.Column('webhook_url', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('result_data', sa.JSON(), nullable=True),
+    sa.Column('result_count', sa.Integer(), nullable=False),
+    sa.Column('error_message', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('scrape_requests', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_scrape_requests_request_id'), ['request_id'], unique=True)
+        batch_op.create_index(batch_op.f('ix_scrape_requests_user_id'), ['user_id'], unique=False)
+
+    op.create_table('webhooks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('webhook_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('url', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('events', sa.JSON(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('secret', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('webhooks', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_webhooks_user_id'), ['user_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_webhooks_webhook_id'), ['webhook_id'], unique=True)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('webhooks', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_webhooks_webhook_id'))
+        batch_op.drop_index(batch_op.f('ix_webhooks_user_id'))
+
+    op.drop_table('webhooks')
+    with op.batch_alter_table('scrape_requests', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_scrape_requests_user_id'))
+        batch_op.drop_index(batch_op.f('ix_scrape_requests_request_id'))
+
+    op.drop_table('scrape_requests')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_email'))
+        batch_op.drop_index(batch_op.f('ix_users_api_key'))
+
+    op.drop_table('users')
+    with op.batch_alter_table('pricing_plans', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pricing_plans_plan_id'))
+
+    op.drop_table('pricing_plans')
+    with op.batch_alter_table('datasets', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_datasets_name'))
+        batch_op.drop_index(batch_op.f('ix_datasets_category'))
+
+    op.drop_table('datasets')
+    # PostgreSQL keeps enum types around after their tables are dropped
+    for enum_name in ('scrapestatus', 'plantype', 'periodtype', 'platform'):
+        sa.Enum(name=enum_name).drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,47 @@
+"""Webhook batching settings.
+
+Opt-in batched delivery: webhooks.batch_* say whether an endpoint's events
+are coalesced into one signed request, and how many events, bytes and
+seconds of delay a batch may hold. Existing webhooks keep per-event
+delivery with the model's default limits.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 02:34:30.271905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = [
+    ('batch_enabled', sa.Boolean(), sa.false()),
+    ('batch_max_events', sa.Integer(), sa.text('100')),
+    ('batch_max_bytes', sa.Integer(), sa.text('262144')),
+    ('batch_max_delay_seconds', sa.Float(), sa.text('5.0')),
+]
+
+
+def upgrade() -> None:
+    # Server defaults fill existing rows, then go: the application sets these columns
+    with op.batch_alter_table('webhooks', schema=None) as batch_op:
+        for name, type_, default in COLUMNS:
+            batch_op.add_column(sa.Column(name, type_, nullable=False, server_default=default))
+    with op.batch_alter_table('webhooks', schema=None) as batch_op:
+        for name, type_, default in COLUMNS:
+            batch_op.alter_column(name, existing_type=type_, existing_nullable=False, server_default=None)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('webhooks', schema=None) as batch_op:
+        for name, type_, default in reversed(COLUMNS):
+            batch_op.drop_column(name)
@@ -0,0 +1,56 @@
+"""Performance indexes for the hot query paths.
+
+- scrape_requests (user_id, created_at): scrape history, newest first, and
+  per-user counts; replaces the single-column user_id index.
+- datasets (platform, category): marketplace list filters.
+- webhook_deliveries (status, next_attempt_at): the dispatcher's claim query;
+  replaces the single-column status and next_attempt_at indexes.
+
+On PostgreSQL the indexes are built CONCURRENTLY so large tables stay
+writable, and new indexes are in place before the ones they replace go.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 02:36:12.418263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NEW_INDEXES = [
+    ('ix_scrape_requests_user_id_created_at', 'scrape_requests', ['user_id', 'created_at']),
+    ('ix_datasets_platform_category', 'datasets', ['platform', 'category']),
+    ('ix_webhook_deliveries_status_next_attempt_at', 'webhook_deliveries', ['status', 'next_attempt_at']),
+]
+REPLACED_INDEXES = [
+    ('ix_scrape_requests_user_id', 'scrape_requests', ['user_id']),
+    ('ix_webhook_deliveries_status', 'webhook_deliveries', ['status']),
+    ('ix_webhook_deliveries_next_attempt_at', 'webhook_deliveries', ['next_attempt_at']),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in NEW_INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+        for name, table, _ in REPLACED_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in REPLACED_INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+        for name, table, _ in NEW_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,39 @@
+"""Plan entitlements on pricing_plans.
+
+custom_scraping and premium_datasets replace the `plan == "free"` checks in
+the scrape and download routes. Existing plans keep their current access:
+everything but the free plan is entitled to both. Plans added later get
+neither unless granted.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 04:12:47.903115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('pricing_plans', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('custom_scraping', sa.Boolean(), nullable=False, server_default=sa.false()))
+        batch_op.add_column(sa.Column('premium_datasets', sa.Boolean(), nullable=False, server_default=sa.false()))
+    op.execute(
+        "UPDATE pricing_plans SET custom_scraping = true, premium_datasets = true WHERE plan_id <> 'free'"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('pricing_plans', schema=None) as batch_op:
+        batch_op.drop_column('premium_datasets')
+        batch_op.drop_column('custom_scraping')
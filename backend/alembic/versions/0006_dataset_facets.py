@@ -0,0 +1,43 @@
+"""Dataset facet counts.
+
+dataset_facets holds the number of datasets per (platform, category,
+is_premium). It is backfilled here and afterwards kept current by the
+Dataset mapper events in app.models.dataset_facet.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 06:03:29.517842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('dataset_facets',
+    sa.Column('platform', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('category', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('is_premium', sa.Boolean(), nullable=False),
+    sa.Column('dataset_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('platform', 'category', 'is_premium')
+    )
+    # datasets.platform stores enum member names; facets use the API values
+    op.execute(
+        "INSERT INTO dataset_facets (platform, category, is_premium, dataset_count) "
+        "SELECT lower(CAST(platform AS VARCHAR)), category, is_premium, count(*) "
+        "FROM datasets GROUP BY platform, category, is_premium"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('dataset_facets')
@@ -0,0 +1,43 @@
+"""Dataset change feed.
+
+dataset_changes logs dataset inserts, updates and deletes under a growing
+seq for /datasets/changes. Every existing dataset gets an upsert entry here;
+afterwards the Dataset mapper events in app.models.dataset_change append to it.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 09:12:44.301577
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('dataset_changes',
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('dataset_id', sa.Integer(), nullable=False),
+    sa.Column('operation', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('seq')
+    )
+    op.create_index('ix_dataset_changes_dataset_id_seq', 'dataset_changes', ['dataset_id', 'seq'], unique=False)
+    op.execute(
+        "INSERT INTO dataset_changes (dataset_id, operation, changed_at) "
+        "SELECT id, 'upsert', last_updated FROM datasets ORDER BY id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_dataset_changes_dataset_id_seq', table_name='dataset_changes')
+    op.drop_table('dataset_changes')
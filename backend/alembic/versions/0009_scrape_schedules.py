@@ -0,0 +1,57 @@
+"""Scrape schedules.
+
+scrape_schedules holds recurring scrapes. The scheduler reads the active
+triggers due within its horizon through (is_active, next_run_at).
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 02:58:47.099122
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('scrape_schedules',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('schedule_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('url', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('platform', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('fields', sa.JSON(), nullable=True),
+    sa.Column('webhook_url', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('interval_seconds', sa.Integer(), nullable=True),
+    sa.Column('cron', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('jitter_seconds', sa.Integer(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('next_run_at', sa.DateTime(), nullable=False),
+    sa.Column('last_run_at', sa.DateTime(), nullable=True),
+    sa.Column('run_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('scrape_schedules', schema=None) as batch_op:
+        batch_op.create_index('ix_scrape_schedules_is_active_next_run_at', ['is_active', 'next_run_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_scrape_schedules_schedule_id'), ['schedule_id'], unique=True)
+        batch_op.create_index(batch_op.f('ix_scrape_schedules_user_id'), ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('scrape_schedules', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_scrape_schedules_user_id'))
+        batch_op.drop_index(batch_op.f('ix_scrape_schedules_schedule_id'))
+        batch_op.drop_index('ix_scrape_schedules_is_active_next_run_at')
+
+    op.drop_table('scrape_schedules')
@@ -0,0 +1,33 @@
+"""Dataset version previews.
+
+dataset_versions.preview_data holds the records sampled from each version at
+ingest. Versions ingested before this revision have none; their datasets keep
+serving the preview_data they already had.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 03:13:27.249268
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('dataset_versions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('preview_data', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('dataset_versions', schema=None) as batch_op:
+        batch_op.drop_column('preview_data')
@@ -0,0 +1,32 @@
+"""Dataset version column statistics.
+
+dataset_versions.column_stats holds the per-column statistics profiled from
+each version at ingest. Versions ingested before this revision have none.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 03:15:50.630131
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('dataset_versions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('column_stats', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('dataset_versions', schema=None) as batch_op:
+        batch_op.drop_column('column_stats')
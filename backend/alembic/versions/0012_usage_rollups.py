@@ -0,0 +1,47 @@
+"""Usage rollups.
+
+usage_hourly and usage_daily hold per-user usage event counts, added in
+batches by the usage meter. Their (user_id, bucket_start, event) keys serve
+usage range queries.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19 03:20:03.528935
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0012'
+down_revision: Union[str, None] = '0011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('usage_daily',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('event', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'bucket_start', 'event')
+    )
+    op.create_table('usage_hourly',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('event', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'bucket_start', 'event')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('usage_hourly')
+    op.drop_table('usage_daily')
@@ -0,0 +1,36 @@
+"""Webhook updated_at.
+
+webhooks.updated_at is bumped by in-place edits such as batch settings, so
+the webhook index's polling fingerprint (max(updated_at)) notices them.
+Existing rows start at their created_at.
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-19 03:39:16.510409
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0014'
+down_revision: Union[str, None] = '0013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('webhooks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE webhooks SET updated_at = created_at")
+    with op.batch_alter_table('webhooks', schema=None) as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('webhooks', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,52 @@
+"""Notify workers when pricing_plans changes.
+
+On PostgreSQL a statement-level trigger publishes a "plan" invalidation on
+INVALIDATION_CHANNEL (as configured when this revision runs) after any
+insert, update, delete or truncate of pricing_plans, so every worker's plan
+catalog reloads when the transaction commits, however the plans were
+edited. Other databases rely on the catalog's TTL refresh.
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-19 06:02:41.118254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0015'
+down_revision: Union[str, None] = '0014'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    channel = settings.invalidation_channel.replace("'", "''")
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION notify_pricing_plans_changed() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('{channel}', '[{{"e": "plan"}}]');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(
+        "CREATE TRIGGER pricing_plans_changed AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON pricing_plans "
+        "FOR EACH STATEMENT EXECUTE FUNCTION notify_pricing_plans_changed()"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP TRIGGER IF EXISTS pricing_plans_changed ON pricing_plans")
+    op.execute("DROP FUNCTION IF EXISTS notify_pricing_plans_changed()")
@@ -0,0 +1,50 @@
+"""Dataset change feed in commit order.
+
+dataset_changes.commit_seq is handed out from the single dataset_change_clock
+row just before a writing transaction commits; the feed pages by it instead
+of by seq and holds nothing back. Existing entries keep their seq as
+commit_seq, so outstanding change tokens stay valid. purged_through records
+how far expired delete entries have been purged.
+
+Revision ID: 0016
+Revises: 0015
+Create Date: 2026-10-19 04:06:09.437381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0016'
+down_revision: Union[str, None] = '0015'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('dataset_change_clock',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('commit_seq', sa.Integer(), nullable=False),
+    sa.Column('purged_through', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('dataset_changes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('commit_seq', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_dataset_changes_commit_seq'), ['commit_seq'], unique=True)
+    op.execute("UPDATE dataset_changes SET commit_seq = seq")
+    op.execute(
+        "INSERT INTO dataset_change_clock (id, commit_seq, purged_through) "
+        "SELECT 1, COALESCE(MAX(seq), 0), 0 FROM dataset_changes"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('dataset_changes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_dataset_changes_commit_seq'))
+        batch_op.drop_column('commit_seq')
+
+    op.drop_table('dataset_change_clock')
@@ -0,0 +1,36 @@
+"""Scrape request leases.
+
+A claimed scrape request holds a lease (lease_until) that its worker
+renews; processing requests whose lease expired are re-queued by other
+workers. Requests processing at upgrade time have no lease and are
+treated as expired.
+
+Revision ID: 0017
+Revises: 0016
+Create Date: 2026-10-19 04:10:38.333026
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0017'
+down_revision: Union[str, None] = '0016'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('scrape_requests', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('lease_until', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_scrape_requests_status_lease_until', ['status', 'lease_until'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('scrape_requests', schema=None) as batch_op:
+        batch_op.drop_index('ix_scrape_requests_status_lease_until')
+        batch_op.drop_column('lease_until')
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlmodel import Session, select
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
 
 from app.core.database import get_session
 from app.core.security import get_current_user, generate_api_key
 from app.models.user import User, PlanType
-from app.models.pricing_plan import PricingPlan
+from app.core.responses import cacheable_json
+from app.core.config import settings
 from app.schemas.user import UserUpdate, UsageResponse
+from app.services.invalidation import invalidation_bus
+from app.services.plan_catalog import plan_catalog
+from app.services.usage import EVENT_API_CALL, ceil_hour, floor_hour, usage_by_day, utc_naive
 
 router = APIRouter(prefix="/account", tags=["Account"])
 
@@ -48,6 +53,7 @@ async def update_account(
     
     current_user.updated_at = datetime.now(timezone.utc)
     session.add(current_user)
+    invalidation_bus.publish(session, "user", current_user.id, current_user.updated_at.isoformat())
     session.commit()
     session.refresh(current_user)
     
@@ -60,28 +66,104 @@ async def update_account(
     }
 
 
+# Rolling periods of /account/usage, in days up to the current hour
+USAGE_PERIOD_DAYS = {"last_7d": 7, "last_30d": 30}
+
+
+def _month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month_start(moment: datetime) -> datetime:
+    start = _month_start(moment)
+    return start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+
+
+def _usage_range(
+    period: str,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    now: datetime
+) -> Tuple[datetime, datetime]:
+    """[start, end) of a usage period in whole hours, naive UTC."""
+    if period != "custom" and (start is not None or end is not None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start and end are only used with period=custom"
+        )
+    if period == "current":
+        return _month_start(now), ceil_hour(now)
+    if period in USAGE_PERIOD_DAYS:
+        range_end = ceil_hour(now)
+        return range_end - timedelta(days=USAGE_PERIOD_DAYS[period]), range_end
+    if period != "custom":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid period; use current, last_7d, last_30d or custom"
+        )
+    if start is None or end is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="period=custom requires start and end"
+        )
+    range_start, range_end = floor_hour(utc_naive(start)), ceil_hour(utc_naive(end))
+    if range_end <= range_start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end must be after start")
+    if range_end - range_start > timedelta(days=settings.usage_max_range_days):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Usage ranges span at most {settings.usage_max_range_days} days"
+        )
+    return range_start, range_end
+
+
+def _utc_iso(moment: datetime) -> str:
+    return moment.replace(tzinfo=timezone.utc).isoformat()
+
+
 @router.get("/usage", response_model=UsageResponse)
 async def get_usage(
     period: str = "current",
-    current_user: User = Depends(get_current_user)
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
 ):
-    """Get API usage statistics and remaining quota."""
-    # Get plan limits
-    plan_limits = {
-        PlanType.FREE: 1000,
-        PlanType.STARTER: 50000,
-        PlanType.PROFESSIONAL: 500000,
-        PlanType.ENTERPRISE: -1  # Unlimited
-    }
-    
-    quota = plan_limits.get(current_user.plan, 1000)
-    remaining = quota - current_user.api_calls_used if quota > 0 else -1
-    
+    """Get API usage statistics and remaining quota.
+
+    `period` is current (the calendar month so far), last_7d, last_30d or
+    custom with `start` and `end`; ranges are widened to whole UTC hours.
+    Counts come from the hourly and daily usage rollups.
+    """
+    now = utc_naive(datetime.now(timezone.utc))
+    range_start, range_end = _usage_range(period, start, end, now)
+    days = usage_by_day(session, current_user.id, range_start, range_end)
+    events = {}
+    for day_events in days.values():
+        for event, count in day_events.items():
+            events[event] = events.get(event, 0) + count
+
+    if period == "current":
+        month_calls = events.get(EVENT_API_CALL, 0)
+    else:
+        month = usage_by_day(session, current_user.id, _month_start(now), ceil_hour(now))
+        month_calls = sum(day_events.get(EVENT_API_CALL, 0) for day_events in month.values())
+    quota = plan_catalog.quota(current_user.plan)
+    remaining = quota - month_calls if quota > 0 else -1
+
     return UsageResponse(
-        api_calls=current_user.api_calls_used,
+        period=period,
+        start=_utc_iso(range_start),
+        end=_utc_iso(range_end),
+        api_calls=events.get(EVENT_API_CALL, 0),
+        events=events,
+        daily=[
+            {"date": day.date().isoformat(), "api_calls": day_events.get(EVENT_API_CALL, 0), "events": day_events}
+            for day, day_events in days.items()
+        ],
         quota=quota,
         remaining=remaining,
-        reset_date=current_user.api_calls_reset_at.isoformat() if current_user.api_calls_reset_at else None
+        reset_date=_utc_iso(_next_month_start(now))
     )
 
 
@@ -101,6 +183,7 @@ async def regenerate_api_key(
     current_user.api_key = new_api_key
     current_user.updated_at = datetime.now(timezone.utc)
     session.add(current_user)
+    invalidation_bus.publish(session, "user", current_user.id, current_user.updated_at.isoformat())
     session.commit()
     
     return {"api_key": new_api_key, "message": "API key regenerated successfully"}
@@ -111,64 +194,11 @@ billing_router = APIRouter(prefix="/billing", tags=["Billing"])
 
 
 @billing_router.get("/plans")
-async def list_plans(session: Session = Depends(get_session)):
+async def list_plans(request: Request):
     """List available subscription plans."""
-    statement = select(PricingPlan).where(PricingPlan.is_active == True)
-    plans = session.exec(statement).all()
-    
-    # If no plans in DB, return default plans
-    if not plans:
-        return {
-            "plans": [
-                {
-                    "id": "free",
-                    "name": "Free",
-                    "price": 0,
-                    "period": "month",
-                    "features": ["1,000 API calls/month", "Access to public datasets", "Basic data previews"],
-                    "api_calls": 1000
-                },
-                {
-                    "id": "starter",
-                    "name": "Starter",
-                    "price": 49,
-                    "period": "month",
-                    "features": ["50,000 API calls/month", "Access to all datasets", "Custom URL scraping (10/day)"],
-                    "api_calls": 50000
-                },
-                {
-                    "id": "professional",
-                    "name": "Professional",
-                    "price": 199,
-                    "period": "month",
-                    "features": ["500,000 API calls/month", "Priority API access", "Custom URL scraping (100/day)"],
-                    "api_calls": 500000,
-                    "highlighted": True
-                },
-                {
-                    "id": "enterprise",
-                    "name": "Enterprise",
-                    "price": 999,
-                    "period": "month",
-                    "features": ["Unlimited API calls", "Dedicated infrastructure", "Custom scraping (unlimited)"],
-                    "api_calls": -1
-                }
-            ]
-        }
-    
-    return {
-        "plans": [
-            {
-                "id": p.plan_id,
-                "name": p.name,
-                "price": p.price,
-                "period": p.period,
-                "features": p.features,
-                "api_calls": p.api_calls,
-                "highlighted": p.is_highlighted
-            } for p in plans
-        ]
-    }
+    # Rendered once per catalog load; no database access per request
+    snapshot = plan_catalog.snapshot
+    return cacheable_json(request, body=snapshot.plans_body, etag=snapshot.plans_etag)
 
 
 @billing_router.post("/subscribe")
@@ -178,8 +208,7 @@ async def subscribe(
     session: Session = Depends(get_session)
 ):
     """Subscribe to a plan."""
-    valid_plans = ["free", "starter", "professional", "enterprise"]
-    if plan_id not in valid_plans:
+    if plan_catalog.get(plan_id) is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid plan"
@@ -189,6 +218,7 @@ async def subscribe(
     current_user.plan = PlanType(plan_id)
     current_user.updated_at = datetime.now(timezone.utc)
     session.add(current_user)
+    invalidation_bus.publish(session, "user", current_user.id, current_user.updated_at.isoformat())
     session.commit()
     
     return {"message": f"Successfully subscribed to {plan_id} plan", "plan": plan_id}
@@ -201,8 +231,7 @@ async def update_subscription(
     session: Session = Depends(get_session)
 ):
     """Update subscription plan."""
-    valid_plans = ["free", "starter", "professional", "enterprise"]
-    if plan_id not in valid_plans:
+    if plan_catalog.get(plan_id) is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid plan"
@@ -212,6 +241,7 @@ async def update_subscription(
     current_user.plan = PlanType(plan_id)
     current_user.updated_at = datetime.now(timezone.utc)
     session.add(current_user)
+    invalidation_bus.publish(session, "user", current_user.id, current_user.updated_at.isoformat())
     session.commit()
     
     return {"message": f"Subscription updated from {old_plan} to {plan_id}", "plan": plan_id}
@@ -227,6 +257,7 @@ async def cancel_subscription(
     current_user.plan = PlanType.FREE
     current_user.updated_at = datetime.now(timezone.utc)
     session.add(current_user)
+    invalidation_bus.publish(session, "user", current_user.id, current_user.updated_at.isoformat())
     session.commit()
     
     return {"message": f"Subscription cancelled. Downgraded from {old_plan} to free"}
@@ -5,14 +5,17 @@ from sqlmodel import Session, select
 
 from app.core.database import get_session
 from app.core.security import (
+    oauth2_scheme,
     verify_password,
     get_password_hash,
     create_access_token,
+    decode_token,
     get_current_user,
     generate_api_key
 )
 from app.core.config import settings
 from app.models.user import User
+from app.services.token_revocation import revoke_token
 from app.schemas.user import (
     UserCreate,
     UserResponse,
@@ -86,8 +89,18 @@ async def signin(
 
 
 @router.post("/signout")
-async def signout(current_user: User = Depends(get_current_user)):
-    """Sign out the current user (client should discard token)."""
+async def signout(
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    """Sign out the current user; the token is revoked and rejected from now on."""
+    if not revoke_token(session, decode_token(token), current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This token cannot be revoked"
+        )
+    session.commit()
     return {"message": "Successfully signed out"}
 
 
@@ -1,23 +1,65 @@
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import asyncio
+import csv
+import io
+from typing import AsyncIterator, Iterator, Optional
+from urllib.parse import urlencode
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select, func
 
-from app.core.database import get_session
+from app.core.database import get_read_session, get_session
+from app.core.responses import RowSerializer, cacheable_json, fast_json
 from app.core.security import get_current_user
 from app.models.user import User
 from app.models.dataset import Dataset, Platform
+from app.models.dataset_change import CLOCK_ID, DELETE, DatasetChange, DatasetChangeClock
+from app.models.dataset_facet import DatasetFacet
+from app.models.dataset_version import DatasetVersion
 from app.schemas.dataset import (
+    DatasetChangesResponse,
     DatasetCreate,
+    DatasetFacetsResponse,
     DatasetResponse,
     DatasetListResponse,
+    DatasetVersionResponse,
     ExportRequest,
     ExportResponse
 )
+from app.services.dataset_versions import (
+    OP_COLUMN,
+    RecordColumns,
+    ingest_version,
+    iter_changes,
+    iter_version_records
+)
+from app.services.invalidation import invalidation_bus
+from app.services.previews import limit_preview
+from app.services.records import RecordFile, version_path
+from app.services.plan_catalog import plan_catalog
+from app.services.usage import EVENT_DATASET_DOWNLOAD, EVENT_DATASET_EXPORT, usage_meter
 import secrets
 from datetime import datetime, timezone, timedelta
 
 router = APIRouter(prefix="/datasets", tags=["Datasets"])
 
+# Columns of a DatasetResponse, selected as plain tuples for list_datasets
+dataset_list_fields = RowSerializer({
+    "id": Dataset.id,
+    "name": Dataset.name,
+    "platform": Dataset.platform,
+    "category": Dataset.category,
+    "description": Dataset.description,
+    "record_count": Dataset.record_count,
+    "size": Dataset.size,
+    "is_premium": Dataset.is_premium,
+    "tags": Dataset.tags,
+    "preview_data": Dataset.preview_data,
+    "last_updated": Dataset.last_updated
+})
+
 
 def sanitize_search_query(query: str) -> str:
     """Escape special SQL LIKE characters and limit length."""
@@ -46,20 +88,21 @@ def apply_dataset_filters(statement, platform, category, is_premium, sanitized_s
 
 @router.get("", response_model=DatasetListResponse)
 async def list_datasets(
+    request: Request,
     platform: Optional[Platform] = None,
     category: Optional[str] = None,
     is_premium: Optional[bool] = None,
     search: Optional[str] = None,
     limit: int = Query(default=50, le=100),
     offset: int = Query(default=0, ge=0),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """Retrieve a list of all available datasets with filtering options."""
     # Sanitize search query once at the start
     sanitized_search = sanitize_search_query(search) if search else None
     
     # Build query for datasets with filters
-    statement = apply_dataset_filters(select(Dataset), platform, category, is_premium, sanitized_search)
+    statement = apply_dataset_filters(dataset_list_fields.select(), platform, category, is_premium, sanitized_search)
     
     # Get total count efficiently using COUNT
     count_statement = apply_dataset_filters(select(func.count()), platform, category, is_premium, sanitized_search).select_from(Dataset)
@@ -67,35 +110,151 @@ async def list_datasets(
     
     # Apply pagination
     statement = statement.offset(offset).limit(limit)
+    rows = session.exec(statement).all()
+    
+    return cacheable_json(request, {
+        "datasets": dataset_list_fields.serialize(rows),
+        "total": total,
+        "page": (offset // limit) + 1,
+        "per_page": limit
+    })
+
+
+@router.get("/search")
+async def search_datasets(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(default=20, le=50),
+    session: Session = Depends(get_read_session)
+):
+    """Search datasets by keyword/tags."""
+    sanitized_q = sanitize_search_query(q)
+    statement = select(Dataset).where(
+        Dataset.name.ilike(f"%{sanitized_q}%") | 
+        Dataset.description.ilike(f"%{sanitized_q}%") |
+        Dataset.category.ilike(f"%{sanitized_q}%")
+    ).limit(limit)
+    
     datasets = session.exec(statement).all()
     
-    return DatasetListResponse(
-        datasets=[
-            DatasetResponse(
-                id=d.id,
-                name=d.name,
-                platform=d.platform,
-                category=d.category,
-                description=d.description,
-                record_count=d.record_count,
-                size=d.size,
-                is_premium=d.is_premium,
-                tags=d.tags,
-                preview_data=d.preview_data,
-                last_updated=d.last_updated.isoformat()
-            ) for d in datasets
+    return cacheable_json(request, {
+        "results": [
+            {
+                "id": d.id,
+                "name": d.name,
+                "platform": d.platform,
+                "category": d.category,
+                "is_premium": d.is_premium
+            } for d in datasets
         ],
-        total=total,
-        page=(offset // limit) + 1,
-        per_page=limit
+        "count": len(datasets)
+    })
+
+
+FACETS = ("platform", "category", "is_premium")
+
+
+def count_facets(cells, filters: dict) -> dict:
+    """Facet counts for `filters` from (platform, category, is_premium, count) cells."""
+    total = 0
+    counts = {facet: {} for facet in FACETS}
+    for *values, count in cells:
+        cell = dict(zip(FACETS, values))
+        mismatched = [facet for facet, wanted in filters.items() if cell[facet] != wanted]
+        if not mismatched:
+            total += count
+        # A cell counts towards a facet when it passes every filter but (possibly) the facet's own
+        for facet in FACETS:
+            if not mismatched or mismatched == [facet]:
+                bucket = counts[facet]
+                bucket[cell[facet]] = bucket.get(cell[facet], 0) + count
+    return {
+        "total": total,
+        "facets": {
+            facet: [
+                {"value": value, "count": count}
+                for value, count in sorted(bucket.items(), key=lambda item: (-item[1], str(item[0])))
+                if count > 0
+            ] for facet, bucket in counts.items()
+        }
+    }
+
+
+@router.get("/facets", response_model=DatasetFacetsResponse)
+async def get_dataset_facets(
+    request: Request,
+    platform: Optional[Platform] = None,
+    category: Optional[str] = None,
+    is_premium: Optional[bool] = None,
+    session: Session = Depends(get_read_session)
+):
+    """Dataset counts by platform, category and premium flag for any combination of filters."""
+    filters = {"platform": platform.value if platform else None, "category": category, "is_premium": is_premium}
+    filters = {facet: value for facet, value in filters.items() if value is not None}
+    cells = session.exec(
+        select(DatasetFacet.platform, DatasetFacet.category, DatasetFacet.is_premium, DatasetFacet.dataset_count)
+        .where(DatasetFacet.dataset_count > 0)
+    ).all()
+    return cacheable_json(request, count_facets(cells, filters))
+
+
+@router.get("/changes", response_model=DatasetChangesResponse)
+async def get_dataset_changes(
+    since: str = Query(default="0", description="next_since of the previous page; 0 for a full sync"),
+    limit: int = Query(default=500, ge=1, le=1000),
+    session: Session = Depends(get_read_session)
+):
+    """Datasets inserted, updated or deleted since a change token, for incremental mirroring."""
+    if not since.isdigit():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid change token"
+        )
+    since_seq = int(since)
+    if since_seq:
+        purged_through = session.exec(
+            select(DatasetChangeClock.purged_through).where(DatasetChangeClock.id == CLOCK_ID)
+        ).first()
+        if purged_through is not None and since_seq < purged_through:
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Change token expired; sync again from since=0"
+            )
+    # commit_seq is handed out in commit order, so nothing can commit below an entry already seen
+    statement = (
+        select(
+            DatasetChange.commit_seq, DatasetChange.operation, DatasetChange.dataset_id,
+            *dataset_list_fields.columns
+        )
+        .outerjoin(Dataset, Dataset.id == DatasetChange.dataset_id)
+        .where(DatasetChange.commit_seq > since_seq)
+        .order_by(DatasetChange.commit_seq)
+        .limit(limit + 1)
     )
+    rows = session.exec(statement).all()
+
+    changes = []
+    next_seq = since_seq
+    has_more = len(rows) > limit
+    for seq, operation, dataset_id, *dataset in rows[:limit]:
+        next_seq = seq
+        if operation == DELETE:
+            changes.append({"seq": seq, "op": operation, "dataset_id": dataset_id, "dataset": None})
+        elif dataset[0] is not None:
+            # An upsert whose dataset is gone is followed by its delete entry
+            changes.append({
+                "seq": seq, "op": operation, "dataset_id": dataset_id,
+                "dataset": dict(zip(dataset_list_fields.keys, dataset))
+            })
+    return fast_json({"changes": changes, "next_since": str(next_seq), "has_more": has_more})
 
 
 @router.get("/{dataset_id}", response_model=DatasetResponse)
 async def get_dataset(
+    request: Request,
     dataset_id: int,
     preview: bool = Query(default=True),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """Get detailed information about a specific dataset."""
     statement = select(Dataset).where(Dataset.id == dataset_id)
@@ -107,7 +266,7 @@ async def get_dataset(
             detail="Dataset not found"
         )
     
-    return DatasetResponse(
+    return cacheable_json(request, DatasetResponse(
         id=dataset.id,
         name=dataset.name,
         platform=dataset.platform,
@@ -119,25 +278,40 @@ async def get_dataset(
         tags=dataset.tags,
         preview_data=dataset.preview_data if preview else [],
         last_updated=dataset.last_updated.isoformat()
-    )
+    ).model_dump(mode="json"))
 
 
 @router.get("/{dataset_id}/preview")
 async def get_dataset_preview(
+    request: Request,
     dataset_id: int,
-    session: Session = Depends(get_session)
+    version: Optional[int] = Query(default=None, ge=1),
+    session: Session = Depends(get_read_session)
 ):
-    """Get sample preview data for a dataset."""
-    statement = select(Dataset).where(Dataset.id == dataset_id)
-    dataset = session.exec(statement).first()
+    """Get sample preview data for a dataset (records sampled at ingest, of the current or a given version)."""
+    if version is not None:
+        row = session.exec(
+            select(DatasetVersion.version, DatasetVersion.preview_data).where(
+                DatasetVersion.dataset_id == dataset_id, DatasetVersion.version == version
+            )
+        ).first()
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Dataset not found" if session.get(Dataset, dataset_id) is None else "Version not found"
+            )
+        return cacheable_json(request, {"preview_data": row[1] or [], "version": version})
     
-    if not dataset:
+    row = session.exec(select(Dataset.id, Dataset.preview_data).where(Dataset.id == dataset_id)).first()
+    
+    if row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Dataset not found"
         )
+    preview_data = row[1] or []
     
-    return {"preview_data": dataset.preview_data}
+    return cacheable_json(request, {"preview_data": preview_data})
 
 
 @router.post("/{dataset_id}/download")
@@ -157,7 +331,7 @@ async def download_dataset(
         )
     
     # Check if user has access to premium datasets
-    if dataset.is_premium and current_user.plan == "free":
+    if dataset.is_premium and not plan_catalog.for_user(current_user).premium_datasets:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Premium dataset requires a paid subscription"
@@ -166,6 +340,7 @@ async def download_dataset(
     # Generate download token
     download_token = secrets.token_urlsafe(32)
     expires_at = datetime.now(timezone.utc) + timedelta(hours=24)
+    usage_meter.record(current_user.id, EVENT_DATASET_DOWNLOAD)
     
     return {
         "download_url": f"/api/v1/downloads/{download_token}",
@@ -174,36 +349,6 @@ async def download_dataset(
     }
 
 
-@router.get("/search")
-async def search_datasets(
-    q: str = Query(..., min_length=1, max_length=100),
-    limit: int = Query(default=20, le=50),
-    session: Session = Depends(get_session)
-):
-    """Search datasets by keyword/tags."""
-    sanitized_q = sanitize_search_query(q)
-    statement = select(Dataset).where(
-        Dataset.name.ilike(f"%{sanitized_q}%") | 
-        Dataset.description.ilike(f"%{sanitized_q}%") |
-        Dataset.category.ilike(f"%{sanitized_q}%")
-    ).limit(limit)
-    
-    datasets = session.exec(statement).all()
-    
-    return {
-        "results": [
-            {
-                "id": d.id,
-                "name": d.name,
-                "platform": d.platform,
-                "category": d.category,
-                "is_premium": d.is_premium
-            } for d in datasets
-        ],
-        "count": len(datasets)
-    }
-
-
 @router.post("/{dataset_id}/export", response_model=ExportResponse)
 async def export_dataset(
     dataset_id: int,
@@ -227,17 +372,267 @@ async def export_dataset(
             detail="Invalid format. Supported: csv, json, parquet"
         )
     
+    since_version = export_request.since_version
+    if since_version is not None:
+        if export_request.format == "parquet":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Delta exports support csv and json"
+            )
+        if not 0 <= since_version < dataset.current_version:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"since_version must be at least 0 and below the current version ({dataset.current_version})"
+            )
+    
     # Generate export
     export_id = f"exp_{secrets.token_urlsafe(16)}"
     expires_at = datetime.now(timezone.utc) + timedelta(hours=24)
+    download_url = f"/api/v1/exports/{export_id}/download"
+    if dataset.current_version and export_request.format != "parquet":
+        # Versioned records stream straight from their record files, pinned to the current version
+        query = {"format": export_request.format, "version": dataset.current_version}
+        if since_version is not None:
+            query["since_version"] = since_version
+        download_url = f"/api/v1/datasets/{dataset_id}/records?{urlencode(query)}"
+    usage_meter.record(current_user.id, EVENT_DATASET_EXPORT)
     
     return ExportResponse(
         export_id=export_id,
-        download_url=f"/api/v1/exports/{export_id}/download",
-        expires_at=expires_at.isoformat()
+        download_url=download_url,
+        expires_at=expires_at.isoformat(),
+        version=dataset.current_version or None,
+        since_version=since_version
     )
 
 
+@router.get("/{dataset_id}/stats")
+async def get_dataset_stats(
+    request: Request,
+    dataset_id: int,
+    version: Optional[int] = Query(default=None, ge=1),
+    session: Session = Depends(get_read_session)
+):
+    """Get per-column statistics of a dataset's current (or a given) version, profiled at ingest."""
+    number = version
+    if number is None:
+        number = session.exec(select(Dataset.current_version).where(Dataset.id == dataset_id)).first()
+        if number is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Dataset not found"
+            )
+    row = session.exec(
+        select(DatasetVersion.record_count, DatasetVersion.column_stats).where(
+            DatasetVersion.dataset_id == dataset_id, DatasetVersion.version == number
+        )
+    ).first()
+    if row is None and version is not None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dataset not found" if session.get(Dataset, dataset_id) is None else "Version not found"
+        )
+    if row is None or row[1] is None:
+        # Not versioned yet, or ingested before statistics were profiled
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No statistics have been computed for this dataset version"
+        )
+    return cacheable_json(request, {
+        "dataset_id": dataset_id,
+        "version": number,
+        "record_count": row[0],
+        "columns": row[1]
+    })
+
+
+def _version_response(version: DatasetVersion) -> dict:
+    return {
+        "version": version.version,
+        "key_column": version.key_column,
+        "record_count": version.record_count,
+        "added": version.added,
+        "changed": version.changed,
+        "removed": version.removed,
+        "created_at": version.created_at.isoformat()
+    }
+
+
+@router.get("/{dataset_id}/versions")
+async def list_dataset_versions(
+    dataset_id: int,
+    session: Session = Depends(get_read_session)
+):
+    """List the versions of a dataset, newest first, with their record-level diff counts."""
+    versions = session.exec(
+        select(DatasetVersion)
+        .where(DatasetVersion.dataset_id == dataset_id)
+        .order_by(DatasetVersion.version.desc())
+    ).all()
+    if not versions and session.get(Dataset, dataset_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dataset not found"
+        )
+    return {"versions": [_version_response(version) for version in versions]}
+
+
+async def _ndjson_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Non-blank lines of a streamed NDJSON body, as they arrive."""
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        end = buffer.rfind(b"\n")
+        if end < 0:
+            continue
+        lines = bytes(buffer[:end]).split(b"\n")
+        del buffer[:end + 1]
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield bytes(buffer)
+
+
+@router.post("/{dataset_id}/versions", response_model=DatasetVersionResponse, status_code=status.HTTP_201_CREATED)
+async def create_dataset_version(
+    dataset_id: int,
+    request: Request,
+    key: str = Query(..., description="Field identifying a record across versions, e.g. sku"),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    """Ingest a new version of a dataset's records, streamed as NDJSON (admin only placeholder).
+
+    Records are turned into columns line by line as the body arrives, so
+    the upload is never held as a whole, nor as a list of dicts.
+    """
+    # In production, add admin role check
+    records = RecordColumns()
+    number = 0
+    try:
+        async for line in _ndjson_lines(request.stream()):
+            number += 1
+            # orjson.JSONDecodeError is a ValueError too
+            records.add(orjson.loads(line))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Record {number}: {e}"
+        ) from e
+    try:
+        columns, types = records.finish()
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        ) from e
+
+    # Lock the dataset row so concurrent ingests get consecutive versions; only once the upload is read
+    dataset = session.exec(select(Dataset).where(Dataset.id == dataset_id).with_for_update()).first()
+    if not dataset:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dataset not found"
+        )
+    try:
+        # Diffing and writing the record files is CPU and disk bound
+        version = await asyncio.to_thread(ingest_version, session, dataset, columns, types, key)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        ) from e
+    invalidation_bus.publish(session, "dataset", dataset.id, dataset.last_updated.isoformat())
+    try:
+        session.commit()
+    except IntegrityError as e:
+        # A concurrent ingest committed this version number first (SQLite does not honour the row lock)
+        session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Another version of this dataset was ingested concurrently; retry"
+        ) from e
+    session.refresh(version)
+    return _version_response(version)
+
+
+def _ndjson(rows: Iterator[dict]) -> Iterator[bytes]:
+    batch = []
+    for row in rows:
+        batch.append(orjson.dumps(row))
+        if len(batch) == 1000:
+            yield b"\n".join(batch) + b"\n"
+            batch = []
+    if batch:
+        yield b"\n".join(batch) + b"\n"
+
+
+def _csv(rows: Iterator[dict], fieldnames) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, restval="")
+    writer.writeheader()
+    for n, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if n % 1000 == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+@router.get("/{dataset_id}/records")
+async def get_dataset_records(
+    dataset_id: int,
+    format: str = Query(default="json", pattern="^(json|csv)$"),
+    version: Optional[int] = Query(default=None, ge=1),
+    since_version: Optional[int] = Query(default=None, ge=0),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    """Stream the records of a dataset version, or only those added, changed or removed since an older one.
+
+    Delta rows carry their operation in `_op`; removed records carry only their key.
+    """
+    dataset = session.exec(select(Dataset).where(Dataset.id == dataset_id)).first()
+    if not dataset:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dataset not found"
+        )
+    if dataset.is_premium and not plan_catalog.for_user(current_user).premium_datasets:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Premium dataset requires a paid subscription"
+        )
+    version = version or dataset.current_version
+    target = session.exec(
+        select(DatasetVersion).where(DatasetVersion.dataset_id == dataset_id, DatasetVersion.version == version)
+    ).first()
+    if target is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dataset version not found"
+        )
+    if since_version is not None and since_version >= version:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="since_version must be below version"
+        )
+
+    if since_version is None:
+        rows = iter_version_records(dataset_id, version)
+    else:
+        rows = iter_changes(dataset_id, target.key_column, since_version, version)
+    if format == "json":
+        return StreamingResponse(_ndjson(rows), media_type="application/x-ndjson")
+    with RecordFile(version_path(dataset_id, version)) as records:
+        fieldnames = list(records.schema)
+    if since_version is not None:
+        fieldnames.insert(0, OP_COLUMN)
+    return StreamingResponse(_csv(rows, fieldnames), media_type="text/csv")
+
+
 @router.post("", response_model=DatasetResponse, status_code=status.HTTP_201_CREATED)
 async def create_dataset(
     dataset_data: DatasetCreate,
@@ -255,9 +650,11 @@ async def create_dataset(
         size=dataset_data.size,
         is_premium=dataset_data.is_premium,
         tags=dataset_data.tags,
-        preview_data=dataset_data.preview_data
+        preview_data=limit_preview(dataset_data.preview_data)
     )
     session.add(dataset)
+    session.flush()
+    invalidation_bus.publish(session, "dataset", dataset.id, dataset.last_updated.isoformat())
     session.commit()
     session.refresh(dataset)
     
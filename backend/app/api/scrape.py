@@ -1,63 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import update
 from sqlmodel import Session, select, func
 import secrets
 from datetime import datetime, timezone
 
-from app.core.database import get_session, engine
+from app.core.config import settings
+from app.core.database import get_read_session, get_session
+from app.core.responses import RowSerializer, fast_json
 from app.core.security import get_current_user
 from app.models.user import User
 from app.models.scrape_request import ScrapeRequest, ScrapeStatus
+from app.models.scrape_schedule import ScrapeSchedule
 from app.schemas.scrape import (
     ScrapeRequestCreate,
-    ScrapeRequestResponse,
     ScrapeStatusResponse,
-    ScrapeHistoryResponse
+    ScrapeHistoryResponse,
+    ScrapeScheduleCreate,
+    ScrapeScheduleListResponse,
+    ScrapeScheduleResponse
 )
+from app.services.scrape_dispatcher import scrape_dispatcher
+from app.services.scrape_jobs import CANCELLED_MESSAGE
+from app.services.webhook_delivery import enqueue_webhook_event
+from app.services.invalidation import invalidation_bus
+from app.services.plan_catalog import plan_catalog
+from app.services.scrape_scheduler import next_run
+from app.services.usage import EVENT_SCRAPE_REQUEST, usage_meter
 
 router = APIRouter(prefix="/scrape", tags=["Scraping"])
 
+VALID_PLATFORMS = ["amazon", "shopify", "ebay", "walmart", "etsy"]
 
-def process_scrape_request(request_id: str):
-    """Background task to process scraping (placeholder)."""
-    # Create a new session within the background task
-    with Session(engine) as session:
-        statement = select(ScrapeRequest).where(ScrapeRequest.request_id == request_id)
-        scrape_request = session.exec(statement).first()
-        
-        if scrape_request:
-            scrape_request.status = ScrapeStatus.COMPLETED
-            scrape_request.completed_at = datetime.now(timezone.utc)
-            scrape_request.result_count = 1
-            scrape_request.result_data = {
-                "scraped": True,
-                "url": scrape_request.url,
-                "data": {"sample": "Scraped data would appear here"}
-            }
-            session.add(scrape_request)
-            session.commit()
+# Columns of a ScrapeRequestResponse, selected as plain tuples for get_scrape_history
+scrape_history_fields = RowSerializer({
+    "request_id": ScrapeRequest.request_id,
+    "url": ScrapeRequest.url,
+    "platform": ScrapeRequest.platform,
+    "status": ScrapeRequest.status,
+    "result_count": ScrapeRequest.result_count,
+    "created_at": ScrapeRequest.created_at,
+    "completed_at": ScrapeRequest.completed_at
+})
 
 
 @router.post("", response_model=ScrapeStatusResponse, status_code=status.HTTP_201_CREATED)
 async def submit_scrape_request(
     scrape_data: ScrapeRequestCreate,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session)
 ):
     """Submit a new scraping request."""
     # Check user's plan for scraping limits
-    if current_user.plan == "free":
+    if not plan_catalog.for_user(current_user).custom_scraping:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Custom scraping is not available on the free plan"
         )
     
     # Validate platform
-    valid_platforms = ["amazon", "shopify", "ebay", "walmart", "etsy"]
-    if scrape_data.platform.lower() not in valid_platforms:
+    if scrape_data.platform.lower() not in VALID_PLATFORMS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid platform. Supported: {', '.join(valid_platforms)}"
+            detail=f"Invalid platform. Supported: {', '.join(VALID_PLATFORMS)}"
         )
     
     # Create scrape request
@@ -69,28 +73,134 @@ async def submit_scrape_request(
         platform=scrape_data.platform.lower(),
         fields=scrape_data.fields or [],
         webhook_url=scrape_data.webhook,
-        status=ScrapeStatus.PROCESSING
+        status=ScrapeStatus.PENDING
     )
     session.add(scrape_request)
     session.commit()
-    session.refresh(scrape_request)
     
-    # In production, this would trigger actual scraping
-    # For now, simulate with a background task (uses its own session)
-    background_tasks.add_task(process_scrape_request, request_id)
+    # Queued fairly against other tenants' work; runs when a scrape slot frees up
+    scrape_dispatcher.submit(request_id, current_user.id, current_user.plan)
+    usage_meter.record(current_user.id, EVENT_SCRAPE_REQUEST)
     
     return ScrapeStatusResponse(
         request_id=request_id,
-        status=ScrapeStatus.PROCESSING,
+        status=ScrapeStatus.PENDING,
         estimated_time="30s"
     )
 
 
+def _schedule_response(schedule: ScrapeSchedule) -> dict:
+    return {
+        "schedule_id": schedule.schedule_id,
+        "url": schedule.url,
+        "platform": schedule.platform,
+        "interval_seconds": schedule.interval_seconds,
+        "cron": schedule.cron,
+        "jitter_seconds": schedule.jitter_seconds,
+        "next_run_at": schedule.next_run_at.isoformat(),
+        "last_run_at": schedule.last_run_at.isoformat() if schedule.last_run_at else None,
+        "run_count": schedule.run_count,
+        "created_at": schedule.created_at.isoformat()
+    }
+
+
+@router.post("/schedules", response_model=ScrapeScheduleResponse, status_code=status.HTTP_201_CREATED)
+async def create_scrape_schedule(
+    schedule_data: ScrapeScheduleCreate,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    """Scrape a URL on a recurring interval or cron schedule."""
+    if not plan_catalog.for_user(current_user).custom_scraping:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Custom scraping is not available on the free plan"
+        )
+    if schedule_data.platform.lower() not in VALID_PLATFORMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid platform. Supported: {', '.join(VALID_PLATFORMS)}"
+        )
+    if schedule_data.interval_seconds is not None and schedule_data.interval_seconds < settings.scrape_schedule_min_interval_seconds:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"interval_seconds must be at least {settings.scrape_schedule_min_interval_seconds}"
+        )
+    if not 0 <= schedule_data.jitter_seconds <= settings.scrape_schedule_max_jitter_seconds:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"jitter_seconds must be between 0 and {settings.scrape_schedule_max_jitter_seconds}"
+        )
+    
+    now = datetime.now(timezone.utc)
+    schedule = ScrapeSchedule(
+        schedule_id=f"sch_{secrets.token_urlsafe(12)}",
+        user_id=current_user.id,
+        url=schedule_data.url,
+        platform=schedule_data.platform.lower(),
+        fields=schedule_data.fields or [],
+        webhook_url=schedule_data.webhook,
+        interval_seconds=schedule_data.interval_seconds,
+        cron=schedule_data.cron,
+        jitter_seconds=schedule_data.jitter_seconds,
+        next_run_at=now,
+        created_at=now
+    )
+    schedule.next_run_at = next_run(schedule, now)
+    session.add(schedule)
+    session.flush()
+    # Tells every worker's scheduler about the new trigger
+    invalidation_bus.publish(session, "scrape_schedule", schedule.id, schedule.next_run_at.isoformat())
+    session.commit()
+    session.refresh(schedule)
+    
+    return _schedule_response(schedule)
+
+
+@router.get("/schedules", response_model=ScrapeScheduleListResponse)
+async def list_scrape_schedules(
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_read_session)
+):
+    """List the user's recurring scrapes."""
+    schedules = session.exec(
+        select(ScrapeSchedule)
+        .where(ScrapeSchedule.user_id == current_user.id)
+        .order_by(ScrapeSchedule.created_at)
+    ).all()
+    return {"schedules": [_schedule_response(schedule) for schedule in schedules]}
+
+
+@router.delete("/schedules/{schedule_id}")
+async def delete_scrape_schedule(
+    schedule_id: str,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    """Stop and remove a recurring scrape."""
+    schedule = session.exec(
+        select(ScrapeSchedule).where(
+            ScrapeSchedule.schedule_id == schedule_id,
+            ScrapeSchedule.user_id == current_user.id
+        )
+    ).first()
+    if not schedule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Schedule not found"
+        )
+    invalidation_bus.publish(session, "scrape_schedule", schedule.id)
+    session.delete(schedule)
+    session.commit()
+    
+    return {"message": "Schedule deleted", "schedule_id": schedule_id}
+
+
 @router.get("/{request_id}", response_model=ScrapeStatusResponse)
 async def get_scrape_status(
     request_id: str,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """Get scraping request status and results."""
     statement = select(ScrapeRequest).where(
@@ -118,7 +228,7 @@ async def get_scrape_status(
 async def get_scrape_results(
     request_id: str,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """Get scraping results data."""
     statement = select(ScrapeRequest).where(
@@ -151,33 +261,20 @@ async def get_scrape_history(
     limit: int = Query(default=20, le=100),
     offset: int = Query(default=0, ge=0),
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """Get user's scraping history."""
-    statement = select(ScrapeRequest).where(
+    statement = scrape_history_fields.select().where(
         ScrapeRequest.user_id == current_user.id
     ).order_by(ScrapeRequest.created_at.desc()).offset(offset).limit(limit)
     
-    requests = session.exec(statement).all()
+    rows = session.exec(statement).all()
     
     # Get total count efficiently using COUNT
     total_statement = select(func.count()).select_from(ScrapeRequest).where(ScrapeRequest.user_id == current_user.id)
     total = session.exec(total_statement).one()
     
-    return ScrapeHistoryResponse(
-        requests=[
-            ScrapeRequestResponse(
-                request_id=r.request_id,
-                url=r.url,
-                platform=r.platform,
-                status=r.status,
-                result_count=r.result_count,
-                created_at=r.created_at.isoformat(),
-                completed_at=r.completed_at.isoformat() if r.completed_at else None
-            ) for r in requests
-        ],
-        total=total
-    )
+    return fast_json({"requests": scrape_history_fields.serialize(rows), "total": total})
 
 
 @router.delete("/{request_id}")
@@ -186,7 +283,7 @@ async def cancel_scrape_request(
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session)
 ):
-    """Cancel a pending scraping request."""
+    """Cancel a pending or processing scraping request, stopping its work on whichever worker holds it."""
     statement = select(ScrapeRequest).where(
         ScrapeRequest.request_id == request_id,
         ScrapeRequest.user_id == current_user.id
@@ -199,15 +296,38 @@ async def cancel_scrape_request(
             detail="Scraping request not found"
         )
     
-    if scrape_request.status not in [ScrapeStatus.PENDING, ScrapeStatus.PROCESSING]:
+    # Compare-and-set, so a request that completed meanwhile is not reported as cancelled
+    cancelled = session.execute(
+        update(ScrapeRequest)
+        .where(
+            ScrapeRequest.id == scrape_request.id,
+            ScrapeRequest.status.in_([ScrapeStatus.PENDING, ScrapeStatus.PROCESSING])
+        )
+        .values(
+            status=ScrapeStatus.FAILED,
+            error_message=CANCELLED_MESSAGE,
+            completed_at=datetime.now(timezone.utc)
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not cancelled:
+        # End the (SQLite: write) transaction the update opened before answering
+        session.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Only pending or processing requests can be cancelled"
         )
     
-    scrape_request.status = ScrapeStatus.FAILED
-    scrape_request.error_message = "Cancelled by user"
-    session.add(scrape_request)
+    enqueue_webhook_event(session, current_user.id, "scrape.failed", {
+        "request_id": scrape_request.request_id,
+        "url": scrape_request.url,
+        "platform": scrape_request.platform,
+        "status": ScrapeStatus.FAILED.value,
+        "error_message": CANCELLED_MESSAGE
+    })
+    # Tells the worker queuing or running the request to drop it; this worker drops it right away
+    invalidation_bus.publish(session, "scrape_request", scrape_request.request_id)
     session.commit()
+    scrape_dispatcher.cancel(scrape_request.request_id)
     
     return {"message": "Scraping request cancelled"}
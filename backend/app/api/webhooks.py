@@ -1,21 +1,35 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlmodel import Session, select
-from pydantic import BaseModel, HttpUrl, field_validator
+from pydantic import BaseModel, HttpUrl, Field, field_validator
 import secrets
 
 from app.core.database import get_session
+from app.core.responses import fast_json
 from app.core.security import get_current_user
 from app.models.user import User
 from app.models.webhook import Webhook
+from app.models.webhook_delivery import WebhookDelivery, DeliveryStatus
+from app.services.invalidation import invalidation_bus
+from app.services.webhook_index import webhook_index
 
 router = APIRouter(prefix="/webhooks", tags=["Webhooks"])
 
 
+class WebhookBatchSettings(BaseModel):
+    """Schema for batched delivery options."""
+    enabled: bool = True
+    max_events: int = Field(default=100, ge=1, le=1000)
+    max_bytes: int = Field(default=262144, ge=1024, le=1048576)
+    max_delay_seconds: float = Field(default=5.0, ge=0.1, le=300)
+
+
 class WebhookCreate(BaseModel):
     """Schema for creating a webhook."""
     url: HttpUrl
     events: List[str]
+    batch: Optional[WebhookBatchSettings] = None
     
     @field_validator('url')
     @classmethod
@@ -46,6 +60,24 @@ class WebhookCreate(BaseModel):
         return url_str
 
 
+def apply_batch_settings(webhook: Webhook, batch: WebhookBatchSettings):
+    """Copy batched delivery options onto a webhook."""
+    webhook.batch_enabled = batch.enabled
+    webhook.batch_max_events = batch.max_events
+    webhook.batch_max_bytes = batch.max_bytes
+    webhook.batch_max_delay_seconds = batch.max_delay_seconds
+
+
+def batch_settings(webhook: Webhook) -> dict:
+    """Batched delivery options of a webhook as returned by the API."""
+    return {
+        "enabled": webhook.batch_enabled,
+        "max_events": webhook.batch_max_events,
+        "max_bytes": webhook.batch_max_bytes,
+        "max_delay_seconds": webhook.batch_max_delay_seconds
+    }
+
+
 @router.post("")
 async def register_webhook(
     webhook_data: WebhookCreate,
@@ -71,15 +103,21 @@ async def register_webhook(
         events=webhook_data.events,
         secret=webhook_secret
     )
+    if webhook_data.batch:
+        apply_batch_settings(webhook, webhook_data.batch)
     session.add(webhook)
+    session.flush()
+    invalidation_bus.publish(session, "webhook", webhook.id)
     session.commit()
     session.refresh(webhook)
+    webhook_index.add(webhook)
     
     return {
         "webhook_id": webhook_id,
         "url": webhook_data.url,
         "events": webhook_data.events,
         "secret": webhook_secret,
+        "batch": batch_settings(webhook),
         "message": "Webhook registered successfully"
     }
 
@@ -90,22 +128,130 @@ async def list_webhooks(
     session: Session = Depends(get_session)
 ):
     """List registered webhooks."""
-    statement = select(Webhook).where(Webhook.user_id == current_user.id)
-    webhooks = session.exec(statement).all()
+    statement = select(
+        Webhook.webhook_id, Webhook.url, Webhook.events, Webhook.is_active, Webhook.batch_enabled,
+        Webhook.batch_max_events, Webhook.batch_max_bytes, Webhook.batch_max_delay_seconds, Webhook.created_at
+    ).where(Webhook.user_id == current_user.id)
+    rows = session.exec(statement).all()
     
-    return {
+    return fast_json({
         "webhooks": [
             {
-                "webhook_id": w.webhook_id,
-                "url": w.url,
-                "events": w.events,
-                "is_active": w.is_active,
-                "created_at": w.created_at.isoformat()
-            } for w in webhooks
+                "webhook_id": webhook_id,
+                "url": url,
+                "events": events,
+                "is_active": is_active,
+                "batch": {
+                    "enabled": batch_enabled,
+                    "max_events": max_events,
+                    "max_bytes": max_bytes,
+                    "max_delay_seconds": max_delay_seconds
+                },
+                "created_at": created_at
+            } for webhook_id, url, events, is_active, batch_enabled, max_events, max_bytes, max_delay_seconds, created_at in rows
+        ]
+    })
+
+
+@router.get("/dead-letters")
+async def list_dead_letters(
+    limit: int = Query(default=50, le=200),
+    offset: int = Query(default=0, ge=0),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    """List deliveries that exhausted their retries."""
+    statement = (
+        select(WebhookDelivery, Webhook.webhook_id)
+        .join(Webhook, Webhook.id == WebhookDelivery.webhook_id)
+        .where(Webhook.user_id == current_user.id, WebhookDelivery.status == DeliveryStatus.DEAD)
+        .order_by(WebhookDelivery.created_at.desc())
+        .offset(offset)
+        .limit(limit)
+    )
+    rows = session.exec(statement).all()
+    
+    return {
+        "deliveries": [
+            {
+                "delivery_id": d.delivery_id,
+                "webhook_id": webhook_id,
+                "event": d.event,
+                "attempts": d.attempts,
+                "response_status": d.response_status,
+                "last_error": d.last_error,
+                "created_at": d.created_at.isoformat()
+            } for d, webhook_id in rows
         ]
     }
 
 
+@router.post("/deliveries/{delivery_id}/retry")
+async def retry_delivery(
+    delivery_id: str,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    """Put a dead-lettered delivery back into the outbox."""
+    statement = (
+        select(WebhookDelivery)
+        .join(Webhook, Webhook.id == WebhookDelivery.webhook_id)
+        .where(WebhookDelivery.delivery_id == delivery_id, Webhook.user_id == current_user.id)
+    )
+    delivery = session.exec(statement).first()
+    
+    if not delivery:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Delivery not found"
+        )
+    
+    if delivery.status != DeliveryStatus.DEAD:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only dead-lettered deliveries can be retried"
+        )
+    
+    delivery.status = DeliveryStatus.PENDING
+    delivery.attempts = 0
+    delivery.next_attempt_at = datetime.now(timezone.utc)
+    session.add(delivery)
+    session.commit()
+    
+    return {"message": "Delivery scheduled for retry"}
+
+
+@router.put("/{webhook_id}/batch")
+async def update_webhook_batching(
+    webhook_id: str,
+    batch: WebhookBatchSettings,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    """Enable, disable or tune batched delivery for a webhook."""
+    statement = select(Webhook).where(
+        Webhook.webhook_id == webhook_id,
+        Webhook.user_id == current_user.id
+    )
+    webhook = session.exec(statement).first()
+    
+    if not webhook:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Webhook not found"
+        )
+    
+    apply_batch_settings(webhook, batch)
+    webhook.updated_at = datetime.now(timezone.utc)
+    session.add(webhook)
+    invalidation_bus.publish(session, "webhook", webhook.id)
+    session.commit()
+    session.refresh(webhook)
+    webhook_index.add(webhook)
+    
+    return {"webhook_id": webhook.webhook_id, "batch": batch_settings(webhook)}
+
+
 @router.delete("/{webhook_id}")
 async def delete_webhook(
     webhook_id: str,
@@ -125,7 +271,10 @@ async def delete_webhook(
             detail="Webhook not found"
         )
     
+    webhook_pk = webhook.id
     session.delete(webhook)
+    invalidation_bus.publish(session, "webhook", webhook_pk)
     session.commit()
+    webhook_index.remove(webhook_pk)
     
     return {"message": "Webhook deleted successfully"}
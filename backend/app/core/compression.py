@@ -0,0 +1,269 @@
+import asyncio
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # optional: br is simply not offered
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: zstd is simply not offered
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+# Bodies at least this large are compressed off the event loop
+OFFLOAD_SIZE = 64 * 1024
+
+
+class Encoder:
+    """One content-coding: a one-shot compressor and a streaming one.
+
+    `cache_level` is used for bodies that go into the precompressed cache,
+    which are compressed once and served many times, so it trades more CPU
+    for smaller output than the per-response `level`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        compress: Callable[[bytes, int], bytes],
+        stream: Callable[[int], "StreamCompressor"],
+        level: int,
+        cache_level: int
+    ):
+        self.name = name
+        self.compress = compress
+        self.stream = stream
+        self.level = level
+        self.cache_level = cache_level
+
+
+class StreamCompressor:
+    """Compress a body chunk by chunk, flushing so every chunk reaches the client promptly."""
+
+    def __init__(self, compress: Callable[[bytes], bytes], flush: Callable[[], bytes], finish: Callable[[], bytes]):
+        self._compress = compress
+        self._flush = flush
+        self._finish = finish
+
+    def chunk(self, data: bytes, last: bool) -> bytes:
+        out = self._compress(data) if data else b""
+        return out + (self._finish() if last else self._flush())
+
+
+def _gzip(data: bytes, level: int) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _gzip_stream(level: int) -> StreamCompressor:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return StreamCompressor(
+        compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+    )
+
+
+def _brotli_stream(level: int) -> StreamCompressor:
+    compressor = brotli.Compressor(quality=level)
+    return StreamCompressor(compressor.process, compressor.flush, compressor.finish)
+
+
+def _zstd(data: bytes, level: int) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def _zstd_stream(level: int) -> StreamCompressor:
+    compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    return StreamCompressor(
+        compressor.compress,
+        lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+        lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+    )
+
+
+def available_encoders() -> Dict[str, Encoder]:
+    """Encoders this process can produce, in server preference order."""
+    encoders = {}
+    if zstandard is not None:
+        encoders["zstd"] = Encoder("zstd", _zstd, _zstd_stream, level=3, cache_level=12)
+    if brotli is not None:
+        encoders["br"] = Encoder(
+            "br", lambda data, level: brotli.compress(data, quality=level), _brotli_stream, level=4, cache_level=9
+        )
+    encoders["gzip"] = Encoder("gzip", _gzip, _gzip_stream, level=6, cache_level=9)
+    return encoders
+
+
+def negotiate(accept_encoding: str, encoders: Dict[str, Encoder]) -> Optional[Encoder]:
+    """Pick the encoding for an Accept-Encoding header: highest q-value, ties by server preference."""
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    best, best_q = None, 0.0
+    for name, encoder in encoders.items():
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoder, q
+    return best
+
+
+class CompressedCache:
+    """LRU of compressed bodies keyed by (ETag, encoding), bounded in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key: Tuple[str, str], body: bytes):
+        if len(body) > self.max_bytes // 8:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+        self._entries[key] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+compressed_cache = CompressedCache(settings.compression_cache_max_bytes)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with the best encoding the client accepts.
+
+    Bodies smaller than `compression_minimum_size`, non-text content types and
+    responses that are already encoded pass through untouched. Responses sent
+    in several chunks (StreamingResponse) are compressed as they stream.
+    Responses carrying a strong ETag are compressed once per encoding and then served
+    from a bounded cache; their ETag is made weak, since the compressed bytes
+    differ from the identity representation it names.
+    """
+
+    def __init__(self, app, encoders: Optional[Dict[str, Encoder]] = None):
+        self.app = app
+        self.encoders = encoders if encoders is not None else available_encoders()
+        self.cache = compressed_cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoder = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encoders)
+        if encoder is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        stream: Optional[StreamCompressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, stream, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                passthrough = not self._compressible(Headers(raw=message["headers"]), message["status"])
+                if passthrough:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            headers = MutableHeaders(raw=start_message["headers"])
+
+            if stream is None and not more_body:
+                # The whole body in one message
+                if len(body) < settings.compression_minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                compressed = await self._compress(encoder, body, headers.get("etag"))
+                self._set_headers(headers, encoder)
+                headers["Content-Length"] = str(len(compressed))
+                await send(start_message)
+                await send({"type": "http.response.body", "body": compressed})
+                return
+
+            if stream is None:
+                length = headers.get("content-length")
+                if length is not None and int(length) < settings.compression_minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                stream = encoder.stream(encoder.level)
+                self._set_headers(headers, encoder)
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+                await send(start_message)
+            await send({"type": "http.response.body", "body": stream.chunk(body, not more_body), "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _compressible(headers: Headers, status: int) -> bool:
+        if status < 200 or status in (204, 304) or "content-encoding" in headers:
+            return False
+        if "no-transform" in headers.get("cache-control", ""):
+            return False
+        return headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+
+    @staticmethod
+    def _set_headers(headers: MutableHeaders, encoder: Encoder):
+        headers["Content-Encoding"] = encoder.name
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag is not None and not etag.startswith("W/"):
+            headers["ETag"] = "W/" + etag
+
+    async def _compress(self, encoder: Encoder, body: bytes, etag: Optional[str]) -> bytes:
+        # Only a strong ETag promises byte-identical bodies
+        key = (etag, encoder.name) if etag and not etag.startswith("W/") else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        level = encoder.cache_level if key is not None else encoder.level
+        if len(body) >= OFFLOAD_SIZE:
+            compressed = await asyncio.to_thread(encoder.compress, body, level)
+        else:
+            compressed = encoder.compress(body, level)
+        if key is not None:
+            self.cache.put(key, compressed)
+        return compressed
@@ -25,6 +25,111 @@ class Settings(BaseSettings):
     
     # Debug mode - controls SQL logging
     debug: bool = False
+
+    # Read replicas - comma-separated URLs. Read-only endpoints are balanced across replicas that
+    # answer health checks and lag the primary by at most database_replica_max_lag_seconds; clients
+    # that wrote within read_your_writes_seconds keep reading from the primary (a signed cookie
+    # or X-Read-Your-Writes header carries this across workers).
+    database_replica_urls: Union[List[str], str] = Field(default="")
+    database_replica_check_seconds: float = 5.0
+    database_replica_max_lag_seconds: float = 5.0
+    read_your_writes_seconds: float = 10.0
+
+    # Schema management: startup verifies the database is at the Alembic head revision.
+    # migrate_on_startup upgrades instead (serialized by an advisory lock on PostgreSQL).
+    migrate_on_startup: bool = False
+
+    # Directory holding the columnar record files of datasets (<dataset id>.dfrec)
+    records_dir: str = "data/records"
+
+    # Dataset previews - records sampled when a version is ingested, string values cut to fit the per-row byte budget
+    dataset_preview_rows: int = 10
+    dataset_preview_row_bytes: int = 1024
+
+    # Cross-worker cache invalidation: "postgres" (LISTEN/NOTIFY on invalidation_channel), "socket"
+    # (unix datagram sockets in invalidation_socket_dir, workers on one host) or "local" (this process
+    # only; caches fall back to polling). Empty picks postgres for PostgreSQL databases, else local.
+    invalidation_backend: str = ""
+    invalidation_channel: str = "dataflow_invalidation"
+    invalidation_socket_dir: str = ""
+    invalidation_reconnect_seconds: float = 1.0
+
+    # Plan catalog - pricing plans cached in memory, reloaded after this many seconds
+    plan_catalog_ttl_seconds: float = 300.0
+
+    # Dataset change feed - superseded entries are compacted periodically, and delete entries once
+    # older than the retention (change tokens from before a purged delete then get 410 Gone)
+    change_feed_compaction_seconds: float = 3600.0
+    change_feed_tombstone_retention_seconds: float = 7 * 86400.0
+
+    # Scrape schedules - triggers due within the horizon are held in an in-memory heap, reloaded once per horizon
+    scrape_scheduler_enabled: bool = True
+    scrape_schedule_horizon_seconds: float = 300.0
+    scrape_schedule_min_interval_seconds: int = 60
+    scrape_schedule_max_jitter_seconds: int = 3600
+
+    # Scrape dispatch - weighted fair queuing across tenants, with plan-based weights and per-tenant caps.
+    # Aging credits a waiting tenant this much virtual time per second it goes unserved.
+    scrape_max_concurrency: int = 16
+    scrape_fair_aging_rate: float = 0.1
+    # Running requests hold a lease renewed every third of it; requests whose lease expired are re-queued
+    scrape_lease_seconds: float = 60.0
+
+    # Scrape fetches - off keeps the placeholder results without network access. Each host gets AIMD limits on
+    # concurrency and request rate, shared by the worker's scrape jobs; both back off on 429/503 responses and
+    # on latency above scrape_host_latency_tolerance times the fastest seen, and Retry-After pauses the host.
+    scrape_fetch_enabled: bool = False
+    scrape_fetch_timeout_seconds: float = 30.0
+    scrape_host_initial_concurrency: int = 4
+    scrape_host_max_concurrency: int = 64
+    scrape_host_initial_rate: float = 5.0
+    scrape_host_max_rate: float = 100.0
+    scrape_host_latency_tolerance: float = 2.0
+    scrape_host_max_retry_after_seconds: float = 300.0
+
+    # Token revocation - signed-out token ids (jti) stay in revoked_tokens until the token expires. Every worker keeps
+    # a Bloom filter of them, sized for the capacity at the false positive rate, so only probable hits query the
+    # table. The filter is refreshed incrementally and rebuilt (dropping expired ids) every rebuild interval.
+    token_revocation_refresh_seconds: float = 5.0
+    token_revocation_rebuild_seconds: float = 3600.0
+    token_revocation_capacity: int = 100000
+    token_revocation_false_positive_rate: float = 0.001
+
+    # Usage metering - events are counted per user and minute in memory and added to the hourly and daily
+    # rollup tables in one batch every usage_flush_seconds; usage queries span at most usage_max_range_days.
+    usage_flush_seconds: float = 60.0
+    usage_max_range_days: int = 366
+
+    # Response compression - gzip, plus br and zstd when brotli / zstandard are installed.
+    # Bodies of responses with a strong ETag are compressed once and cached, up to the byte budget.
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024
+    compression_cache_max_bytes: int = 64 * 1024 * 1024
+
+    # Metrics - exposes /metrics in Prometheus text format
+    metrics_enabled: bool = True
+
+    # SQL profiling - per-request statement stats, Server-Timing header, N+1 and slow query logs
+    profiling_enabled: bool = True
+    server_timing_enabled: bool = False  # exposes DB timings to clients; enable for debugging
+    slow_query_threshold_ms: float = 200.0
+    slow_query_log_sample_rate: float = 0.1
+    n_plus_one_threshold: int = 5
+
+    # Webhook delivery
+    webhook_dispatcher_enabled: bool = True
+    webhook_poll_interval_seconds: float = 1.0
+    webhook_batch_size: int = 100
+    webhook_timeout_seconds: float = 10.0
+    webhook_max_connections: int = 100
+    webhook_max_concurrency_per_endpoint: int = 4
+    webhook_max_attempts: int = 8
+    webhook_backoff_base_seconds: float = 2.0
+    webhook_backoff_max_seconds: float = 3600.0
+    webhook_lease_seconds: float = 60.0
+    webhook_circuit_failure_threshold: int = 5
+    webhook_circuit_reset_seconds: float = 60.0
+    webhook_index_refresh_seconds: float = 5.0
     
     # Environment - defaults to development
     environment: str = Field(
@@ -72,6 +177,13 @@ class Settings(BaseSettings):
         # Fallback to default if invalid type
         return [i.strip() for i in DEFAULT_CORS_ORIGINS.split(",") if i.strip()]
     
+    @field_validator("database_replica_urls", mode="before")
+    @classmethod
+    def split_replica_urls(cls, v) -> List[str]:
+        if isinstance(v, str):
+            return [i.strip() for i in v.split(",") if i.strip()]
+        return [str(i).strip() for i in v or [] if str(i).strip()]
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -1,19 +1,201 @@
-from sqlmodel import SQLModel, create_engine, Session
+import asyncio
+import hashlib
+import hmac
+import itertools
+import math
+import logging
+import time
+from typing import List, Optional
+
+from fastapi import Depends, Request
+from sqlalchemy import text
+from sqlmodel import create_engine, Session
+from starlette.datastructures import MutableHeaders
+from starlette.requests import cookie_parser
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 # Create engine - echo mode controlled by debug setting
 engine = create_engine(
     settings.database_url,
     echo=settings.debug
 )
 
+# Seconds since the last replayed transaction, or 0 when the replica has replayed
+# everything it received (an idle primary would otherwise look like growing lag)
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class Replica:
+    """A read replica and the outcome of its last health check."""
+
+    def __init__(self, url: str):
+        self.engine = create_engine(url, echo=settings.debug, pool_pre_ping=True)
+        self.healthy = False
+        self.lag_seconds: Optional[float] = None
+
+    @property
+    def available(self) -> bool:
+        return self.healthy and self.lag_seconds is not None \
+            and self.lag_seconds <= settings.database_replica_max_lag_seconds
+
+    def check(self):
+        try:
+            with self.engine.connect() as connection:
+                if self.engine.dialect.name == "postgresql":
+                    self.lag_seconds = float(connection.execute(POSTGRES_LAG_QUERY).scalar())
+                else:
+                    # No replication to measure (e.g. a SQLite copy in local testing)
+                    connection.execute(text("SELECT 1"))
+                    self.lag_seconds = 0.0
+            self.healthy = True
+        except Exception as e:
+            if self.healthy:
+                logger.warning("Read replica %s failed its health check: %s", self.engine.url.render_as_string(), e)
+            self.healthy = False
+
+
+class ReadRouter:
+    """Chooses the engine behind read-only sessions.
+
+    Reads go round-robin to the replicas whose last health check passed within
+    the lag bound, and to the primary when there are none, or when the caller
+    pins the read to the primary (see ReadYourWritesMiddleware).
+    """
+
+    def __init__(self, primary, urls: List[str]):
+        self.primary = primary
+        self.replicas = [Replica(url) for url in urls]
+        self._next = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self.primary_reads = 0
+        self.replica_reads = 0
+
+    def engine_for_read(self, pin_primary: bool = False):
+        if self.replicas and not pin_primary:
+            available = [replica for replica in self.replicas if replica.available]
+            if available:
+                self.replica_reads += 1
+                return available[next(self._next) % len(available)].engine
+        self.primary_reads += 1
+        return self.primary
+
+    def check(self):
+        for replica in self.replicas:
+            replica.check()
+
+    async def start(self):
+        """Check the replicas and keep checking them in the background."""
+        if not self.replicas:
+            return
+        await asyncio.to_thread(self.check)
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.database_replica_check_seconds)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                break
+            await asyncio.to_thread(self.check)
+
 
-def create_db_and_tables():
-    """Create all database tables."""
-    SQLModel.metadata.create_all(engine)
+read_router = ReadRouter(engine, settings.database_replica_urls)
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+READ_YOUR_WRITES_COOKIE = "rw_primary_until"
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+
+
+def _sign(value: str) -> str:
+    return hmac.new(settings.secret_key.encode(), value.encode(), hashlib.sha256).hexdigest()
+
+
+def read_your_writes_pin(until: float) -> str:
+    """Signed value pinning reads to the primary until `until` (Unix time)."""
+    value = str(math.ceil(until))
+    return f"{value}.{_sign(value)}"
+
+
+def pinned_to_primary(cookie: Optional[str], now: Optional[float] = None) -> bool:
+    """Whether a read_your_writes_pin value is authentic and not yet expired."""
+    value, _, signature = (cookie or "").partition(".")
+    if not value.isdigit() or not hmac.compare_digest(signature, _sign(value)):
+        return False
+    return int(value) > (time.time() if now is None else now)
+
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware pinning a client's reads to the primary for a while after it writes.
+
+    The response to every write (a method outside SAFE_METHODS) carries a
+    value signed with secret_key holding the time until which that client's
+    reads go to the primary, `read_your_writes_seconds` ahead, so it sees its
+    own changes even when the replicas are behind. It is set as a cookie and
+    also returned in the X-Read-Your-Writes header, for clients that don't
+    keep cookies (e.g. cross-origin ones) to send back. The pin travels with
+    the client, so it holds whichever worker serves the next request. Only
+    installed when read replicas are configured.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        pin = headers.get(READ_YOUR_WRITES_HEADER.lower().encode(), b"").decode("latin-1")
+        if not pin:
+            pin = cookie_parser(headers.get(b"cookie", b"").decode("latin-1")).get(READ_YOUR_WRITES_COOKIE)
+        scope.setdefault("state", {})["read_primary"] = pinned_to_primary(pin)
+        if scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                seconds = settings.read_your_writes_seconds
+                value = read_your_writes_pin(time.time() + seconds)
+                response_headers = MutableHeaders(scope=message)
+                response_headers.append(
+                    "Set-Cookie",
+                    f"{READ_YOUR_WRITES_COOKIE}={value}; Max-Age={math.ceil(seconds)}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                response_headers.append(READ_YOUR_WRITES_HEADER, value)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
 
 
 def get_session():
     """Get database session."""
     with Session(engine) as session:
         yield session
+
+
+def get_read_session(request: Request, primary: Session = Depends(get_session)):
+    """Get a session for read-only handlers, on a replica when one is usable."""
+    bind = read_router.engine_for_read(getattr(request.state, "read_primary", False))
+    if bind is read_router.primary:
+        # Share the request's primary session (e.g. the one that authenticated the user):
+        # one pooled connection per request, as before replicas existed
+        yield primary
+        return
+    with Session(bind) as session:
+        yield session
@@ -0,0 +1,305 @@
+import abc
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from app.core import profiling
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric(abc.ABC):
+    """Base class for metrics whose samples are sharded per thread.
+
+    Every thread writes only to its own shard, so recording never takes a lock
+    and never contends with other threads; shards are summed at scrape time.
+    """
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            self._local.shard = shard
+            self._shards.append(shard)
+        return shard
+
+    def _snapshots(self) -> List[dict]:
+        return [shard.copy() for shard in list(self._shards)]
+
+    @abc.abstractmethod
+    def render(self) -> List[str]:
+        """Sample lines in the Prometheus text format, without HELP and TYPE."""
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    type_name = "counter"
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        shard = self._shard()
+        shard[labelvalues] = shard.get(labelvalues, 0) + amount
+
+    def collect(self) -> Dict[LabelValues, float]:
+        totals: Dict[LabelValues, float] = {}
+        for snapshot in self._snapshots():
+            for labels, value in snapshot.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+            for labels, value in sorted(self.collect().items())
+        ]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues: str):
+        shard = self._shard()
+        state = shard.get(labelvalues)
+        if state is None:
+            # Per-bucket (non-cumulative) counts, then +Inf, sum
+            state = [0] * (len(self.buckets) + 1) + [0.0]
+            shard[labelvalues] = state
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        state[index] += 1
+        state[-1] += value
+
+    def collect(self) -> Dict[LabelValues, List[float]]:
+        totals: Dict[LabelValues, List[float]] = {}
+        for snapshot in self._snapshots():
+            for labels, state in snapshot.items():
+                merged = totals.get(labels)
+                if merged is None:
+                    totals[labels] = list(state)
+                else:
+                    for i, value in enumerate(state):
+                        merged[i] += value
+        return totals
+
+    def render(self) -> List[str]:
+        lines = []
+        for labels, state in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames, labels, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            cumulative += state[len(self.buckets)]
+            bucket_labels = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {state[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """Gauge or counter whose value is read from elsewhere at scrape time.
+
+    `callback` returns either a number or a dict mapping label value tuples to numbers.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], object],
+        labelnames: Sequence[str] = (),
+        type_name: str = "gauge"
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+        self.type_name = type_name
+
+    def render(self) -> List[str]:
+        value = self.callback()
+        if value is None:
+            return []
+        if not isinstance(value, dict):
+            value = {(): value}
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {sample}"
+            for labels, sample in sorted(value.items())
+        ]
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], object],
+        labelnames: Sequence[str] = ()
+    ) -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, callback, labelnames))
+
+    def counter_callback(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], object],
+        labelnames: Sequence[str] = ()
+    ) -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, callback, labelnames, "counter"))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            samples = metric.render()
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.counter(
+    "http_requests_total", "HTTP requests by route template and status code.", ("method", "route", "status")
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route")
+)
+http_request_db_queries = registry.histogram(
+    "http_request_db_queries", "Database statements issued per HTTP request.", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+http_request_db_seconds = registry.histogram(
+    "http_request_db_seconds", "Database time spent per HTTP request.", ("method", "route")
+)
+db_queries_total = registry.counter("db_queries_total", "Database statements executed.")
+db_query_duration_seconds = registry.histogram("db_query_duration_seconds", "Database statement latency.")
+
+
+def observe_db_statement(statement: str, seconds: float):
+    db_queries_total.inc()
+    db_query_duration_seconds.observe(seconds)
+
+
+def register_db_metrics():
+    """Feed global statement metrics from the profiling engine hook."""
+    if observe_db_statement not in profiling.statement_listeners:
+        profiling.statement_listeners.append(observe_db_statement)
+
+
+def register_pool_metrics(engine):
+    """Expose connection pool usage of an engine as gauges."""
+    pool = engine.pool
+
+    def _pool_stat(method: str):
+        return lambda: getattr(pool, method)() if hasattr(pool, method) else None
+
+    registry.gauge_callback("db_pool_size", "Configured connection pool size.", _pool_stat("size"))
+    registry.gauge_callback("db_pool_checked_out", "Connections currently checked out.", _pool_stat("checkedout"))
+    registry.gauge_callback("db_pool_overflow", "Connections open beyond the pool size.", _pool_stat("overflow"))
+    registry.gauge_callback("db_pool_checked_in", "Idle connections in the pool.", _pool_stat("checkedin"))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request counts, status codes and latency.
+
+    Routes are labelled with their path template (e.g. /api/v1/datasets/{dataset_id})
+    so label cardinality stays bounded no matter which IDs are requested.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+            await send(message)
+
+        # Reuse the profile of an outer ProfilingMiddleware when there is one
+        profile = profiling.current_profile()
+        token = None
+        if profile is None:
+            profile = profiling.RequestProfile()
+            token = profiling.activate(profile)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            if token is not None:
+                profiling.deactivate(token)
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "<unmatched>"
+            method = scope["method"]
+            http_requests_total.inc(method, template, str(status_code[0]))
+            http_request_duration_seconds.observe(elapsed, method, template)
+            http_request_db_queries.observe(profile.statements, method, template)
+            http_request_db_seconds.observe(profile.db_seconds, method, template)
@@ -0,0 +1,103 @@
+import os
+import re
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ALEMBIC_INI = os.path.join(BACKEND_DIR, "alembic.ini")
+VERSIONS_DIR = os.path.join(BACKEND_DIR, "alembic", "versions")
+
+_REVISION_LINE = re.compile(r"^(down_revision|revision)\b[^=\n]*=(.*)$", re.MULTILINE)
+_QUOTED = re.compile(r"['\"]([^'\"]+)['\"]")
+
+# Arbitrary application-wide key for pg_advisory_lock, serializing concurrent upgrades
+MIGRATION_LOCK_ID = 7_305_512_960
+
+
+class SchemaVersionError(RuntimeError):
+    """The database schema is not at the revision this code expects."""
+
+
+def alembic_config(connection=None):
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    # The application owns logging configuration; don't let alembic.ini replace it
+    config.attributes["configure_logging"] = False
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+@lru_cache
+def head_revision() -> str:
+    """Latest revision in alembic/versions.
+
+    Read from the revision headers of the migration files rather than through
+    alembic's ScriptDirectory, which imports alembic and every migration
+    module and would dominate a worker's startup check.
+    """
+    revisions, parents = set(), set()
+    for filename in os.listdir(VERSIONS_DIR):
+        if not filename.endswith(".py"):
+            continue
+        with open(os.path.join(VERSIONS_DIR, filename)) as f:
+            for key, value in _REVISION_LINE.findall(f.read()):
+                # down_revision is None, a string, or a tuple of strings for merge revisions
+                names = _QUOTED.findall(value)
+                (revisions if key == "revision" else parents).update(names)
+    heads = revisions - parents
+    if len(heads) != 1:
+        raise SchemaVersionError(f"Expected a single migration head, found {sorted(heads)}")
+    return heads.pop()
+
+
+def current_revision(engine) -> Optional[str]:
+    """Revision recorded in the database's alembic_version table (None if unversioned)."""
+    with engine.connect() as connection:
+        try:
+            return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+        except DBAPIError:
+            # No alembic_version table: the database was never migrated
+            return None
+
+
+def check_schema(engine):
+    """Fail fast when the database is behind (or ahead of) the code.
+
+    A single-row SELECT, unlike create_all which reflects every table and
+    races when many workers boot at once.
+    """
+    current, head = current_revision(engine), head_revision()
+    if current != head:
+        raise SchemaVersionError(
+            f"Database schema is at revision {current or 'none'} but the application expects {head}; "
+            "run `alembic upgrade head` (databases created by create_all: `alembic stamp 0001` first)"
+        )
+
+
+def upgrade_database(engine, revision: str = "head"):
+    """Apply migrations up to `revision`.
+
+    On PostgreSQL a session advisory lock serializes concurrent callers, so
+    workers started together with migrate_on_startup migrate exactly once;
+    the others wait and then find nothing left to do.
+    """
+    from alembic import command
+
+    with engine.connect() as connection:
+        locked = engine.dialect.name == "postgresql"
+        if locked:
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_ID})
+            connection.commit()
+        try:
+            command.upgrade(alembic_config(connection), revision)
+            connection.commit()
+        finally:
+            if locked:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_ID})
+                connection.commit()
@@ -0,0 +1,133 @@
+import logging
+import random
+import time
+from contextvars import ContextVar, Token
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_SLOW_QUERIES = 20
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+# Called with (statement, seconds) for every statement, e.g. to feed global metrics
+statement_listeners: List[Callable[[str, float], None]] = []
+
+
+class RequestProfile:
+    """Database activity of a single HTTP request."""
+
+    __slots__ = ("started_at", "statements", "db_seconds", "counts", "slow")
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.counts: Dict[str, int] = {}
+        self.slow: List[Tuple[str, float]] = []
+
+    def record(self, statement: str, seconds: float):
+        self.statements += 1
+        self.db_seconds += seconds
+        # Statements are parameterized, so identical text means identical query shape
+        self.counts[statement] = self.counts.get(statement, 0) + 1
+        if seconds * 1000 >= settings.slow_query_threshold_ms and len(self.slow) < MAX_SLOW_QUERIES:
+            self.slow.append((statement, seconds))
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statements executed at least `threshold` times (likely N+1 patterns)."""
+        return [(statement, count) for statement, count in self.counts.items() if count >= threshold]
+
+    def server_timing(self) -> str:
+        app_ms = (time.perf_counter() - self.started_at) * 1000
+        return (
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.statements} queries", '
+            f'app;dur={app_ms:.2f}'
+        )
+
+
+def current_profile() -> Optional[RequestProfile]:
+    """Profile of the request being handled, if any."""
+    return _current_profile.get()
+
+
+def activate(profile: RequestProfile) -> Token:
+    """Attribute statements in the current context to `profile`."""
+    return _current_profile.set(profile)
+
+
+def deactivate(token: Token):
+    _current_profile.reset(token)
+
+
+def instrument_engine(engine):
+    """Time every statement executed through an engine and attribute it to the current request."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.record(statement, elapsed)
+        for listener in statement_listeners:
+            listener(statement, elapsed)
+
+
+def _one_line(statement: str) -> str:
+    return " ".join(statement.split())[:500]
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles each request's SQL.
+
+    Adds a Server-Timing header (DB time, statement count, total time) to every
+    response when server_timing_enabled, warns about statements repeated
+    n_plus_one_threshold or more times in one request, and logs a sample of
+    statements slower than slow_query_threshold_ms.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = activate(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and settings.server_timing_enabled:
+                MutableHeaders(scope=message).append("Server-Timing", profile.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            deactivate(token)
+            self._report(scope, profile)
+
+    @staticmethod
+    def _report(scope, profile: RequestProfile):
+        route = getattr(scope.get("route"), "path", None) or scope.get("path", "")
+        for statement, count in profile.repeated(settings.n_plus_one_threshold):
+            logger.warning(
+                "Possible N+1: statement ran %d times in %s %s: %s",
+                count, scope["method"], route, _one_line(statement)
+            )
+        if profile.slow and random.random() < settings.slow_query_log_sample_rate:
+            for statement, seconds in profile.slow:
+                logger.warning(
+                    "Slow query (%.1f ms) in %s %s: %s",
+                    seconds * 1000, scope["method"], route, _one_line(statement)
+                )
@@ -0,0 +1,73 @@
+import hashlib
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse
+from sqlmodel import select
+
+
+class RowSerializer:
+    """Serialize selected columns straight from result tuples.
+
+    List endpoints select only the columns they return and zip each row into a
+    dict keyed by the API field names, instead of loading ORM objects and
+    copying them into Pydantic models. Datetimes and enums are left to orjson,
+    which renders them exactly like isoformat() and .value would.
+    """
+
+    def __init__(self, fields: Dict[str, Any]):
+        self.keys = tuple(fields)
+        self.columns = tuple(fields.values())
+
+    def select(self):
+        return select(*self.columns)
+
+    def serialize(self, rows: Sequence[Sequence]) -> List[dict]:
+        keys = self.keys
+        return [dict(zip(keys, row)) for row in rows]
+
+
+def fast_json(content: Any, status_code: int = 200) -> ORJSONResponse:
+    """orjson response that skips response_model validation.
+
+    FastAPI only validates and re-encodes the return value of an endpoint when
+    it is not already a Response, so endpoints whose payload types are
+    guaranteed by the database schema return this directly; their
+    response_model still documents the shape in OpenAPI.
+    """
+    return ORJSONResponse(content, status_code=status_code)
+
+
+def etag_for(body: bytes) -> str:
+    """Strong ETag naming `body`: a hash of its bytes."""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    """Whether If-None-Match already names `etag` (weak comparison, so compressed copies match)."""
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    return header.strip() == "*" or etag in {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def cacheable_json(
+    request: Request,
+    content: Any = None,
+    body: Optional[bytes] = None,
+    etag: Optional[str] = None
+) -> Response:
+    """JSON response with a strong ETag for catalog reads, or 304 if the client has it.
+
+    The ETag also lets CompressionMiddleware serve compressed copies of the
+    same bytes from its cache. Pass a pre-rendered `body` (and its `etag`)
+    to skip serialization entirely.
+    """
+    if body is None:
+        body = ORJSONResponse(content).body
+    if etag is None:
+        etag = etag_for(body)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
@@ -1,3 +1,4 @@
+import secrets
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
@@ -9,6 +10,8 @@ from sqlmodel import Session, select
 from app.core.config import settings
 from app.core.database import get_session
 from app.models.user import User
+from app.services.token_revocation import revocation_list
+from app.services.usage import usage_meter
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.api_v1_prefix}/auth/signin")
@@ -32,9 +35,16 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=settings.access_token_expire_minutes)
     to_encode["exp"] = expire
+    # Token id, so the token can be revoked (signed out) before it expires
+    to_encode.setdefault("jti", secrets.token_urlsafe(16))
     return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
 
 
+def decode_token(token: str) -> dict:
+    """Verify a JWT access token and return its claims; raises JWTError if it is invalid or expired."""
+    return jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     session: Session = Depends(get_session)
@@ -46,21 +56,27 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        payload = decode_token(token)
         email: str = payload.get("sub")
-        if email is None:
+        # A token without an id could not be signed out, so it is not accepted
+        jti: str = payload.get("jti")
+        if email is None or not jti:
             raise credentials_exception
     except JWTError as e:
         raise credentials_exception from e
+    # A few Bloom filter probes; only probable hits query revoked_tokens
+    if revocation_list.is_revoked(session, jti):
+        raise credentials_exception
     
     statement = select(User).where(User.email == email)
     user = session.exec(statement).first()
     if user is None:
         raise credentials_exception
+    # Counted in memory; the usage meter writes rollups in batches
+    usage_meter.record(user.id)
     return user
 
 
 def generate_api_key() -> str:
     """Generate a unique API key."""
-    import secrets
     return f"sk_{secrets.token_urlsafe(32)}"
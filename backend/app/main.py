@@ -1,11 +1,25 @@
 from contextlib import asynccontextmanager
 import logging
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
-from app.core.database import create_db_and_tables
+from app.core.database import ReadYourWritesMiddleware, engine, read_router
+from app.core.migrations import check_schema, upgrade_database
+from app.core.compression import CompressionMiddleware, compressed_cache
+from app.core.metrics import registry, MetricsMiddleware, register_db_metrics, register_pool_metrics
+from app.core.profiling import ProfilingMiddleware, instrument_engine
 from app.api import auth, datasets, scrape, account, webhooks
+from app.services.dataset_changes import change_feed_compactor
+from app.services.webhook_delivery import webhook_dispatcher
+from app.services.invalidation import invalidation_bus
+from app.services.plan_catalog import plan_catalog
+from app.services.host_limits import host_limits
+from app.services.scrape_dispatcher import scrape_dispatcher
+from app.services.scrape_scheduler import scrape_scheduler
+from app.services.token_revocation import revocation_list
+from app.services.usage import usage_meter
+from app.services.webhook_index import webhook_index
 
 logger = logging.getLogger(__name__)
 
@@ -13,10 +27,37 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events."""
-    # Startup
-    create_db_and_tables()
+    # Startup: the schema is owned by Alembic migrations, not created here
+    if settings.migrate_on_startup:
+        upgrade_database(engine)
+    else:
+        check_schema(engine)
+    await read_router.start()
+    await invalidation_bus.start()
+    await plan_catalog.start()
+    await revocation_list.start()
+    await webhook_index.start()
+    await change_feed_compactor.start()
+    await usage_meter.start()
+    if settings.webhook_dispatcher_enabled:
+        await webhook_dispatcher.start()
+    await scrape_dispatcher.start()
+    if settings.scrape_scheduler_enabled:
+        await scrape_scheduler.start()
     yield
     # Shutdown
+    if settings.scrape_scheduler_enabled:
+        await scrape_scheduler.stop()
+    await scrape_dispatcher.stop()
+    if settings.webhook_dispatcher_enabled:
+        await webhook_dispatcher.stop()
+    await usage_meter.stop()
+    await change_feed_compactor.stop()
+    await webhook_index.stop()
+    await revocation_list.stop()
+    await plan_catalog.stop()
+    await invalidation_bus.stop()
+    await read_router.stop()
 
 
 app = FastAPI(
@@ -42,6 +83,153 @@ app.add_middleware(
     max_age=3600,
 )
 
+# Read-your-writes: after a write, the client's reads stay on the primary (signed cookie or header)
+if settings.database_replica_urls:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# Compression: gzip (br, zstd when installed) negotiated by Accept-Encoding; bodies with an ETag are compressed once
+if settings.compression_enabled:
+    app.add_middleware(CompressionMiddleware)
+
+# Metrics: per-route request counts/latency, DB statement counts/time and background queue stats
+if settings.metrics_enabled or settings.profiling_enabled:
+    instrument_engine(engine)
+    for replica in read_router.replicas:
+        instrument_engine(replica.engine)
+
+if settings.metrics_enabled:
+    register_db_metrics()
+    register_pool_metrics(engine)
+    registry.gauge_callback(
+        "webhook_deliveries_in_flight", "Webhook requests currently awaiting a response.",
+        lambda: webhook_dispatcher.in_flight
+    )
+    registry.counter_callback(
+        "webhook_delivery_results_total", "Webhook outbox rows by final or attempt outcome.",
+        lambda: {
+            ("delivered",): webhook_dispatcher.delivered,
+            ("failed_attempt",): webhook_dispatcher.failed,
+            ("dead",): webhook_dispatcher.dead
+        },
+        ("result",)
+    )
+    registry.counter_callback(
+        "cache_lookups_total", "In-process cache lookups by cache and result.",
+        lambda: {
+            ("webhook_index", "hit"): webhook_index.hits,
+            ("webhook_index", "miss"): webhook_index.misses,
+            ("compressed_responses", "hit"): compressed_cache.hits,
+            ("compressed_responses", "miss"): compressed_cache.misses
+        },
+        ("cache", "result")
+    )
+    registry.counter_callback(
+        "db_read_sessions_total", "Read-only sessions by the database they were routed to.",
+        lambda: {("primary",): read_router.primary_reads, ("replica",): read_router.replica_reads},
+        ("target",)
+    )
+    registry.gauge_callback(
+        "db_replica_lag_seconds", "Replication lag of each read replica at its last health check.",
+        lambda: {(str(i),): replica.lag_seconds for i, replica in enumerate(read_router.replicas)
+                 if replica.lag_seconds is not None},
+        ("replica",)
+    )
+    registry.counter_callback(
+        "cache_invalidations_total", "Cache invalidation messages published by this worker or received from others.",
+        lambda: {("published",): invalidation_bus.published, ("received",): invalidation_bus.received},
+        ("direction",)
+    )
+    registry.counter_callback(
+        "plan_catalog_loads_total", "Plan catalog rebuilds from the pricing_plans table.",
+        lambda: plan_catalog.loads
+    )
+    registry.counter_callback(
+        "dataset_change_feed_compacted_total", "Superseded and expired delete dataset change feed entries removed by compaction.",
+        lambda: change_feed_compactor.compacted
+    )
+    registry.counter_callback(
+        "scrape_schedule_runs_total", "Scrape requests started by recurring schedules in this worker.",
+        lambda: scrape_scheduler.fired
+    )
+    registry.gauge_callback(
+        "scrape_scheduler_pending_triggers", "Schedule triggers held in the scheduler heap (due within the horizon).",
+        lambda: scrape_scheduler.pending
+    )
+    registry.gauge_callback(
+        "scrape_jobs_queued", "Scrape requests waiting in this worker's fair queue, by plan.",
+        lambda: {(plan,): count for plan, count in scrape_dispatcher.queued_by_plan().items()},
+        ("plan",)
+    )
+    registry.gauge_callback(
+        "scrape_jobs_running", "Scrape requests currently being processed by this worker.",
+        lambda: scrape_dispatcher.in_flight
+    )
+    registry.counter_callback(
+        "scrape_jobs_dispatched_total", "Scrape requests taken off the fair queue, by plan.",
+        lambda: {(plan,): count for plan, count in scrape_dispatcher.dispatched.items()},
+        ("plan",)
+    )
+    registry.counter_callback(
+        "scrape_jobs_cancelled_total", "Cancelled scrape requests dropped from the queue or stopped while running.",
+        lambda: {(stage,): count for stage, count in scrape_dispatcher.cancelled.items()},
+        ("stage",)
+    )
+    registry.counter_callback(
+        "token_revocation_checks_total",
+        "Access token revocation checks: passed by the Bloom filter, or looked up as a false positive or revoked.",
+        lambda: {
+            ("filtered",): revocation_list.checks - revocation_list.lookups,
+            ("false_positive",): revocation_list.lookups - revocation_list.revoked,
+            ("revoked",): revocation_list.revoked
+        },
+        ("result",)
+    )
+    registry.gauge_callback(
+        "token_revocation_filter_ids", "Revoked token ids in this worker's Bloom filter.",
+        lambda: revocation_list.filter.count if revocation_list.filter is not None else 0
+    )
+    registry.counter_callback(
+        "usage_events_recorded_total", "Usage events counted by this worker's usage meter.",
+        lambda: usage_meter.recorded
+    )
+    registry.counter_callback(
+        "usage_rollup_rows_flushed_total", "Hourly usage rollup rows written by this worker's flushes.",
+        lambda: usage_meter.flushed_rows
+    )
+    registry.gauge_callback(
+        "usage_pending_buckets", "Per-minute usage buckets held in memory, not yet flushed to the rollups.",
+        lambda: usage_meter.pending
+    )
+    registry.gauge_callback(
+        "scrape_host_concurrency_limit", "Current adaptive limit on concurrent fetches, by target host.",
+        lambda: {(host,): limit.limit for host, limit in list(host_limits.hosts.items())},
+        ("host",)
+    )
+    registry.gauge_callback(
+        "scrape_host_rate_limit", "Current adaptive limit on fetches per second, by target host.",
+        lambda: {(host,): limit.rate for host, limit in list(host_limits.hosts.items())},
+        ("host",)
+    )
+    registry.gauge_callback(
+        "scrape_host_in_flight", "Fetches currently awaiting a response, by target host.",
+        lambda: {(host,): limit.in_flight for host, limit in list(host_limits.hosts.items())},
+        ("host",)
+    )
+    registry.counter_callback(
+        "scrape_host_fetches_total", "Page fetches by target host and outcome (ok, throttled or error without a response).",
+        lambda: {key: count for host, limit in list(host_limits.hosts.items()) for key, count in (
+            ((host, "ok"), limit.responses - limit.throttled),
+            ((host, "throttled"), limit.throttled),
+            ((host, "error"), limit.errors)
+        )},
+        ("host", "result")
+    )
+    app.add_middleware(MetricsMiddleware)
+
+# SQL profiling: Server-Timing header plus N+1 and slow query logging (outermost, so metrics reuse its profile)
+if settings.profiling_enabled:
+    app.add_middleware(ProfilingMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix=settings.api_v1_prefix)
 app.include_router(datasets.router, prefix=settings.api_v1_prefix)
@@ -65,3 +253,11 @@ async def root():
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics endpoint."""
+    if not settings.metrics_enabled:
+        return Response(status_code=404)
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
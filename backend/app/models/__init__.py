@@ -1,8 +1,15 @@
 # Models module
 from .user import User
 from .dataset import Dataset
+from .dataset_change import DatasetChange, DatasetChangeClock
+from .dataset_facet import DatasetFacet
+from .dataset_version import DatasetVersion
 from .scrape_request import ScrapeRequest
+from .scrape_schedule import ScrapeSchedule
 from .pricing_plan import PricingPlan
+from .revoked_token import RevokedToken
+from .usage_rollup import UsageDaily, UsageHourly
 from .webhook import Webhook
+from .webhook_delivery import WebhookDelivery
 
-__all__ = ["User", "Dataset", "ScrapeRequest", "PricingPlan", "Webhook"]
+__all__ = ["User", "Dataset", "DatasetChange", "DatasetChangeClock", "DatasetFacet", "DatasetVersion", "ScrapeRequest", "ScrapeSchedule", "PricingPlan", "RevokedToken", "UsageDaily", "UsageHourly", "Webhook", "WebhookDelivery"]
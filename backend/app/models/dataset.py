@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 from typing import Optional, List
-from sqlmodel import SQLModel, Field, Column, JSON
+from sqlmodel import SQLModel, Field, Column, JSON, Index
 from enum import Enum
 
 
@@ -16,6 +16,8 @@ class Dataset(SQLModel, table=True):
     """Dataset model for marketplace data."""
     
     __tablename__ = "datasets"
+    # Marketplace browsing filters by platform, usually together with category
+    __table_args__ = (Index("ix_datasets_platform_category", "platform", "category"),)
     
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(index=True)
@@ -27,5 +29,6 @@ class Dataset(SQLModel, table=True):
     is_premium: bool = Field(default=False)
     tags: List[str] = Field(default=[], sa_column=Column(JSON))
     preview_data: List[dict] = Field(default=[], sa_column=Column(JSON))
+    current_version: int = Field(default=0)  # latest DatasetVersion.version, 0 before the first ingest
     last_updated: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
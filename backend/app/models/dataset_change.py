@@ -0,0 +1,168 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import and_, bindparam, event, func, insert, literal, select, update
+from sqlalchemy.orm import Session, aliased, object_session
+from sqlmodel import SQLModel, Field, Index
+
+from app.models.dataset import Dataset
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+# Set on a session whose transaction logged entries that still need a commit_seq
+UNSTAMPED_KEY = "unstamped_dataset_changes"
+CLOCK_ID = 1
+
+
+class DatasetChange(SQLModel, table=True):
+    """One entry of the dataset change feed.
+
+    Every insert, update and delete of a dataset appends an entry in the same
+    transaction as the write (mapper events below). Just before that
+    transaction commits, its entries get a `commit_seq` from the change
+    clock; the clock row stays locked until the commit, so commit_seq order
+    is commit order and a mirror that remembers the last commit_seq it
+    applied can fetch just the changes after it, without ever skipping one
+    that committed late. Compaction drops entries superseded by a newer one
+    for the same dataset, which keeps the feed O(datasets) long without
+    losing anything a lagging mirror still needs, and delete entries older
+    than the tombstone retention.
+    """
+
+    __tablename__ = "dataset_changes"
+    __table_args__ = (Index("ix_dataset_changes_dataset_id_seq", "dataset_id", "seq"),)
+
+    seq: Optional[int] = Field(default=None, primary_key=True)
+    # Null until the writing transaction is about to commit, so never visible to readers
+    commit_seq: Optional[int] = Field(default=None, unique=True, index=True)
+    dataset_id: int
+    operation: str  # "upsert" or "delete"
+    changed_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class DatasetChangeClock(SQLModel, table=True):
+    """The single row handing out commit_seq values to committing transactions."""
+
+    __tablename__ = "dataset_change_clock"
+
+    id: int = Field(default=CLOCK_ID, primary_key=True)
+    commit_seq: int = 0  # last value handed out
+    # Delete entries up to this commit_seq were purged: older change tokens may have missed them
+    purged_through: int = 0
+
+
+def record_dataset_change(connection, dataset_id: int, operation: str):
+    connection.execute(insert(DatasetChange.__table__).values(
+        dataset_id=dataset_id, operation=operation, changed_at=datetime.now(timezone.utc)
+    ))
+
+
+def stamp_dataset_changes(connection) -> int:
+    """Give this transaction's entries their commit_seq; returns how many were stamped.
+
+    Entries of other transactions are only visible once committed, and
+    those are stamped already, so every unstamped entry seen here is ours.
+    The clock's UPDATE holds its row lock until the transaction ends: a
+    concurrent committer waits here and stamps after this one commits.
+    """
+    table = DatasetChange.__table__
+    clock = DatasetChangeClock.__table__
+    seqs = connection.execute(
+        select(table.c.seq).where(table.c.commit_seq.is_(None)).order_by(table.c.seq)
+    ).scalars().all()
+    if not seqs:
+        return 0
+    advanced = connection.execute(
+        update(clock).where(clock.c.id == CLOCK_ID).values(commit_seq=clock.c.commit_seq + len(seqs))
+    )
+    if advanced.rowcount:
+        last = connection.execute(select(clock.c.commit_seq).where(clock.c.id == CLOCK_ID)).scalar_one()
+    else:
+        # The clock row was deleted (e.g. a bulk reload emptied every table): restart after the last stamped entry
+        last = (connection.execute(select(func.max(table.c.commit_seq))).scalar() or 0) + len(seqs)
+        connection.execute(insert(clock).values(id=CLOCK_ID, commit_seq=last, purged_through=0))
+    first = last - len(seqs) + 1
+    connection.execute(
+        update(table).where(table.c.seq == bindparam("b_seq")).values(commit_seq=bindparam("b_commit_seq")),
+        [{"b_seq": seq, "b_commit_seq": first + i} for i, seq in enumerate(seqs)]
+    )
+    return len(seqs)
+
+
+def backfill_dataset_changes(connection):
+    """Add an upsert entry for every dataset without one (after bulk loads that bypass the ORM)."""
+    table = DatasetChange.__table__
+    connection.execute(insert(table).from_select(
+        ["dataset_id", "operation", "changed_at"],
+        select(Dataset.id, literal(UPSERT), func.coalesce(Dataset.last_updated, Dataset.created_at))
+        .where(~select(table.c.seq).where(table.c.dataset_id == Dataset.id).exists())
+        .order_by(Dataset.id)
+    ))
+    stamp_dataset_changes(connection)
+
+
+def compact_dataset_changes(connection, tombstones_before: Optional[datetime] = None) -> int:
+    """Delete superseded entries, and delete entries older than `tombstones_before`; returns the number removed.
+
+    Purging delete entries moves the clock's purged_through past them, so
+    change tokens from before then are rejected rather than silently missing
+    those deletes.
+    """
+    table = DatasetChange.__table__
+    newer = aliased(table)
+    removed = connection.execute(table.delete().where(
+        select(newer.c.commit_seq)
+        .where(and_(newer.c.dataset_id == table.c.dataset_id, newer.c.commit_seq > table.c.commit_seq))
+        .exists()
+    )).rowcount
+    if tombstones_before is None:
+        return removed
+
+    expired = and_(table.c.operation == DELETE, table.c.changed_at < tombstones_before)
+    horizon = connection.execute(select(func.max(table.c.commit_seq)).where(expired)).scalar()
+    if horizon is not None:
+        clock = DatasetChangeClock.__table__
+        connection.execute(
+            update(clock).where(clock.c.id == CLOCK_ID, clock.c.purged_through < horizon).values(purged_through=horizon)
+        )
+        removed += connection.execute(table.delete().where(expired, table.c.commit_seq <= horizon)).rowcount
+    return removed
+
+
+def _note_change(target, connection, operation: str):
+    record_dataset_change(connection, target.id, operation)
+    object_session(target).info[UNSTAMPED_KEY] = True
+
+
+@event.listens_for(Dataset, "after_insert")
+def _log_inserted(mapper, connection, target):
+    _note_change(target, connection, UPSERT)
+
+
+@event.listens_for(Dataset, "after_update")
+def _log_updated(mapper, connection, target):
+    # after_update also fires for objects flushed without net changes
+    if object_session(target).is_modified(target, include_collections=False):
+        _note_change(target, connection, UPSERT)
+
+
+@event.listens_for(Dataset, "after_delete")
+def _log_deleted(mapper, connection, target):
+    _note_change(target, connection, DELETE)
+
+
+@event.listens_for(Session, "before_commit")
+def _stamp_changes(session):
+    if session.in_nested_transaction():
+        return
+    # The commit's own flush runs after this hook; entries must exist before they are stamped
+    session.flush()
+    if session.info.pop(UNSTAMPED_KEY, False):
+        stamp_dataset_changes(session.connection())
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_changes(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop(UNSTAMPED_KEY, None)
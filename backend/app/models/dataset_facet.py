@@ -0,0 +1,86 @@
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import SQLModel, Field
+
+from app.models.dataset import Dataset
+
+
+class DatasetFacet(SQLModel, table=True):
+    """Number of datasets per (platform, category, is_premium).
+
+    Kept in step with the datasets table by the mapper events below, in the
+    same transaction as the dataset write, so filter sidebars can read every
+    facet count from a handful of rows instead of counting datasets.
+    """
+
+    __tablename__ = "dataset_facets"
+
+    platform: str = Field(primary_key=True)  # Platform value, e.g. "amazon"
+    category: str = Field(primary_key=True)
+    is_premium: bool = Field(primary_key=True)
+    dataset_count: int = Field(default=0)
+
+
+def _facet_key(platform, category, is_premium) -> dict:
+    platform = getattr(platform, "value", platform)
+    return {"platform": platform, "category": category, "is_premium": bool(is_premium)}
+
+
+def adjust_facet(connection, key: dict, delta: int):
+    """Add `delta` to the count of one facet cell, creating the cell if needed."""
+    table = DatasetFacet.__table__
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(table)
+        statement = insert.values(**key, dataset_count=delta).on_conflict_do_update(
+            index_elements=["platform", "category", "is_premium"],
+            set_={"dataset_count": table.c.dataset_count + insert.excluded.dataset_count}
+        )
+        connection.execute(statement)
+        return
+    updated = connection.execute(
+        table.update()
+        .where(*(table.c[name] == value for name, value in key.items()))
+        .values(dataset_count=table.c.dataset_count + delta)
+    )
+    if updated.rowcount == 0:
+        connection.execute(table.insert().values(**key, dataset_count=delta))
+
+
+def rebuild_dataset_facets(connection):
+    """Recount every facet cell from the datasets table (after bulk loads that bypass the ORM)."""
+    table = DatasetFacet.__table__
+    rows = connection.execute(
+        select(Dataset.platform, Dataset.category, Dataset.is_premium, func.count())
+        .group_by(Dataset.platform, Dataset.category, Dataset.is_premium)
+    ).all()
+    connection.execute(table.delete())
+    if rows:
+        connection.execute(table.insert(), [
+            {**_facet_key(platform, category, is_premium), "dataset_count": count}
+            for platform, category, is_premium, count in rows
+        ])
+
+
+@event.listens_for(Dataset, "after_insert")
+def _count_inserted(mapper, connection, target):
+    adjust_facet(connection, _facet_key(target.platform, target.category, target.is_premium), 1)
+
+
+@event.listens_for(Dataset, "after_delete")
+def _count_deleted(mapper, connection, target):
+    adjust_facet(connection, _facet_key(target.platform, target.category, target.is_premium), -1)
+
+
+@event.listens_for(Dataset, "after_update")
+def _count_moved(mapper, connection, target):
+    state = inspect(target)
+    old = {}
+    for name in ("platform", "category", "is_premium"):
+        history = state.attrs[name].history
+        old[name] = history.deleted[0] if history.deleted else getattr(target, name)
+    old_key = _facet_key(**old)
+    new_key = _facet_key(target.platform, target.category, target.is_premium)
+    if old_key != new_key:
+        adjust_facet(connection, old_key, -1)
+        adjust_facet(connection, new_key, 1)
@@ -0,0 +1,29 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+from sqlmodel import SQLModel, Field, Column, JSON, UniqueConstraint
+
+
+class DatasetVersion(SQLModel, table=True):
+    """One ingested snapshot of a dataset's records and its diff against the previous version.
+
+    The records themselves live in a full record file and a delta record file
+    per version (see app.services.dataset_versions); this row holds what the
+    API reports about them, including a preview and column statistics
+    computed from the records.
+    """
+
+    __tablename__ = "dataset_versions"
+    __table_args__ = (UniqueConstraint("dataset_id", "version", name="uq_dataset_versions_dataset_id_version"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    dataset_id: int = Field(foreign_key="datasets.id", ondelete="CASCADE")
+    version: int
+    key_column: str  # record primary key the diff is computed on
+    record_count: int = Field(default=0)
+    added: int = Field(default=0)
+    changed: int = Field(default=0)
+    removed: int = Field(default=0)
+    size_bytes: int = Field(default=0)
+    preview_data: Optional[List[dict]] = Field(default=None, sa_column=Column(JSON))  # sampled at ingest
+    column_stats: Optional[List[dict]] = Field(default=None, sa_column=Column(JSON))  # profiled at ingest
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -23,6 +23,9 @@ class PricingPlan(SQLModel, table=True):
     api_calls: int  # -1 for unlimited
     datasets: str
     support: str
+    # Entitlements checked by the routers through the plan catalog; granted explicitly
+    custom_scraping: bool = Field(default=False)
+    premium_datasets: bool = Field(default=False)
     is_highlighted: bool = Field(default=False)
     is_active: bool = Field(default=True)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import SQLModel, Field
+
+
+class RevokedToken(SQLModel, table=True):
+    """An access token signed out before it expired, by its JWT id (jti).
+
+    Rows are only needed until the token would have expired anyway; the
+    revocation list deletes them after that (app.services.token_revocation).
+    """
+
+    __tablename__ = "revoked_tokens"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    jti: str = Field(unique=True, index=True)
+    user_id: int = Field(foreign_key="users.id", index=True)
+    # Naive UTC, like the revocation list's refresh cursor
+    expires_at: datetime = Field(index=True)
+    revoked_at: datetime = Field(index=True)
+
+
+def add_revoked_token(connection, row: dict):
+    """Insert a revoked_tokens row (jti, user_id, expires_at, revoked_at) unless its jti is already there.
+
+    Concurrent sign-outs of the same token both succeed; the first insert wins.
+    """
+    table = RevokedToken.__table__
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(table)
+        connection.execute(insert.values(**row).on_conflict_do_nothing(index_elements=["jti"]))
+        return
+    try:
+        with connection.begin_nested():
+            connection.execute(table.insert().values(**row))
+    except IntegrityError:
+        pass
@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 from typing import Optional, List
-from sqlmodel import SQLModel, Field, Column, JSON
+from sqlmodel import SQLModel, Field, Column, JSON, Index
 from enum import Enum
 
 
@@ -15,10 +15,16 @@ class ScrapeRequest(SQLModel, table=True):
     """Scrape request model for custom URL scraping."""
     
     __tablename__ = "scrape_requests"
+    # Serves per-user history (newest first) and per-user counts; also covers user_id lookups.
+    # Recovery finds pending requests and processing ones whose lease expired by status and lease_until.
+    __table_args__ = (
+        Index("ix_scrape_requests_user_id_created_at", "user_id", "created_at"),
+        Index("ix_scrape_requests_status_lease_until", "status", "lease_until")
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
     request_id: str = Field(unique=True, index=True)  # Public facing ID like "req_abc123"
-    user_id: int = Field(foreign_key="users.id", index=True)
+    user_id: int = Field(foreign_key="users.id")
     url: str
     platform: str
     status: ScrapeStatus = Field(default=ScrapeStatus.PENDING)
@@ -29,3 +35,5 @@ class ScrapeRequest(SQLModel, table=True):
     error_message: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     completed_at: Optional[datetime] = None
+    # While PROCESSING: renewed by the running worker; once past, the worker is presumed dead and the request re-run
+    lease_until: Optional[datetime] = None
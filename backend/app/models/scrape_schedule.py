@@ -0,0 +1,28 @@
+from datetime import datetime, timezone
+from typing import Optional, List
+from sqlmodel import SQLModel, Field, Column, JSON, Index
+
+
+class ScrapeSchedule(SQLModel, table=True):
+    """A recurring scrape: every `interval_seconds`, or on a `cron` expression (UTC)."""
+
+    __tablename__ = "scrape_schedules"
+    # The scheduler loads only the active triggers due within its horizon
+    __table_args__ = (Index("ix_scrape_schedules_is_active_next_run_at", "is_active", "next_run_at"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    schedule_id: str = Field(unique=True, index=True)  # Public facing ID like "sch_abc123"
+    user_id: int = Field(foreign_key="users.id", index=True)
+    url: str
+    platform: str
+    fields: List[str] = Field(default=[], sa_column=Column(JSON))
+    webhook_url: Optional[str] = None
+    interval_seconds: Optional[int] = None
+    cron: Optional[str] = None
+    # Each schedule runs at a fixed offset within [0, jitter_seconds) after its nominal time
+    jitter_seconds: int = Field(default=0)
+    is_active: bool = Field(default=True)
+    next_run_at: datetime
+    last_run_at: Optional[datetime] = None
+    run_count: int = Field(default=0)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,55 @@
+from datetime import datetime
+from typing import List, Type, Union
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import SQLModel, Field
+
+
+class UsageHourly(SQLModel, table=True):
+    """Number of usage events of one kind per user and UTC hour.
+
+    Written only by the usage meter (app.services.usage), which adds the
+    counts it gathered in memory in batches; never one row write per event.
+    """
+
+    __tablename__ = "usage_hourly"
+
+    user_id: int = Field(foreign_key="users.id", primary_key=True)
+    bucket_start: datetime = Field(primary_key=True)  # Start of the hour, naive UTC
+    event: str = Field(primary_key=True)  # e.g. "api_call"
+    count: int = Field(default=0)
+
+
+class UsageDaily(SQLModel, table=True):
+    """Number of usage events of one kind per user and UTC day; the same counts as usage_hourly, summed."""
+
+    __tablename__ = "usage_daily"
+
+    user_id: int = Field(foreign_key="users.id", primary_key=True)
+    bucket_start: datetime = Field(primary_key=True)  # Midnight UTC, naive
+    event: str = Field(primary_key=True)
+    count: int = Field(default=0)
+
+
+def add_usage_counts(connection, model: Type[Union[UsageHourly, UsageDaily]], rows: List[dict]):
+    """Add the counts of `rows` (user_id, bucket_start, event, count) to a rollup table in one batch."""
+    if not rows:
+        return
+    table = model.__table__
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(table)
+        connection.execute(insert.on_conflict_do_update(
+            index_elements=["user_id", "bucket_start", "event"],
+            set_={"count": table.c.count + insert.excluded.count}
+        ), rows)
+        return
+    for row in rows:
+        updated = connection.execute(
+            table.update()
+            .where(table.c.user_id == row["user_id"], table.c.bucket_start == row["bucket_start"],
+                   table.c.event == row["event"])
+            .values(count=table.c.count + row["count"])
+        )
+        if updated.rowcount == 0:
+            connection.execute(table.insert().values(**row))
@@ -15,4 +15,11 @@ class Webhook(SQLModel, table=True):
     events: List[str] = Field(default=[], sa_column=Column(JSON))
     is_active: bool = Field(default=True)
     secret: str
+    # Opt-in batched delivery: events are coalesced per endpoint into one signed request
+    batch_enabled: bool = Field(default=False)
+    batch_max_events: int = Field(default=100)
+    batch_max_bytes: int = Field(default=262144)
+    batch_max_delay_seconds: float = Field(default=5.0)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # Bumped by in-place edits, so the webhook index's polling fingerprint sees them
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,33 @@
+from datetime import datetime, timezone
+from typing import Optional
+from sqlmodel import SQLModel, Field, Column, JSON, Index
+from enum import Enum
+
+
+class DeliveryStatus(str, Enum):
+    PENDING = "pending"
+    DELIVERING = "delivering"
+    DELIVERED = "delivered"
+    DEAD = "dead"
+
+
+class WebhookDelivery(SQLModel, table=True):
+    """Outbox entry for a single webhook event delivery."""
+
+    __tablename__ = "webhook_deliveries"
+    # The dispatcher claims due rows (and expired leases) by status and next_attempt_at
+    __table_args__ = (Index("ix_webhook_deliveries_status_next_attempt_at", "status", "next_attempt_at"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    delivery_id: str = Field(unique=True, index=True)  # Public facing ID like "dlv_abc123"
+    webhook_id: int = Field(foreign_key="webhooks.id", ondelete="CASCADE", index=True)
+    event: str
+    payload: dict = Field(default={}, sa_column=Column(JSON))
+    status: DeliveryStatus = Field(default=DeliveryStatus.PENDING)
+    attempts: int = Field(default=0)
+    # When the row is next eligible for dispatch; doubles as the lease expiry while DELIVERING
+    next_attempt_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    response_status: Optional[int] = None
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    delivered_at: Optional[datetime] = None
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Dict, Optional, List, Union
 from app.models.dataset import Platform
 
 
@@ -42,6 +42,42 @@ class DatasetListResponse(BaseModel):
     per_page: int
 
 
+class FacetValue(BaseModel):
+    """Number of datasets with one value of a facet."""
+    value: Union[bool, str]
+    count: int
+
+
+class DatasetFacetsResponse(BaseModel):
+    """Schema for catalog facet counts.
+
+    Each facet's counts apply every filter except the facet's own, so they
+    read as "results if this value were selected".
+    """
+    total: int
+    facets: Dict[str, List[FacetValue]]
+
+
+class DatasetChangeEntry(BaseModel):
+    """One change to the catalog; `dataset` is the current row for upserts and null for deletes."""
+    seq: int
+    op: str  # "upsert" or "delete"
+    dataset_id: int
+    dataset: Optional[DatasetResponse] = None
+
+
+class DatasetChangesResponse(BaseModel):
+    """Schema for a page of the catalog change feed.
+
+    Pass `next_since` as `since` on the next call; keep paging while
+    `has_more` is true. A token older than the delete entries already
+    purged is answered with 410 Gone: sync again from since=0.
+    """
+    changes: List[DatasetChangeEntry]
+    next_since: str
+    has_more: bool
+
+
 class DatasetFilter(BaseModel):
     """Schema for dataset filtering."""
     platform: Optional[Platform] = None
@@ -50,10 +86,22 @@ class DatasetFilter(BaseModel):
     search: Optional[str] = None
 
 
+class DatasetVersionResponse(BaseModel):
+    """Schema for a dataset version and its diff against the previous one."""
+    version: int
+    key_column: str
+    record_count: int
+    added: int
+    changed: int
+    removed: int
+    created_at: str
+
+
 class ExportRequest(BaseModel):
     """Schema for dataset export request."""
     format: str  # csv, json, parquet
     filters: Optional[dict] = None
+    since_version: Optional[int] = None  # only records added, changed or removed after this version
 
 
 class ExportResponse(BaseModel):
@@ -61,3 +109,5 @@ class ExportResponse(BaseModel):
     export_id: str
     download_url: str
     expires_at: str
+    version: Optional[int] = None
+    since_version: Optional[int] = None
@@ -1,6 +1,8 @@
-from pydantic import BaseModel, HttpUrl, field_validator
+from datetime import datetime, timezone
+from pydantic import BaseModel, HttpUrl, field_validator, model_validator
 from typing import Optional, List
 from app.models.scrape_request import ScrapeStatus
+from app.services.cron import CronExpression
 
 
 class ScrapeRequestCreate(BaseModel):
@@ -44,3 +46,54 @@ class ScrapeHistoryResponse(BaseModel):
     """Schema for scrape history response."""
     requests: List[ScrapeRequestResponse]
     total: int
+
+
+class ScrapeScheduleCreate(BaseModel):
+    """Schema for creating a recurring scrape: exactly one of interval_seconds or cron."""
+    url: HttpUrl
+    platform: str
+    fields: Optional[List[str]] = None
+    webhook: Optional[str] = None
+    interval_seconds: Optional[int] = None
+    cron: Optional[str] = None  # five fields or @hourly/@daily/..., in UTC
+    jitter_seconds: int = 0
+    
+    @field_validator('url')
+    @classmethod
+    def validate_url(cls, v: HttpUrl) -> str:
+        return str(v)
+    
+    @field_validator('cron')
+    @classmethod
+    def validate_cron(cls, v: Optional[str]) -> Optional[str]:
+        if v is None:
+            return v
+        cron = CronExpression(v)
+        # Rejects expressions that parse but match no date (e.g. "0 0 30 2 *")
+        cron.next_after(datetime.now(timezone.utc))
+        return cron.expression
+    
+    @model_validator(mode='after')
+    def check_trigger(self) -> 'ScrapeScheduleCreate':
+        if (self.interval_seconds is None) == (self.cron is None):
+            raise ValueError("Specify exactly one of interval_seconds or cron")
+        return self
+
+
+class ScrapeScheduleResponse(BaseModel):
+    """Schema for a recurring scrape."""
+    schedule_id: str
+    url: str
+    platform: str
+    interval_seconds: Optional[int] = None
+    cron: Optional[str] = None
+    jitter_seconds: int
+    next_run_at: str
+    last_run_at: Optional[str] = None
+    run_count: int
+    created_at: str
+
+
+class ScrapeScheduleListResponse(BaseModel):
+    """Schema for a user's recurring scrapes."""
+    schedules: List[ScrapeScheduleResponse]
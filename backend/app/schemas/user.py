@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, field_validator
-from typing import Optional
+from typing import Dict, List, Optional
 from app.models.user import PlanType
 
 
@@ -84,9 +84,25 @@ class PasswordReset(BaseModel):
     email: EmailStr
 
 
+class UsageDay(BaseModel):
+    """Usage events of one UTC day (within the requested range)."""
+    date: str
+    api_calls: int
+    events: Dict[str, int]
+
+
 class UsageResponse(BaseModel):
-    """Schema for API usage statistics."""
+    """Schema for API usage statistics.
+
+    api_calls and events cover [start, end) of the period; quota and remaining
+    always refer to the current billing period (the calendar month, UTC).
+    """
+    period: str
+    start: str
+    end: str
     api_calls: int
+    events: Dict[str, int] = {}
+    daily: List[UsageDay] = []
     quota: int
     remaining: int
     reset_date: Optional[str] = None
@@ -0,0 +1,259 @@
+"""Column statistics of dataset versions, computed once at ingest.
+
+Every column of a version's record file gets its row and null counts, an
+estimated number of distinct values (HyperLogLog) and a histogram; numeric
+columns also get min, max and mean, string columns the same over their
+lengths in UTF-8 bytes. Columns are read as raw blocks (RecordFile.raw_column)
+and processed whole: with NumPy installed every pass is vectorized, otherwise
+the same statistics come from the array module and plain loops, more slowly.
+The two hash strings differently, so their distinct estimates of a string
+column can differ slightly. Ingest rejects non-finite floats, but should a
+record file hold any, both leave them out of min, max, mean and histogram
+and report them as non_finite_count.
+Record files cannot hold nulls, so null counts are always zero; they are
+reported so the shape of the statistics does not depend on the storage.
+"""
+import hashlib
+import math
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+from app.services.records import RecordFile
+
+try:
+    import numpy
+except ImportError:  # optional: statistics are computed without vectorization
+    numpy = None
+
+HISTOGRAM_BINS = 20
+
+# 2^14 registers: about 0.8% standard error on distinct counts, 16 KiB while profiling a column
+HLL_PRECISION = 14
+_HLL_REGISTERS = 1 << HLL_PRECISION
+_HLL_VALUE_BITS = 64 - HLL_PRECISION
+_MASK = (1 << 64) - 1
+
+# Odd multiplier of the vectorized string hash, and its inverse modulo 2^64
+_STRING_MULTIPLIER = 0x100000001B3
+_STRING_MULTIPLIER_INVERSE = pow(_STRING_MULTIPLIER, -1, 1 << 64)
+_STRING_CHUNK_BYTES = 4 * 1024 * 1024
+
+
+def _mix(value: int) -> int:
+    # splitmix64 finalizer: spreads any 64-bit pattern evenly over 64 bits
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK
+    return value ^ (value >> 31)
+
+
+def _string_hash(value: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), "little")
+
+
+def hll_estimate(registers) -> int:
+    """Distinct count estimated from HyperLogLog registers (with the small-range correction)."""
+    m = _HLL_REGISTERS
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / math.fsum(2.0 ** -int(rank) for rank in registers)
+    zeros = sum(1 for rank in registers if rank == 0)
+    if estimate <= 2.5 * m and zeros:
+        estimate = m * math.log(m / zeros)
+    return round(estimate)
+
+
+def _hll_registers(hashes: Iterable[int]) -> bytearray:
+    registers = bytearray(_HLL_REGISTERS)
+    low_bits = (1 << _HLL_VALUE_BITS) - 1
+    for value in hashes:
+        index = value >> _HLL_VALUE_BITS
+        rank = _HLL_VALUE_BITS - (value & low_bits).bit_length() + 1
+        if rank > registers[index]:
+            registers[index] = rank
+    return registers
+
+
+def _numpy_hll_registers(hashes) -> "numpy.ndarray":
+    index = (hashes >> numpy.uint64(_HLL_VALUE_BITS)).astype(numpy.intp)
+    rest = hashes & numpy.uint64((1 << _HLL_VALUE_BITS) - 1)
+    # rest < 2^50 converts to float64 exactly, so frexp's exponent is its bit length (0 for 0)
+    _, bit_length = numpy.frexp(rest.astype(numpy.float64))
+    ranks = (_HLL_VALUE_BITS + 1 - bit_length).astype(numpy.uint8)
+    registers = numpy.zeros(_HLL_REGISTERS, dtype=numpy.uint8)
+    numpy.maximum.at(registers, index, ranks)
+    return registers
+
+
+def _numpy_mix(values) -> "numpy.ndarray":
+    values = values ^ (values >> numpy.uint64(30))
+    values = values * numpy.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> numpy.uint64(27))
+    values = values * numpy.uint64(0x94D049BB133111EB)
+    return values ^ (values >> numpy.uint64(31))
+
+
+def _histogram(low: float, high: float, counts: List[int]) -> dict:
+    step = (high - low) / len(counts)
+    return {"edges": [low + step * i for i in range(len(counts))] + [high], "counts": counts}
+
+
+def _summary(count: int, low, high, total, histogram_counts: List[int], distinct: int, prefix: str = "") -> dict:
+    return {
+        f"min{prefix}": low,
+        f"max{prefix}": high,
+        f"mean{prefix}": total / count if count else None,
+        "distinct_estimate": distinct,
+        "histogram": _histogram(float(low), float(high), histogram_counts) if count else None
+    }
+
+
+def _numeric_summary(column_type: str, non_finite: int, summary: dict) -> dict:
+    if column_type == "float":
+        summary["non_finite_count"] = non_finite
+    return summary
+
+
+def _bins(low: float, high: float, count: int) -> int:
+    return HISTOGRAM_BINS if count and high > low else 1
+
+
+# Pure-Python passes over one column
+
+def _words(block: bytes, typecode: str) -> array:
+    values = array(typecode)
+    values.frombytes(block)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _python_histogram(values, low: float, high: float, bins: int) -> List[int]:
+    counts = [0] * bins
+    if bins == 1:
+        counts[0] = len(values)
+        return counts
+    scale = bins / (high - low)
+    last = bins - 1
+    for value in values:
+        counts[min(int((value - low) * scale), last)] += 1
+    return counts
+
+
+def _python_numeric(block: bytes, column_type: str) -> dict:
+    values = _words(block, "q" if column_type == "int" else "d")
+    non_finite = 0
+    if column_type == "float":
+        finite = array("d", (value for value in values if math.isfinite(value)))
+        non_finite = len(values) - len(finite)
+        values = finite
+    count = len(values)
+    low, high = (min(values), max(values)) if count else (0, 0)
+    total = sum(values) if column_type == "int" else math.fsum(values)
+    distinct = hll_estimate(_hll_registers(_mix(bits) for bits in _words(block, "Q")))
+    histogram = _python_histogram(values, low, high, _bins(low, high, count))
+    return _numeric_summary(column_type, non_finite, _summary(count, low, high, total, histogram, distinct))
+
+
+def _python_strings(block: bytes, rows: int) -> dict:
+    offsets = _words(block[:(rows + 1) * 8], "q")
+    data = memoryview(block)[(rows + 1) * 8:]
+    lengths = array("q", (offsets[i + 1] - offsets[i] for i in range(rows)))
+    distinct = hll_estimate(_hll_registers(_string_hash(data[offsets[i]:offsets[i + 1]]) for i in range(rows)))
+    low, high = (min(lengths), max(lengths)) if rows else (0, 0)
+    histogram = _python_histogram(lengths, low, high, _bins(low, high, rows))
+    return _summary(rows, low, high, sum(lengths), histogram, distinct, prefix="_length")
+
+
+# Vectorized passes over one column
+
+def _numpy_numeric(block: bytes, column_type: str) -> dict:
+    values = numpy.frombuffer(block, dtype="<i8" if column_type == "int" else "<f8")
+    non_finite = 0
+    if column_type == "float":
+        finite = numpy.isfinite(values)
+        non_finite = len(values) - int(finite.sum())
+        if non_finite:
+            values = values[finite]
+    distinct = hll_estimate(_numpy_hll_registers(_numpy_mix(numpy.frombuffer(block, dtype="<u8"))).tolist())
+    count = len(values)
+    if not count:
+        return _numeric_summary(column_type, non_finite, _summary(0, 0, 0, 0, [], distinct))
+    low, high = values.min().item(), values.max().item()
+    total = values.sum(dtype=numpy.float64).item()
+    bins = _bins(low, high, count)
+    histogram, _ = numpy.histogram(values, bins=bins, range=(low, high) if high > low else None)
+    return _numeric_summary(column_type, non_finite, _summary(count, low, high, total, histogram.tolist(), distinct))
+
+
+def _numpy_string_hashes(offsets, data) -> "numpy.ndarray":
+    # Polynomial hash sum(byte[j] * P^(j - start)) mod 2^64 of every string at once: prefix sums of
+    # byte[j] * P^j, differenced per string and rescaled by P^-start (P is odd, so invertible mod 2^64)
+    rows = len(offsets) - 1
+    hashes = numpy.empty(rows, dtype=numpy.uint64)
+    first = 0
+    while first < rows:
+        # Chunks of about _STRING_CHUNK_BYTES keep the temporary arrays small
+        last = max(int(numpy.searchsorted(offsets, offsets[first] + _STRING_CHUNK_BYTES, side="right")) - 1, first + 1)
+        last = min(last, rows)
+        base = int(offsets[first])
+        chunk = data[base:int(offsets[last])].astype(numpy.uint64)
+        powers = numpy.full(len(chunk) + 1, _STRING_MULTIPLIER, dtype=numpy.uint64)
+        powers[0] = 1
+        inverse_powers = numpy.full(len(chunk) + 1, _STRING_MULTIPLIER_INVERSE, dtype=numpy.uint64)
+        inverse_powers[0] = 1
+        numpy.cumprod(powers, out=powers)
+        numpy.cumprod(inverse_powers, out=inverse_powers)
+        prefix = numpy.zeros(len(chunk) + 1, dtype=numpy.uint64)
+        numpy.cumsum(chunk * powers[:-1], out=prefix[1:])
+        starts = (offsets[first:last] - base).astype(numpy.intp)
+        ends = (offsets[first + 1:last + 1] - base).astype(numpy.intp)
+        raw = (prefix[ends] - prefix[starts]) * inverse_powers[starts]
+        # Mix in the length, so strings differing only by trailing NUL bytes differ
+        raw ^= (ends - starts).astype(numpy.uint64) * numpy.uint64(0x9E3779B97F4A7C15)
+        hashes[first:last] = _numpy_mix(raw)
+        first = last
+    return hashes
+
+
+def _numpy_strings(block: bytes, rows: int) -> dict:
+    if not rows:
+        return _summary(0, 0, 0, 0, [], 0, prefix="_length")
+    offsets = numpy.frombuffer(block, dtype="<i8", count=rows + 1)
+    data = numpy.frombuffer(block, dtype=numpy.uint8, offset=(rows + 1) * 8)
+    lengths = numpy.diff(offsets)
+    distinct = hll_estimate(_numpy_hll_registers(_numpy_string_hashes(offsets, data)).tolist())
+    low, high = int(lengths.min()), int(lengths.max())
+    bins = _bins(low, high, rows)
+    histogram, _ = numpy.histogram(lengths, bins=bins, range=(low, high) if high > low else None)
+    return _summary(rows, low, high, int(lengths.sum()), histogram.tolist(), distinct, prefix="_length")
+
+
+def _booleans(block: bytes, rows: int) -> dict:
+    true_count = rows - block.count(0)
+    return {
+        "true_count": true_count,
+        "false_count": rows - true_count,
+        "mean": true_count / rows if rows else None,
+        "distinct_estimate": (true_count > 0) + (true_count < rows)
+    }
+
+
+def column_stats(records: RecordFile, name: str, vectorized: Optional[bool] = None) -> dict:
+    """Statistics of one column of a record file (vectorized defaults to whether NumPy is installed)."""
+    vectorized = numpy is not None if vectorized is None else vectorized
+    column_type = records.schema[name]
+    block = records.raw_column(name)
+    stats = {"name": name, "type": column_type, "count": records.rows, "null_count": 0}
+    if column_type == "bool":
+        stats.update(_booleans(block, records.rows))
+    elif column_type == "str":
+        stats.update((_numpy_strings if vectorized else _python_strings)(block, records.rows))
+    else:
+        stats.update((_numpy_numeric if vectorized else _python_numeric)(block, column_type))
+    return stats
+
+
+def profile_record_file(path: str) -> List[Dict]:
+    """Statistics of every column of a record file, in file order."""
+    with RecordFile(path) as records:
+        return [column_stats(records, name) for name in records.schema]
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+from typing import FrozenSet
+
+# (name, first value, last value) of the five standard cron fields
+_FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day of month", 1, 31), ("month", 1, 12), ("day of week", 0, 7))
+
+_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *"
+}
+
+
+def _parse_field(text: str, name: str, low: int, high: int) -> FrozenSet[int]:
+    values = set()
+    for part in text.split(","):
+        spec, _, step_text = part.partition("/")
+        try:
+            step = int(step_text) if step_text else 1
+            if spec == "*":
+                start, end = low, high
+            elif "-" in spec:
+                start_text, end_text = spec.split("-", 1)
+                start, end = int(start_text), int(end_text)
+            else:
+                start = int(spec)
+                end = high if step_text else start
+        except ValueError:
+            raise ValueError(f"Invalid cron {name} field {part!r}") from None
+        if step < 1:
+            raise ValueError(f"Invalid step in cron {name} field {part!r}")
+        if not low <= start <= end <= high:
+            raise ValueError(f"Cron {name} field {part!r} is outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+    if name == "day of week":
+        # Both 0 and 7 mean Sunday
+        values = {value % 7 for value in values}
+    return frozenset(values)
+
+
+class CronExpression:
+    """A five-field cron expression (minute hour day-of-month month day-of-week), evaluated in UTC.
+
+    Supports `*`, lists, ranges, steps and the @hourly/@daily/... aliases. As
+    in cron, when both day fields are restricted a day matching either one
+    fires.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        text = _ALIASES.get(self.expression.lower(), self.expression)
+        parts = text.split()
+        if len(parts) != len(_FIELDS):
+            raise ValueError("A cron expression has five fields: minute hour day-of-month month day-of-week")
+        fields = [_parse_field(part, *field) for part, field in zip(parts, _FIELDS)]
+        self.minutes, self.hours, self.days, self.months, self.weekdays = fields
+        self._any_day = parts[2] == "*"
+        self._any_weekday = parts[4] == "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        # datetime.weekday() counts from Monday; cron counts from Sunday
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, moment: datetime) -> datetime:
+        """The first matching minute strictly after `moment`."""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Skip whole months, days and hours that cannot match instead of testing every minute
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.month, 12)
+                candidate = candidate.replace(year=candidate.year + year, month=month + 1, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+        raise ValueError(f"Cron expression {self.expression!r} never fires")
+
+    def __repr__(self) -> str:
+        return f"CronExpression({self.expression!r})"
+
@@ -0,0 +1,59 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.core.config import settings
+from app.core.database import engine
+from app.models.dataset_change import compact_dataset_changes
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeFeedCompactor:
+    """Periodically drops change feed entries superseded by newer ones, and expired delete entries.
+
+    Compaction is idempotent, so every worker may run it; the delete only
+    touches rows that are already dead or past the tombstone retention.
+    """
+
+    def __init__(self, bind=None):
+        self.bind = bind if bind is not None else engine
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self.compacted = 0
+
+    def compact(self) -> int:
+        retention = timedelta(seconds=settings.change_feed_tombstone_retention_seconds)
+        with self.bind.begin() as connection:
+            removed = compact_dataset_changes(connection, tombstones_before=datetime.now(timezone.utc) - retention)
+        self.compacted += removed
+        return removed
+
+    async def start(self):
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.change_feed_compaction_seconds)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                break
+            try:
+                removed = await asyncio.to_thread(self.compact)
+                if removed:
+                    logger.info("Compacted %d dataset change feed entries", removed)
+            except Exception:
+                logger.exception("Dataset change feed compaction failed")
+
+
+change_feed_compactor = ChangeFeedCompactor()
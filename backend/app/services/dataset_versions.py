@@ -0,0 +1,305 @@
+"""Dataset versions: record-level diffs computed at ingest, and delta reads across versions.
+
+Each ingest writes two record files (app.services.records): the full
+records of the new version and a delta holding only the records added,
+changed or removed since the previous version, with their operation in the
+`_op` column. Records are matched across versions on a key column and
+compared by a blake2b digest of their encoded values, so the diff is one
+pass over each version and holds 16 bytes per previous record. A delta export since any older version replays the deltas in
+between and only ever reads changed records.
+
+Record files are written under per-ingest staging names and renamed into
+place only once the version row commits, so an ingest that loses a race
+for the same version number (SQLite ignores the dataset row lock) never
+overwrites the files of the version that won.
+"""
+import hashlib
+import math
+import os
+import struct
+import uuid
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from app.models.dataset import Dataset
+from app.models.dataset_version import DatasetVersion
+from app.services.column_stats import profile_record_file
+from app.services.previews import build_preview
+from app.services.records import RecordFile, version_path, write_record_file
+
+ADDED = "added"
+CHANGED = "changed"
+REMOVED = "removed"
+OP_COLUMN = "_op"
+
+# Placeholder values of a removed record's non-key columns in a delta file
+_EMPTY = {"int": 0, "float": 0.0, "bool": False, "str": ""}
+
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+# session.info key of the (staged path, final path) pairs renamed when the session commits
+STAGED_KEY = "staged_record_files"
+
+
+class RecordColumns:
+    """Columns built from flat records added one at a time, e.g. as an upload streams in.
+
+    Every record must have the same fields, and each field must hold only
+    booleans, only numbers or only strings. Numbers must be finite and
+    integers must fit in 64 bits, as record files store them.
+    """
+
+    def __init__(self):
+        self.columns: Optional[Dict[str, list]] = None
+
+    def add(self, record: dict):
+        if not isinstance(record, dict):
+            raise ValueError("Every record must be an object")
+        if self.columns is None:
+            if OP_COLUMN in record:
+                raise ValueError(f"{OP_COLUMN} is a reserved field name")
+            self.columns = {name: [] for name in record}
+        elif record.keys() != self.columns.keys():
+            raise ValueError("Every record must have the same fields")
+        for name, values in self.columns.items():
+            values.append(record[name])
+
+    def finish(self) -> Tuple[Dict[str, list], Dict[str, str]]:
+        """The columns and their record-file types."""
+        if not self.columns:
+            raise ValueError("A version needs at least one record")
+        columns = self.columns
+        types = {}
+        for name, values in columns.items():
+            kinds = {type(value) for value in values}
+            if kinds == {bool}:
+                types[name] = "bool"
+            elif kinds == {int}:
+                if min(values) < _INT64_MIN or max(values) > _INT64_MAX:
+                    raise ValueError(f"Field {name!r} holds integers beyond 64 bits")
+                types[name] = "int"
+            elif kinds <= {int, float}:
+                try:
+                    values = [float(value) for value in values]
+                except OverflowError as e:
+                    raise ValueError(f"Field {name!r} holds a number too large for a float") from e
+                if not all(map(math.isfinite, values)):
+                    raise ValueError(f"Field {name!r} holds a non-finite number")
+                types[name] = "float"
+                columns[name] = values
+            elif kinds == {str}:
+                types[name] = "str"
+            else:
+                raise ValueError(f"Field {name!r} must hold only booleans, only numbers or only strings")
+        return columns, types
+
+
+def columns_from_records(records: Iterable[dict]) -> Tuple[Dict[str, list], Dict[str, str]]:
+    """Turn flat records into columns and their record-file types (see RecordColumns)."""
+    builder = RecordColumns()
+    for record in records:
+        builder.add(record)
+    return builder.finish()
+
+
+_LENGTH = struct.Struct("<I")
+_NUMBER = {"int": struct.Struct("<q"), "bool": struct.Struct("<q"), "float": struct.Struct("<d")}
+
+
+def _fingerprint(row: tuple, types: List[str]) -> bytes:
+    """A digest of a record's values, stable across processes; booleans read back as 0/1 digest like True/False."""
+    digest = hashlib.blake2b(digest_size=16)
+    for value, column_type in zip(row, types):
+        if column_type == "str":
+            encoded = value.encode()
+            digest.update(_LENGTH.pack(len(encoded)))
+            digest.update(encoded)
+        else:
+            digest.update(_NUMBER[column_type].pack(value))
+    return digest.digest()
+
+
+def diff_records(
+    previous: Optional[RecordFile],
+    columns: Dict[str, Sequence],
+    types: Dict[str, str],
+    key: str
+) -> Tuple[Dict[str, list], Dict[str, str], Dict[str, int]]:
+    """Delta columns (with `_op`), their types and per-operation counts of `columns` against `previous`."""
+    names = list(columns)
+    keys = columns[key]
+    if len(set(keys)) != len(keys):
+        raise ValueError(f"Key field {key!r} has duplicate values")
+
+    key_index = names.index(key)
+    column_types = [types[name] for name in names]
+
+    # key -> digest of the record's values; only a matching schema makes digests comparable
+    fingerprints = {}
+    same_schema = False
+    if previous is not None:
+        if key not in previous.schema:
+            raise ValueError(f"Key field {key!r} is missing from the previous version")
+        same_schema = previous.schema == types
+        if same_schema:
+            # Read in the new field order, which may differ from the previous file's
+            previous_rows = zip(*(previous.column(name) for name in names))
+            fingerprints = {row[key_index]: _fingerprint(row, column_types) for row in previous_rows}
+        else:
+            fingerprints = dict.fromkeys(previous.column(key), b"")
+
+    delta = {OP_COLUMN: [], **{name: [] for name in names}}
+    counts = {ADDED: 0, CHANGED: 0, REMOVED: 0}
+    for row in zip(*(columns[name] for name in names)):
+        record_key = row[key_index]
+        fingerprint = fingerprints.pop(record_key, None)
+        if fingerprint is None:
+            op = ADDED
+        elif not same_schema or fingerprint != _fingerprint(row, column_types):
+            op = CHANGED
+        else:
+            continue
+        counts[op] += 1
+        delta[OP_COLUMN].append(op)
+        for name, value in zip(names, row):
+            delta[name].append(value)
+    # Whatever the new version did not mention was removed; only its key is meaningful
+    for record_key in fingerprints:
+        counts[REMOVED] += 1
+        delta[OP_COLUMN].append(REMOVED)
+        for name in names:
+            delta[name].append(record_key if name == key else _EMPTY[types[name]])
+    return delta, {OP_COLUMN: "str", **types}, counts
+
+
+def ingest_version(
+    session: Session,
+    dataset: Dataset,
+    columns: Dict[str, Sequence],
+    types: Dict[str, str],
+    key: str,
+    records_dir: Optional[str] = None
+) -> DatasetVersion:
+    """Store `columns` as the next version of `dataset` and diff it against the current one.
+
+    Writes the record files, then adds the version row and updates the
+    dataset in `session`, its preview replaced by a sample of the new
+    records. Column statistics are profiled from the written file. The
+    caller commits; the record files take their final names only then,
+    and are deleted if the session rolls back instead.
+    """
+    if key not in columns:
+        raise ValueError(f"Key field {key!r} is not a field of the records")
+    previous = None
+    if dataset.current_version:
+        previous = session.exec(
+            select(DatasetVersion).where(
+                DatasetVersion.dataset_id == dataset.id, DatasetVersion.version == dataset.current_version
+            )
+        ).first()
+    if previous is not None and previous.key_column != key:
+        raise ValueError(f"Versions of this dataset are keyed on {previous.key_column!r}")
+
+    number = dataset.current_version + 1
+    previous_path = version_path(dataset.id, previous.version, records_dir=records_dir) if previous else None
+    with RecordFile(previous_path) if previous_path else nullcontext() as previous_file:
+        delta, delta_types, counts = diff_records(previous_file, columns, types, key)
+    path = _stage(session, version_path(dataset.id, number, records_dir=records_dir))
+    size = write_record_file(path, columns, types)
+    delta_path = _stage(session, version_path(dataset.id, number, delta=True, records_dir=records_dir))
+    write_record_file(delta_path, delta, delta_types)
+    names = list(columns)
+    preview = build_preview(names, zip(*(columns[name] for name in names)), f"{dataset.id}:{number}")
+    stats = profile_record_file(path)
+
+    version = DatasetVersion(
+        dataset_id=dataset.id,
+        version=number,
+        key_column=key,
+        record_count=len(columns[key]),
+        added=counts[ADDED],
+        changed=counts[CHANGED],
+        removed=counts[REMOVED],
+        size_bytes=size,
+        preview_data=preview,
+        column_stats=stats
+    )
+    dataset.current_version = number
+    dataset.preview_data = preview
+    dataset.record_count = version.record_count
+    dataset.last_updated = datetime.now(timezone.utc)
+    session.add(version)
+    session.add(dataset)
+    return version
+
+
+def _stage(session: Session, path: str) -> str:
+    """A unique path to write `path` under until `session` commits."""
+    staged = f"{path}.{uuid.uuid4().hex}.staged"
+    session.info.setdefault(STAGED_KEY, []).append((staged, path))
+    return staged
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_staged(session):
+    for staged, path in session.info.pop(STAGED_KEY, ()):
+        os.replace(staged, path)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_staged(session, transaction):
+    # Files still staged when the outermost transaction ends (rolled back or closed) were never committed
+    if transaction.parent is None:
+        for staged, _ in session.info.pop(STAGED_KEY, ()):
+            try:
+                os.remove(staged)
+            except FileNotFoundError:
+                pass
+
+
+def iter_version_records(dataset_id: int, version: int, records_dir: Optional[str] = None) -> Iterator[dict]:
+    """Every record of one version."""
+    with RecordFile(version_path(dataset_id, version, records_dir=records_dir)) as records:
+        yield from records.iter_rows()
+
+
+def iter_changes(
+    dataset_id: int,
+    key: str,
+    since_version: int,
+    version: int,
+    records_dir: Optional[str] = None
+) -> Iterator[dict]:
+    """Records added, changed or removed between `since_version` and `version`, each with its `_op`.
+
+    Replays the deltas of the versions in between, keeping the latest state
+    of each touched key, so memory and reads are proportional to the number
+    of changed records rather than the size of the dataset. Removed records
+    carry only their key.
+    """
+    existed_before: Dict[object, bool] = {}
+    latest: Dict[object, dict] = {}
+    for number in range(since_version + 1, version + 1):
+        path = version_path(dataset_id, number, delta=True, records_dir=records_dir)
+        with RecordFile(path) as delta:
+            for row in delta.iter_rows():
+                record_key = row[key]
+                op = row.pop(OP_COLUMN)
+                if record_key not in existed_before:
+                    existed_before[record_key] = op != ADDED
+                latest[record_key] = None if op == REMOVED else row
+    for record_key, row in latest.items():
+        if row is not None:
+            yield {OP_COLUMN: CHANGED if existed_before[record_key] else ADDED, **row}
+        elif existed_before[record_key]:
+            yield {OP_COLUMN: REMOVED, key: record_key}
+
+
+def version_files_exist(dataset_id: int, since_version: int, version: int, records_dir: Optional[str] = None) -> bool:
+    paths = [version_path(dataset_id, version, records_dir=records_dir)]
+    paths += [version_path(dataset_id, n, delta=True, records_dir=records_dir) for n in range(since_version + 1, version + 1)]
+    return all(os.path.exists(path) for path in paths)
@@ -0,0 +1,236 @@
+import asyncio
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.core.config import settings
+
+THROTTLE_STATUSES = (429, 503)
+
+# Multiplicative decrease applied to both limits when a host pushes back
+BACKOFF_FACTOR = 0.5
+
+# Attempts of one fetch, counting retries of throttled responses
+MAX_ATTEMPTS = 3
+
+# Latency above the baseline by less than this is jitter, not a sign of overload
+LATENCY_SLACK_SECONDS = 0.05
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delay-seconds or HTTP-date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    current = time.time() if now is None else now
+    return max(moment.timestamp() - current, 0.0)
+
+
+class HostLimit:
+    """AIMD limits on the concurrency and request rate towards one host.
+
+    Requests take a slot (at most `limit` in flight) and a token from a
+    bucket refilled at `rate` per second. Every response that comes back
+    quickly raises whichever limit held requests back: exponentially until
+    the host first pushes back (slow start), additively after that. A 429 or
+    503, or a smoothed latency above `latency_tolerance` times the fastest
+    seen, halves both, at most once per round trip so a burst of throttled
+    responses counts once; so does a transport error or timeout, the usual
+    sign of a host too overloaded to answer. A Retry-After header holds every request to the
+    host until it expires. Times are monotonic seconds.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        concurrency: float,
+        max_concurrency: float,
+        rate: float,
+        max_rate: float,
+        latency_tolerance: float,
+        max_retry_after: float
+    ):
+        self.host = host
+        self.limit = concurrency
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.max_rate = max_rate
+        self.latency_tolerance = latency_tolerance
+        self.max_retry_after = max_retry_after
+        self.tokens = 1.0
+        self.refilled_at = time.monotonic()
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.baseline_latency: Optional[float] = None
+        self.latency: Optional[float] = None
+        self.decreased_at = float("-inf")
+        self.slow_start = True
+        self.responses = 0
+        self.throttled = 0
+        self.errors = 0
+        self._changed: Optional[asyncio.Condition] = None
+
+    def _refill(self, now: float):
+        # The bucket holds up to one second's worth of tokens
+        self.tokens = min(self.tokens + (now - self.refilled_at) * self.rate, max(self.rate, 1.0))
+        self.refilled_at = now
+
+    def wait_time(self, now: float) -> Optional[float]:
+        """Seconds until a request may start (0 if now), or None while every slot is taken."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.in_flight >= max(int(self.limit), 1):
+            return None
+        self._refill(now)
+        if self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        return 0.0
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+        self.in_flight += 1
+
+    def record(
+        self,
+        now: float,
+        status_code: Optional[int],
+        latency: float,
+        retry_after: Optional[float] = None,
+        failed: bool = False
+    ):
+        """Release a slot and adapt the limits to the response.
+
+        status_code is None when there was no response: `failed` for a
+        transport error or timeout, otherwise the request was abandoned
+        (cancelled), which says nothing about the host.
+        """
+        # Only a limit that is actually holding requests back is raised
+        concurrency_bound = self.in_flight >= int(self.limit)
+        self._refill(now)
+        rate_bound = self.tokens < 1
+        self.in_flight -= 1
+        if status_code is None:
+            if failed:
+                self.errors += 1
+                self._decrease(now)
+            return
+        self.responses += 1
+        if status_code in THROTTLE_STATUSES:
+            self.throttled += 1
+            if retry_after is not None:
+                self.blocked_until = max(self.blocked_until, now + min(retry_after, self.max_retry_after))
+            self._decrease(now)
+            return
+        if self.baseline_latency is None or latency < self.baseline_latency:
+            self.baseline_latency = latency
+        else:
+            # Drift up slowly, so a host that got permanently slower is not throttled forever
+            self.baseline_latency += (latency - self.baseline_latency) * 0.01
+        self.latency = latency if self.latency is None else self.latency * 0.8 + latency * 0.2
+        slow = max(self.baseline_latency * self.latency_tolerance, self.baseline_latency + LATENCY_SLACK_SECONDS)
+        if self.latency > slow:
+            self._decrease(now)
+            return
+        if concurrency_bound:
+            # Doubles every round trip until the host first pushes back, then grows by one per round trip
+            self.limit = min(self.limit + (1.0 if self.slow_start else 1 / self.limit), self.max_concurrency)
+        if rate_bound:
+            # Doubles every second until the host first pushes back, then grows by a tenth of a request per response
+            self.rate = min(self.rate + (1.0 if self.slow_start else 0.1), self.max_rate)
+
+    def _decrease(self, now: float):
+        if now - self.decreased_at < max(self.latency or 0.0, 0.1):
+            return
+        self.decreased_at = now
+        self.slow_start = False
+        self.limit = max(self.limit * BACKOFF_FACTOR, 1.0)
+        self.rate = max(self.rate * BACKOFF_FACTOR, 0.1)
+        self.tokens = min(self.tokens, 1.0)
+
+    async def acquire(self):
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        async with self._changed:
+            while True:
+                wait = self.wait_time(time.monotonic())
+                if wait == 0.0:
+                    self.take(time.monotonic())
+                    return
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def release(
+        self,
+        status_code: Optional[int],
+        latency: float,
+        retry_after: Optional[float] = None,
+        failed: bool = False
+    ):
+        async with self._changed:
+            self.record(time.monotonic(), status_code, latency, retry_after, failed)
+            self._changed.notify_all()
+
+
+class HostLimits:
+    """The HostLimit of every host fetched by this process, shared by all scrape jobs."""
+
+    def __init__(self):
+        self.hosts: Dict[str, HostLimit] = {}
+
+    def get(self, host: str) -> HostLimit:
+        limit = self.hosts.get(host)
+        if limit is None:
+            limit = self.hosts[host] = HostLimit(
+                host,
+                concurrency=settings.scrape_host_initial_concurrency,
+                max_concurrency=settings.scrape_host_max_concurrency,
+                rate=settings.scrape_host_initial_rate,
+                max_rate=settings.scrape_host_max_rate,
+                latency_tolerance=settings.scrape_host_latency_tolerance,
+                max_retry_after=settings.scrape_host_max_retry_after_seconds
+            )
+        return limit
+
+    async def fetch(self, client: httpx.AsyncClient, url: str, host: Optional[str] = None, **kwargs) -> httpx.Response:
+        """GET `url` within the limits of `host` (default: the URL's), retrying throttled responses.
+
+        Throttled responses are retried after their Retry-After. Returns the
+        last response, which is still a 429 or 503 if every attempt was
+        throttled; transport errors propagate, after backing off the host.
+        """
+        limit = self.get((host or urlsplit(url).netloc).lower())
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            await limit.acquire()
+            started = time.monotonic()
+            status_code = None
+            retry_after = None
+            failed = False
+            try:
+                response = await client.get(url, **kwargs)
+                status_code = response.status_code
+                retry_after = parse_retry_after(response.headers.get("retry-after"))
+            except httpx.TransportError:
+                failed = True
+                raise
+            finally:
+                await limit.release(status_code, time.monotonic() - started, retry_after, failed)
+            if status_code not in THROTTLE_STATUSES or attempt == MAX_ATTEMPTS:
+                return response
+
+
+host_limits = HostLimits()
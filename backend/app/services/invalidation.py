@@ -0,0 +1,445 @@
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import queue
+import socket
+import tempfile
+import threading
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Messages queued on a session are sent once its transaction commits
+PENDING_KEY = "pending_invalidations"
+# How long stop() waits for the sender thread to send what is queued
+SENDER_DRAIN_SECONDS = 5.0
+
+Key = Union[str, int, None]
+Handler = Callable[[Optional[str], Optional[str]], None]
+
+
+@dataclass(frozen=True)
+class Invalidation:
+    """One changed entity. A key of None means every cached entry of `entity`."""
+    entity: str
+    key: Optional[str] = None
+    version: Optional[str] = None
+    origin: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return {"o": self.origin, "e": self.entity, "k": self.key, "v": self.version}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Invalidation":
+        key, version = data.get("k"), data.get("v")
+        return cls(
+            entity=data["e"],
+            key=None if key is None else str(key),
+            version=None if version is None else str(version),
+            origin=data.get("o")
+        )
+
+
+def encode(messages: List[Invalidation]) -> bytes:
+    return json.dumps([m.as_dict() for m in messages], separators=(",", ":")).encode()
+
+
+def decode(payload: Union[str, bytes]) -> List[Invalidation]:
+    data = json.loads(payload)
+    return [Invalidation.from_dict(item) for item in (data if isinstance(data, list) else [data])]
+
+
+class LocalBackend:
+    """No transport: invalidations reach this process only."""
+    cross_process = False
+    # Whether send() blocks on I/O and so runs on the bus's sender thread rather than in the commit
+    background_send = False
+
+    def open(self, bus: "InvalidationBus"):
+        pass
+
+    def send(self, payload: bytes):
+        pass
+
+    def fileno(self) -> Optional[int]:
+        return None
+
+    def receive(self) -> List[bytes]:
+        return []
+
+    def close(self):
+        pass
+
+    def close_sender(self):
+        pass
+
+
+class MemoryBackend(LocalBackend):
+    """Connects every bus in this process, standing in for separate workers in tests."""
+    cross_process = True
+    _buses: List["InvalidationBus"] = []
+
+    def open(self, bus: "InvalidationBus"):
+        self.bus = bus
+        MemoryBackend._buses.append(bus)
+
+    def send(self, payload: bytes):
+        for bus in list(MemoryBackend._buses):
+            bus.deliver(payload)
+
+    def close(self):
+        if self.bus in MemoryBackend._buses:
+            MemoryBackend._buses.remove(self.bus)
+
+
+class SocketBackend(LocalBackend):
+    """Unix datagram sockets, one per worker, in a shared directory (single host)."""
+    cross_process = True
+    background_send = True
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "dataflow-invalidation")
+        self.sock: Optional[socket.socket] = None
+        self.path: Optional[str] = None
+
+    def open(self, bus: "InvalidationBus"):
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f"{os.getpid()}-{bus.origin}.sock")
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.path)
+        self.sock.setblocking(False)
+
+    def send(self, payload: bytes):
+        sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if path == self.path or not name.endswith(".sock"):
+                    continue
+                try:
+                    sender.sendto(payload, path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Left behind by a worker that exited without cleaning up
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+                except BlockingIOError:
+                    logger.warning("Invalidation socket %s is full; dropping message", path)
+        finally:
+            sender.close()
+
+    def fileno(self) -> Optional[int]:
+        return self.sock.fileno() if self.sock is not None else None
+
+    def receive(self) -> List[bytes]:
+        payloads = []
+        while True:
+            try:
+                payloads.append(self.sock.recv(65536))
+            except BlockingIOError:
+                return payloads
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+
+class PostgresBackend(LocalBackend):
+    """LISTEN/NOTIFY on `invalidation_channel`, over two dedicated autocommit connections.
+
+    The sending connection is opened on first use and kept; only the bus's
+    sender thread uses it.
+    """
+    cross_process = True
+    background_send = True
+
+    def __init__(self, database_url: str, channel: str):
+        self.dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.channel = channel
+        self.listener = None
+        self.sender = None
+        self._send_lock = threading.Lock()
+
+    def _connect(self):
+        import psycopg2
+
+        connection = psycopg2.connect(self.dsn)
+        connection.autocommit = True
+        return connection
+
+    def open(self, bus: "InvalidationBus"):
+        self.listener = self._connect()
+        with self.listener.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+
+    def send(self, payload: bytes):
+        with self._send_lock:
+            if self.sender is None or self.sender.closed:
+                self.sender = self._connect()
+            try:
+                with self.sender.cursor() as cursor:
+                    cursor.execute("SELECT pg_notify(%s, %s)", (self.channel, payload.decode()))
+            except Exception:
+                # Reconnect on the next send rather than reuse a broken connection
+                self.sender.close()
+                raise
+
+    def fileno(self) -> Optional[int]:
+        return self.listener.fileno() if self.listener is not None else None
+
+    def receive(self) -> List[bytes]:
+        self.listener.poll()
+        payloads = [notify.payload.encode() for notify in self.listener.notifies]
+        self.listener.notifies.clear()
+        return payloads
+
+    def close(self):
+        if self.listener is not None and not self.listener.closed:
+            self.listener.close()
+        self.listener = None
+
+    def close_sender(self):
+        with self._send_lock:
+            if self.sender is not None and not self.sender.closed:
+                self.sender.close()
+            self.sender = None
+
+
+def default_backend() -> LocalBackend:
+    name = settings.invalidation_backend or (
+        "postgres" if settings.database_url.startswith("postgres") else "local"
+    )
+    if name == "postgres":
+        return PostgresBackend(settings.database_url, settings.invalidation_channel)
+    if name == "socket":
+        return SocketBackend(settings.invalidation_socket_dir or None)
+    if name == "memory":
+        return MemoryBackend()
+    if name == "local":
+        return LocalBackend()
+    raise ValueError(f"Unknown invalidation backend {name!r}")
+
+
+class InvalidationBus:
+    """Tells every worker's in-process caches that an entity changed.
+
+    Writers call publish() with the session making the change; the message is
+    sent only if that transaction commits. Handlers registered with
+    subscribe() run in this worker right after the commit (unless the cache
+    applies its own writes directly) and in every other worker when the
+    message arrives, one at a time and off the event loop. Messages for other
+    workers leave from a sender thread when the transport does blocking I/O,
+    so a commit never waits on it. When the transport drops and reconnects,
+    messages may have been missed, so every handler is called with key None
+    ("everything changed").
+    """
+
+    def __init__(self, backend: Optional[LocalBackend] = None):
+        self._backend = backend
+        self.origin = uuid.uuid4().hex[:12]
+        self._handlers: Dict[str, List[Tuple[Handler, bool]]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._connected = False
+        self._outbox: Optional[queue.SimpleQueue] = None
+        self._sender: Optional[threading.Thread] = None
+        self._sender_lock = threading.Lock()
+        self.published = 0
+        self.received = 0
+
+    @property
+    def backend(self) -> LocalBackend:
+        if self._backend is None:
+            self._backend = default_backend()
+        return self._backend
+
+    @property
+    def cross_process(self) -> bool:
+        """Whether invalidations reach other workers (otherwise caches must poll)."""
+        return self.backend.cross_process
+
+    def subscribe(self, entity: str, handler: Handler, own_writes: bool = True):
+        """Call `handler(key, version)` when `entity` changes.
+
+        own_writes=False skips changes published by this worker, for caches
+        that update themselves in the request that made the change.
+        """
+        self._handlers.setdefault(entity, []).append((handler, own_writes))
+
+    def publish(self, session: Optional[Session], entity: str, key: Key = None, version: Key = None):
+        """Announce a change to `entity`; deferred until `session` commits, if given."""
+        message = Invalidation(
+            entity=entity,
+            key=None if key is None else str(key),
+            version=None if version is None else str(version),
+            origin=self.origin
+        )
+        if session is not None:
+            session.info.setdefault(PENDING_KEY, {}).setdefault(self, []).append(message)
+        else:
+            self.send([message])
+
+    def send(self, messages: List[Invalidation]):
+        self.published += len(messages)
+        self.dispatch(messages, own=True)
+        backend = self.backend
+        if not backend.cross_process:
+            return
+        if backend.background_send:
+            self._enqueue(encode(messages))
+        else:
+            self._transmit(encode(messages))
+
+    def _transmit(self, payload: bytes):
+        try:
+            self.backend.send(payload)
+        except Exception:
+            logger.exception("Failed to publish invalidation payload %r", payload[:200])
+
+    def _enqueue(self, payload: bytes):
+        with self._sender_lock:
+            if self._sender is None:
+                # Started on first use, so scripts that never start() the bus still publish
+                self._outbox = queue.SimpleQueue()
+                self._sender = threading.Thread(
+                    target=self._send_loop, args=(self._outbox,), name="invalidation-sender", daemon=True
+                )
+                self._sender.start()
+            self._outbox.put(payload)
+
+    def _send_loop(self, outbox: queue.SimpleQueue):
+        while True:
+            payload = outbox.get()
+            if payload is None:
+                return
+            self._transmit(payload)
+
+    def _stop_sender(self):
+        """Send what is queued, then stop the sender thread and close its connection."""
+        with self._sender_lock:
+            sender, outbox = self._sender, self._outbox
+            self._sender = self._outbox = None
+        if sender is not None:
+            outbox.put(None)
+            sender.join(timeout=SENDER_DRAIN_SECONDS)
+        self.backend.close_sender()
+
+    def dispatch(self, messages: List[Invalidation], own: bool = False):
+        for message in messages:
+            for handler, own_writes in self._handlers.get(message.entity, ()):
+                if own and not own_writes:
+                    continue
+                try:
+                    handler(message.key, message.version)
+                except Exception:
+                    logger.exception("Invalidation handler for %s failed", message.entity)
+
+    def deliver(self, payload: bytes):
+        """Handle a payload from the transport, skipping this worker's own messages."""
+        try:
+            messages = [m for m in decode(payload) if m.origin != self.origin]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed invalidation payload %r", payload[:200])
+            return
+        self.received += len(messages)
+        self.dispatch(messages)
+
+    def _on_readable(self):
+        try:
+            payloads = self.backend.receive()
+        except Exception:
+            logger.exception("Invalidation listener failed; reconnecting")
+            self._disconnect()
+            return
+        for payload in payloads:
+            self._loop.run_in_executor(self._executor, self.deliver, payload)
+
+    def _connect(self) -> bool:
+        try:
+            self.backend.open(self)
+        except Exception:
+            logger.exception("Could not open the invalidation listener")
+            self.backend.close()
+            return False
+        fileno = self.backend.fileno()
+        if fileno is not None:
+            self._loop.add_reader(fileno, self._on_readable)
+        self._connected = True
+        return True
+
+    def _disconnect(self):
+        fileno = self.backend.fileno()
+        if fileno is not None:
+            self._loop.remove_reader(fileno)
+        self.backend.close()
+        self._connected = False
+
+    def _reset_all(self):
+        self.dispatch([Invalidation(entity=entity) for entity in self._handlers])
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="invalidation")
+        self._connect()
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await asyncio.to_thread(self._stop_sender)
+        if self._connected:
+            self._disconnect()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def _run(self):
+        # Reconnect after transport failures; anything sent meanwhile was lost
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.invalidation_reconnect_seconds)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                break
+            if not self._connected and self._connect():
+                await self._loop.run_in_executor(self._executor, self._reset_all)
+
+
+invalidation_bus = InvalidationBus()
+
+
+@event.listens_for(Session, "after_commit")
+def _send_pending(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if pending:
+        for bus, messages in pending.items():
+            bus.send(messages)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_pending(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
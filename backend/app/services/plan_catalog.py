@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple, Union
+
+import orjson
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.responses import etag_for
+from app.core.database import read_router
+from app.models.pricing_plan import PricingPlan
+from app.models.user import PlanType
+from app.services.invalidation import invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Plan:
+    """A subscription plan as routers see it: display fields, quota and entitlements."""
+    plan_id: str
+    name: str
+    price: float
+    period: str
+    features: Tuple[str, ...]
+    api_calls: int  # -1 for unlimited
+    highlighted: bool = False
+    custom_scraping: bool = False
+    premium_datasets: bool = False
+
+    @property
+    def unlimited(self) -> bool:
+        return self.api_calls < 0
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.plan_id,
+            "name": self.name,
+            "price": self.price,
+            "period": self.period,
+            "features": list(self.features),
+            "api_calls": self.api_calls,
+            "highlighted": self.highlighted
+        }
+
+
+# Served while the pricing_plans table is empty
+DEFAULT_PLANS: Tuple[Plan, ...] = (
+    Plan(
+        plan_id="free", name="Free", price=0, period="month",
+        features=("1,000 API calls/month", "Access to public datasets", "Basic data previews"),
+        api_calls=1000
+    ),
+    Plan(
+        plan_id="starter", name="Starter", price=49, period="month",
+        features=("50,000 API calls/month", "Access to all datasets", "Custom URL scraping (10/day)"),
+        api_calls=50000, custom_scraping=True, premium_datasets=True
+    ),
+    Plan(
+        plan_id="professional", name="Professional", price=199, period="month",
+        features=("500,000 API calls/month", "Priority API access", "Custom URL scraping (100/day)"),
+        api_calls=500000, highlighted=True, custom_scraping=True, premium_datasets=True
+    ),
+    Plan(
+        plan_id="enterprise", name="Enterprise", price=999, period="month",
+        features=("Unlimited API calls", "Dedicated infrastructure", "Custom scraping (unlimited)"),
+        api_calls=-1, custom_scraping=True, premium_datasets=True
+    ),
+)
+
+# Users whose plan is missing from the catalog get the most restrictive terms
+FALLBACK_PLAN = DEFAULT_PLANS[0]
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    plans: Tuple[Plan, ...]
+    by_id: Dict[str, Plan]
+    plans_body: bytes  # pre-rendered /billing/plans response
+    plans_etag: str
+    loaded_at: float
+
+
+class PlanCatalog:
+    """In-memory catalog of active pricing plans.
+
+    The whole catalog is one immutable snapshot swapped in atomically, so
+    lookups are a dict access with no lock and no database round trip, and
+    /billing/plans serves bytes rendered at load time. The snapshot is
+    rebuilt every `plan_catalog_ttl_seconds` (from a read replica when one
+    is available) and immediately, from the primary, on invalidate() and
+    on a "plan" invalidation, which a trigger on pricing_plans publishes on
+    PostgreSQL whenever the table is edited (migration 0015).
+    """
+
+    def __init__(self, bind=None):
+        self.engine = bind
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self.loads = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            # Used before start() (scripts, tests): load on first access
+            with self._lock:
+                if self._snapshot is None:
+                    self._refresh(self.engine or read_router.primary)
+                snapshot = self._snapshot
+        return snapshot
+
+    def get(self, plan_id: Union[str, PlanType]) -> Optional[Plan]:
+        """The active plan `plan_id`, or None."""
+        # PlanType members are str subclasses that hash and compare like their values
+        return self.snapshot.by_id.get(plan_id)
+
+    def for_user(self, user) -> Plan:
+        """Quota and entitlements of `user`'s current plan."""
+        return self.get(user.plan) or FALLBACK_PLAN
+
+    def quota(self, plan_id: Union[str, PlanType]) -> int:
+        """Monthly API call quota of `plan_id` (-1 for unlimited)."""
+        return (self.get(plan_id) or FALLBACK_PLAN).api_calls
+
+    @property
+    def plans(self) -> Tuple[Plan, ...]:
+        return self.snapshot.plans
+
+    @property
+    def plans_body(self) -> bytes:
+        return self.snapshot.plans_body
+
+    def load(self, session: Session):
+        """Rebuild the catalog from the pricing_plans table."""
+        rows = session.exec(
+            select(PricingPlan).where(PricingPlan.is_active == True).order_by(PricingPlan.price, PricingPlan.id)
+        ).all()
+        plans = []
+        for row in rows:
+            # users.plan is an enum: a plan outside it could never be subscribed to
+            if row.plan_id not in PlanType._value2member_map_:
+                logger.warning("Ignoring pricing plan %r: not a known plan type", row.plan_id)
+                continue
+            plans.append(Plan(
+                plan_id=row.plan_id,
+                name=row.name,
+                price=row.price,
+                period=row.period.value,
+                features=tuple(row.features or ()),
+                api_calls=row.api_calls,
+                highlighted=row.is_highlighted,
+                custom_scraping=row.custom_scraping,
+                premium_datasets=row.premium_datasets
+            ))
+        plans = tuple(plans) or DEFAULT_PLANS
+        plans_body = orjson.dumps({"plans": [plan.as_dict() for plan in plans]})
+        self._snapshot = CatalogSnapshot(
+            plans=plans,
+            by_id={plan.plan_id: plan for plan in plans},
+            plans_body=plans_body,
+            plans_etag=etag_for(plans_body),
+            loaded_at=time.monotonic()
+        )
+        self.loads += 1
+
+    def _refresh(self, engine):
+        with Session(engine) as session:
+            self.load(session)
+
+    def invalidate(self):
+        """Reload now, e.g. after pricing_plans was edited."""
+        with self._lock:
+            self._refresh(self.engine or read_router.primary)
+
+    def _expire(self):
+        with self._lock:
+            self._refresh(self.engine or read_router.engine_for_read())
+
+    async def start(self):
+        """Load the catalog and start the TTL refresh."""
+        await asyncio.to_thread(self.invalidate)
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.plan_catalog_ttl_seconds)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                break
+            try:
+                await asyncio.to_thread(self._expire)
+            except Exception:
+                # Keep serving the previous snapshot; plans change rarely
+                logger.exception("Plan catalog refresh failed")
+
+
+plan_catalog = PlanCatalog()
+invalidation_bus.subscribe("plan", lambda key, version: plan_catalog.invalidate())
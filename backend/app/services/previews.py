@@ -0,0 +1,89 @@
+"""Dataset previews: a small uniform sample of records, each cut down to a byte budget.
+
+Previews are generated when a version is ingested (app.services.dataset_versions)
+and stored with it, so serving one never reads the records. Sampling is a
+single pass of reservoir sampling (Algorithm L), which keeps only the sample in
+memory and skips over most records without looking at them, whatever the size
+of the dataset.
+"""
+import math
+import random
+import sys
+from itertools import islice
+from typing import Iterable, List, Sequence, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+# Appended to string values cut short by the byte budget
+ELLIPSIS = "…"
+
+
+def _uniform(rng: random.Random) -> float:
+    # In (0, 1), so its logarithm is finite
+    return max(rng.random(), sys.float_info.min)
+
+
+def reservoir_sample(items: Iterable[T], k: int, rng: random.Random) -> List[T]:
+    """A uniform sample of up to `k` items in one pass, in their original order."""
+    if k <= 0:
+        return []
+    indexed = enumerate(items)
+    reservoir = list(islice(indexed, k))
+    if len(reservoir) == k:
+        w = math.exp(math.log(_uniform(rng)) / k)
+        while True:
+            # Number of items to pass over before the next one enters the reservoir
+            skip = math.floor(math.log(_uniform(rng)) / math.log(1 - w))
+            chosen = next(islice(indexed, skip, skip + 1), None)
+            if chosen is None:
+                break
+            reservoir[rng.randrange(k)] = chosen
+            w *= math.exp(math.log(_uniform(rng)) / k)
+    reservoir.sort(key=lambda item: item[0])
+    return [item for _, item in reservoir]
+
+
+def _truncate(value: str, size: int) -> str:
+    encoded = value.encode()
+    if len(encoded) <= size:
+        return value
+    # Cut on a character boundary, leaving room for the ellipsis
+    return encoded[:max(size - len(ELLIPSIS.encode()), 0)].decode(errors="ignore") + ELLIPSIS
+
+
+def truncate_row(row: dict, budget: int) -> dict:
+    """Shorten the string values of a record so its values take about `budget` bytes.
+
+    Non-string values are kept whole. The bytes left over are shared among
+    the strings: short ones stay intact and the longest are cut to an equal
+    share, so one huge field does not squeeze out all the others.
+    """
+    strings = {name: len(value.encode()) for name, value in row.items() if isinstance(value, str)}
+    remaining = budget - sum(len(str(value)) for value in row.values() if not isinstance(value, str))
+    if sum(strings.values()) <= remaining:
+        return row
+    truncated = dict(row)
+    by_size = sorted(strings.items(), key=lambda item: item[1])
+    for position, (name, size) in enumerate(by_size):
+        share = max(remaining, 0) // (len(by_size) - position)
+        if size > share:
+            truncated[name] = _truncate(row[name], share)
+            size = share
+        remaining -= size
+    return truncated
+
+
+def build_preview(names: Sequence[str], rows: Iterable[tuple], seed: str) -> List[dict]:
+    """Preview records sampled from `rows` (value tuples in `names` order).
+
+    `seed` (e.g. "<dataset id>:<version>") makes the sample reproducible.
+    """
+    sample = reservoir_sample(rows, settings.dataset_preview_rows, random.Random(seed))
+    return [truncate_row(dict(zip(names, row)), settings.dataset_preview_row_bytes) for row in sample]
+
+
+def limit_preview(records: List[dict]) -> List[dict]:
+    """A preview posted by a dataset's creator, cut to the preview row count and byte budget."""
+    return [truncate_row(row, settings.dataset_preview_row_bytes) for row in records[:settings.dataset_preview_rows]]
@@ -0,0 +1,148 @@
+import json
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+from app.core.config import settings
+
+MAGIC = b"DFREC1\n"
+_HEADER_LENGTH = struct.Struct("<I")
+
+# Column type -> array typecode of its fixed-width values
+_TYPECODES = {"int": "q", "float": "d", "bool": "b"}
+COLUMN_TYPES = ("int", "float", "bool", "str")
+
+Column = Union[array, List[str]]
+
+
+def record_path(dataset_id: int, records_dir: Optional[str] = None) -> str:
+    """Location of the record file of a dataset."""
+    return os.path.join(records_dir or settings.records_dir, f"{dataset_id}.dfrec")
+
+
+def version_path(dataset_id: int, version: int, delta: bool = False, records_dir: Optional[str] = None) -> str:
+    """Location of the full (or, with delta=True, the diff) record file of one dataset version."""
+    name = f"v{version}.delta.dfrec" if delta else f"v{version}.dfrec"
+    return os.path.join(records_dir or settings.records_dir, str(dataset_id), name)
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _encode_column(column_type: str, values: Sequence) -> bytes:
+    if column_type in _TYPECODES:
+        return _little_endian(array(_TYPECODES[column_type], values))
+    # Strings: n + 1 int64 offsets into the concatenated UTF-8 data that follows them
+    encoded = [value.encode() for value in values]
+    offsets = array("q", [0])
+    total = 0
+    for item in encoded:
+        total += len(item)
+        offsets.append(total)
+    return _little_endian(offsets) + b"".join(encoded)
+
+
+def write_record_file(path: str, columns: Dict[str, Sequence], types: Dict[str, str]) -> int:
+    """Write equally long `columns` to a columnar record file; returns its size in bytes.
+
+    Layout: magic, little-endian uint32 header length, JSON header (row count
+    and each column's type and byte range), then one contiguous block per
+    column, so a single column can be read without touching the others.
+    """
+    rows = len(next(iter(columns.values()))) if columns else 0
+    blocks = []
+    header_columns = []
+    offset = 0
+    for name, values in columns.items():
+        if len(values) != rows:
+            raise ValueError(f"Column {name} has {len(values)} values, expected {rows}")
+        if types[name] not in COLUMN_TYPES:
+            raise ValueError(f"Unsupported column type {types[name]!r}")
+        block = _encode_column(types[name], values)
+        header_columns.append({"name": name, "type": types[name], "offset": offset, "length": len(block)})
+        blocks.append(block)
+        offset += len(block)
+    header = json.dumps({"rows": rows, "columns": header_columns}, separators=(",", ":")).encode()
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER_LENGTH.pack(len(header)))
+        f.write(header)
+        for block in blocks:
+            f.write(block)
+    # Readers never see a half-written file
+    os.replace(tmp_path, path)
+    return len(MAGIC) + _HEADER_LENGTH.size + len(header) + offset
+
+
+class RecordFile:
+    """Reader for a columnar record file written by write_record_file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        if self._file.read(len(MAGIC)) != MAGIC:
+            self._file.close()
+            raise ValueError(f"{path} is not a record file")
+        (header_length,) = _HEADER_LENGTH.unpack(self._file.read(_HEADER_LENGTH.size))
+        header = json.loads(self._file.read(header_length))
+        self._data_start = len(MAGIC) + _HEADER_LENGTH.size + header_length
+        self.rows: int = header["rows"]
+        self._columns = {column["name"]: column for column in header["columns"]}
+
+    @property
+    def schema(self) -> Dict[str, str]:
+        """Column name -> column type, in file order."""
+        return {name: column["type"] for name, column in self._columns.items()}
+
+    def raw_column(self, name: str) -> bytes:
+        """Undecoded bytes of a column block (e.g. for numpy.frombuffer)."""
+        column = self._columns[name]
+        self._file.seek(self._data_start + column["offset"])
+        return self._file.read(column["length"])
+
+    def column(self, name: str) -> Column:
+        """All values of one column: an array for numeric/bool columns, a list for strings."""
+        column_type = self._columns[name]["type"]
+        block = self.raw_column(name)
+        if column_type in _TYPECODES:
+            values = array(_TYPECODES[column_type])
+            values.frombytes(block)
+            if sys.byteorder == "big":
+                values.byteswap()
+            return values
+        offsets = array("q")
+        offsets.frombytes(block[:(self.rows + 1) * 8])
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        data = block[(self.rows + 1) * 8:]
+        return [data[offsets[i]:offsets[i + 1]].decode() for i in range(self.rows)]
+
+    def iter_rows(self, columns: Optional[List[str]] = None) -> Iterator[dict]:
+        """Records as dicts (booleans decoded), optionally restricted to some columns."""
+        names = columns or list(self._columns)
+        decoded = []
+        for name in names:
+            values = self.column(name)
+            if self._columns[name]["type"] == "bool":
+                values = [bool(value) for value in values]
+            decoded.append(values)
+        for row in zip(*decoded):
+            yield dict(zip(names, row))
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> "RecordFile":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,371 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Union
+
+import httpx
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.database import engine
+from app.models.scrape_request import ScrapeRequest, ScrapeStatus
+from app.models.user import PlanType, User
+from app.services.invalidation import invalidation_bus
+from app.services.scrape_jobs import (
+    claim_scrape_request,
+    claimable,
+    finish_scrape_request,
+    lease_expired,
+    process_scrape_request,
+    renew_scrape_leases
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TenantLimits:
+    weight: float  # share of scrape capacity relative to other backlogged tenants
+    max_concurrency: int  # jobs of one tenant running at once
+
+
+# "Priority API access" is sold from professional up: higher plans get a larger share
+PLAN_LIMITS: Dict[PlanType, TenantLimits] = {
+    PlanType.FREE: TenantLimits(weight=1, max_concurrency=2),
+    PlanType.STARTER: TenantLimits(weight=1, max_concurrency=4),
+    PlanType.PROFESSIONAL: TenantLimits(weight=2, max_concurrency=8),
+    PlanType.ENTERPRISE: TenantLimits(weight=4, max_concurrency=16)
+}
+
+
+def limits_for(plan: Union[PlanType, str, None]) -> TenantLimits:
+    try:
+        return PLAN_LIMITS[PlanType(getattr(plan, "value", plan))]
+    except ValueError:
+        return PLAN_LIMITS[PlanType.FREE]
+
+
+@dataclass
+class Job:
+    request_id: str
+    user_id: int
+    plan: PlanType
+    enqueued_at: float
+    start_tag: float = 0.0
+    cancelled: bool = False
+
+
+class _Flow:
+    __slots__ = ("user_id", "plan", "limits", "jobs", "queued", "finish_tag", "running", "waiting_since")
+
+    def __init__(self, user_id: int, plan: PlanType, now: float):
+        self.user_id = user_id
+        self.plan = plan
+        self.limits = limits_for(plan)
+        self.jobs: Deque[Job] = deque()  # may still hold cancelled jobs, skipped when they reach the head
+        self.queued = 0
+        self.finish_tag = 0.0
+        self.running = 0
+        self.waiting_since = now
+
+
+class FairQueue:
+    """Start-time fair queuing of jobs across tenants, with per-tenant caps and aging.
+
+    Each tenant (user) is a flow. A job's start tag is the later of the
+    queue's virtual time and the finish tag of the tenant's previous job;
+    finish tags advance by 1 / weight per job, so backlogged tenants are
+    served in proportion to their weights however many jobs each submitted.
+    The next job is the head with the smallest start tag among tenants below
+    their concurrency cap, less `aging_rate` per second since the tenant was
+    last served, so a tenant held back by its cap or a tiny weight still gets
+    a turn. Removed jobs are only marked, and dropped once they reach the
+    head of their flow. Not thread-safe; callers lock.
+    """
+
+    def __init__(self, aging_rate: float = 0.0):
+        self.aging_rate = aging_rate
+        self.virtual_time = 0.0
+        self._flows: Dict[int, _Flow] = {}
+        self._queued: Dict[str, Job] = {}
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+    def __contains__(self, request_id: str) -> bool:
+        return request_id in self._queued
+
+    def push(self, job: Job, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        flow = self._flows.get(job.user_id)
+        if flow is None:
+            flow = self._flows[job.user_id] = _Flow(job.user_id, job.plan, now)
+        elif flow.plan != job.plan:
+            flow.plan, flow.limits = job.plan, limits_for(job.plan)
+        if not flow.jobs:
+            flow.waiting_since = now
+        job.start_tag = max(self.virtual_time, flow.finish_tag)
+        flow.finish_tag = job.start_tag + 1 / flow.limits.weight
+        flow.jobs.append(job)
+        flow.queued += 1
+        self._queued[job.request_id] = job
+
+    def pop(self, now: Optional[float] = None) -> Optional[Job]:
+        """The next job to run, or None if every backlogged tenant is at its cap."""
+        now = time.monotonic() if now is None else now
+        best, best_key = None, None
+        idle = []
+        for flow in self._flows.values():
+            while flow.jobs and flow.jobs[0].cancelled:
+                flow.jobs.popleft()
+            if not flow.jobs and not flow.running:
+                idle.append(flow.user_id)
+            if not flow.jobs or flow.running >= flow.limits.max_concurrency:
+                continue
+            key = flow.jobs[0].start_tag - self.aging_rate * (now - flow.waiting_since)
+            if best_key is None or key < best_key:
+                best, best_key = flow, key
+        for user_id in idle:
+            del self._flows[user_id]
+        if best is None:
+            return None
+        job = best.jobs.popleft()
+        del self._queued[job.request_id]
+        best.queued -= 1
+        best.running += 1
+        best.waiting_since = now
+        self.virtual_time = max(self.virtual_time, job.start_tag)
+        return job
+
+    def done(self, job: Job):
+        flow = self._flows.get(job.user_id)
+        if flow is None:
+            return
+        flow.running -= 1
+        if not flow.queued and flow.running <= 0:
+            del self._flows[job.user_id]
+
+    def remove(self, request_id: str) -> bool:
+        """Drop a queued job; False if it is not queued (already running, finished or unknown)."""
+        job = self._queued.pop(request_id, None)
+        if job is None:
+            return False
+        job.cancelled = True
+        flow = self._flows[job.user_id]
+        flow.queued -= 1
+        return True
+
+    def queued_by_plan(self) -> Dict[str, int]:
+        counts = {plan.value: 0 for plan in PlanType}
+        for flow in self._flows.values():
+            counts[flow.plan.value] += flow.queued
+        return counts
+
+
+class ScrapeDispatcher:
+    """Runs scrape requests from a FairQueue with at most `scrape_max_concurrency` in flight.
+
+    Submitted requests are PENDING; a job claims its request by moving it
+    from PENDING to PROCESSING under a lease, so a request is never run
+    twice even when several workers recover the same backlog after a
+    restart. Every third of `scrape_lease_seconds` the worker renews the
+    leases of its running requests and queues any request whose lease
+    expired, i.e. whose worker died mid-scrape. The queue is per process:
+    fairness holds within a worker, and requests submitted to a worker are
+    run by it.
+
+    Cancellations arrive through the invalidation bus, from whichever worker
+    served the cancel: a queued job is dropped, a running one has its task
+    cancelled, which frees its slot at once. With `scrape_fetch_enabled`,
+    jobs fetch their pages through one pooled AsyncClient, which never
+    follows redirects itself.
+    """
+
+    def __init__(self, bind=None):
+        self.bind = bind if bind is not None else engine
+        self.queue = FairQueue(settings.scrape_fair_aging_rate)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+        self._lease_task: Optional[asyncio.Task] = None
+        self._running: Dict[str, asyncio.Task] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self.dispatched: Dict[str, int] = {plan.value: 0 for plan in PlanType}
+        self.cancelled: Dict[str, int] = {"queued": 0, "running": 0}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._running)
+
+    def queued_by_plan(self) -> Dict[str, int]:
+        with self._lock:
+            return self.queue.queued_by_plan()
+
+    def submit(self, request_id: str, user_id: int, plan: Union[PlanType, str]):
+        """Queue a PENDING request; safe to call from any thread."""
+        job = Job(request_id=request_id, user_id=user_id, plan=PlanType(getattr(plan, "value", plan)),
+                  enqueued_at=time.time())
+        with self._lock:
+            self.queue.push(job)
+        self._notify()
+
+    def _notify(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def recover(self, pending: bool = True) -> int:
+        """Queue the requests whose lease expired and, unless `pending` is False, the PENDING ones, oldest first.
+
+        PENDING requests are only left over at startup; later they are in the
+        queue of the worker they were submitted to. Requests already queued
+        or running in this worker are skipped. Returns the number queued.
+        """
+        now = datetime.now(timezone.utc)
+        with Session(self.bind) as session:
+            rows = session.exec(
+                select(ScrapeRequest.request_id, ScrapeRequest.user_id, User.plan)
+                .join(User, User.id == ScrapeRequest.user_id)
+                .where(claimable(now) if pending else lease_expired(now))
+                .order_by(ScrapeRequest.created_at)
+            ).all()
+        queued = 0
+        for request_id, user_id, plan in rows:
+            with self._lock:
+                known = request_id in self.queue
+            if known or request_id in self._running:
+                continue
+            self.submit(request_id, user_id, plan)
+            queued += 1
+        return queued
+
+    def on_invalidation(self, key: Optional[str], version: Optional[str]):
+        """A scrape request was cancelled (key is its request id; None if messages were missed)."""
+        if self._loop is None:
+            return
+        if key is None:
+            self._loop.call_soon_threadsafe(self._reconcile_soon)
+        else:
+            self._loop.call_soon_threadsafe(self.cancel, key)
+
+    def cancel(self, request_id: str) -> bool:
+        """Stop a queued or running request of this worker; runs on the event loop."""
+        with self._lock:
+            removed = self.queue.remove(request_id)
+        if removed:
+            self.cancelled["queued"] += 1
+            return True
+        task = self._running.get(request_id)
+        if task is None or task.done() or task.cancelling():
+            return False
+        task.cancel()
+        self.cancelled["running"] += 1
+        return True
+
+    def _reconcile_soon(self):
+        if self._running:
+            asyncio.create_task(self._reconcile(list(self._running)))
+
+    async def _reconcile(self, request_ids: List[str]):
+        # Running requests whose row is no longer PROCESSING were cancelled by a message we missed
+        def finished() -> List[str]:
+            with Session(self.bind) as session:
+                return session.exec(
+                    select(ScrapeRequest.request_id).where(
+                        ScrapeRequest.request_id.in_(request_ids),
+                        ScrapeRequest.status != ScrapeStatus.PROCESSING
+                    )
+                ).all()
+        try:
+            for request_id in await asyncio.to_thread(finished):
+                self.cancel(request_id)
+        except Exception:
+            logger.exception("Could not reconcile running scrape requests")
+
+    async def run_job(self, job: Job) -> bool:
+        """Claim and process one request; False if it was cancelled or already claimed."""
+        if not await asyncio.to_thread(claim_scrape_request, job.request_id):
+            return False
+        return await process_scrape_request(job.request_id, self._client)
+
+    async def _execute(self, job: Job):
+        try:
+            await self.run_job(job)
+        except asyncio.CancelledError:
+            # Cancelled by its request's cancellation, or by shutdown; a cancelled row is already FAILED
+            pass
+        except Exception:
+            logger.exception("Scrape request %s failed", job.request_id)
+            try:
+                await asyncio.to_thread(
+                    finish_scrape_request, job.request_id, ScrapeStatus.FAILED, error_message="Scraping failed"
+                )
+            except Exception:
+                logger.exception("Could not mark scrape request %s as failed", job.request_id)
+        finally:
+            self._running.pop(job.request_id, None)
+            with self._lock:
+                self.queue.done(job)
+            self._wake.set()
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        if settings.scrape_fetch_enabled:
+            # Redirects are followed by scrape_jobs, which checks every hop's address
+            self._client = httpx.AsyncClient(timeout=settings.scrape_fetch_timeout_seconds, follow_redirects=False)
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.to_thread(self.recover)
+        except Exception:
+            logger.exception("Could not recover pending scrape requests")
+        self._lease_task = asyncio.create_task(self._renew_leases())
+
+    async def stop(self):
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        if self._running:
+            await asyncio.gather(*self._running.values(), return_exceptions=True)
+        # Kept renewing while the running jobs finished
+        if self._lease_task is not None:
+            self._lease_task.cancel()
+            await asyncio.gather(self._lease_task, return_exceptions=True)
+            self._lease_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._loop = None
+
+    async def _run(self):
+        while not self._stopping:
+            while len(self._running) < settings.scrape_max_concurrency:
+                with self._lock:
+                    job = self.queue.pop()
+                if job is None:
+                    break
+                self.dispatched[job.plan.value] += 1
+                self._running[job.request_id] = asyncio.create_task(self._execute(job))
+            self._wake.clear()
+            await self._wake.wait()
+
+    async def _renew_leases(self):
+        while True:
+            await asyncio.sleep(settings.scrape_lease_seconds / 3)
+            try:
+                await asyncio.to_thread(renew_scrape_leases, list(self._running))
+                await asyncio.to_thread(self.recover, False)
+            except Exception:
+                logger.exception("Could not renew scrape request leases")
+
+
+scrape_dispatcher = ScrapeDispatcher()
+invalidation_bus.subscribe("scrape_request", scrape_dispatcher.on_invalidation)
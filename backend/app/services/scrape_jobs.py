@@ -0,0 +1,210 @@
+import asyncio
+import ipaddress
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Sequence, Tuple
+
+import httpx
+from sqlalchemy import and_, or_, update
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.database import engine
+from app.models.scrape_request import ScrapeRequest, ScrapeStatus
+from app.services.host_limits import host_limits
+from app.services.webhook_delivery import enqueue_webhook_event
+
+CANCELLED_MESSAGE = "Cancelled by user"
+
+# Redirects followed per scrape; each hop is checked like the submitted URL
+MAX_REDIRECTS = 5
+
+
+def lease_expired(now: datetime):
+    """PROCESSING requests whose worker stopped renewing the lease, presumably because it died."""
+    return and_(
+        ScrapeRequest.status == ScrapeStatus.PROCESSING,
+        # Rows claimed before leases existed have none
+        or_(ScrapeRequest.lease_until.is_(None), ScrapeRequest.lease_until < now)
+    )
+
+
+def claimable(now: datetime):
+    """Requests a worker may claim: PENDING ones, and PROCESSING ones whose lease expired."""
+    return or_(ScrapeRequest.status == ScrapeStatus.PENDING, lease_expired(now))
+
+
+def claim_scrape_request(request_id: str) -> bool:
+    """Move a request to PROCESSING under a fresh lease; False if it was cancelled or is claimed elsewhere."""
+    now = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        claimed = session.execute(
+            update(ScrapeRequest)
+            .where(ScrapeRequest.request_id == request_id, claimable(now))
+            .values(status=ScrapeStatus.PROCESSING, lease_until=now + timedelta(seconds=settings.scrape_lease_seconds))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        session.commit()
+    return bool(claimed)
+
+
+def renew_scrape_leases(request_ids: Sequence[str]) -> int:
+    """Extend the leases of this worker's running requests; returns the number still PROCESSING."""
+    if not request_ids:
+        return 0
+    with Session(engine) as session:
+        renewed = session.execute(
+            update(ScrapeRequest)
+            .where(ScrapeRequest.request_id.in_(request_ids), ScrapeRequest.status == ScrapeStatus.PROCESSING)
+            .values(lease_until=datetime.now(timezone.utc) + timedelta(seconds=settings.scrape_lease_seconds))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        session.commit()
+    return renewed
+
+
+def finish_scrape_request(
+    request_id: str,
+    status: ScrapeStatus,
+    result_data: Optional[dict] = None,
+    result_count: int = 0,
+    error_message: Optional[str] = None
+) -> bool:
+    """Record the outcome of a PROCESSING request and queue its webhook event.
+
+    The update only applies while the request is still PROCESSING, so a
+    cancellation committed meanwhile is never overwritten; returns whether
+    it applied.
+    """
+    with Session(engine) as session:
+        finished = session.execute(
+            update(ScrapeRequest)
+            .where(ScrapeRequest.request_id == request_id, ScrapeRequest.status == ScrapeStatus.PROCESSING)
+            .values(
+                status=status,
+                completed_at=datetime.now(timezone.utc),
+                lease_until=None,
+                result_data=result_data,
+                result_count=result_count,
+                error_message=error_message
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not finished:
+            session.rollback()
+            return False
+        user_id, url, platform = session.exec(
+            select(ScrapeRequest.user_id, ScrapeRequest.url, ScrapeRequest.platform)
+            .where(ScrapeRequest.request_id == request_id)
+        ).one()
+        payload = {"request_id": request_id, "url": url, "platform": platform, "status": status.value}
+        if status == ScrapeStatus.COMPLETED:
+            payload["result_count"] = result_count
+            enqueue_webhook_event(session, user_id, "scrape.completed", payload)
+        else:
+            payload["error_message"] = error_message
+            enqueue_webhook_event(session, user_id, "scrape.failed", payload)
+        session.commit()
+    return True
+
+
+def _load_target(request_id: str) -> Optional[Tuple[str, str, List[str]]]:
+    with Session(engine) as session:
+        return session.exec(
+            select(ScrapeRequest.url, ScrapeRequest.platform, ScrapeRequest.fields)
+            .where(ScrapeRequest.request_id == request_id, ScrapeRequest.status == ScrapeStatus.PROCESSING)
+        ).first()
+
+
+class ScrapeError(Exception):
+    """The page could not be scraped; the message is shown to the user."""
+
+
+async def public_address(host: str, port: int) -> str:
+    """An address of `host` to connect to; raises ScrapeError unless every address it resolves to is public.
+
+    Private, loopback, link-local and other reserved ranges are refused so
+    a scrape cannot reach the internal network or cloud metadata endpoints.
+    """
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise ScrapeError("Could not resolve the page's host") from e
+    addresses = [ipaddress.ip_address(info[4][0]) for info in infos]
+    if not addresses or any(not address.is_global or address.is_multicast for address in addresses):
+        raise ScrapeError("The page's host is not a public address")
+    return str(addresses[0])
+
+
+async def fetch_public_page(client: httpx.AsyncClient, url: str) -> httpx.Response:
+    """GET `url` through the per-host limits, following redirects by hand.
+
+    Every hop is resolved and checked by public_address, and the request
+    is sent to the checked address (with the original Host header and TLS
+    server name), so DNS answering differently between the check and the
+    connection cannot redirect it to an internal host.
+    """
+    target = httpx.URL(url)
+    for _ in range(MAX_REDIRECTS + 1):
+        if target.scheme not in ("http", "https") or not target.host:
+            raise ScrapeError("Only http and https pages can be scraped")
+        host = target.raw_host.decode("ascii")
+        address = await public_address(host, target.port or (443 if target.scheme == "https" else 80))
+        try:
+            response = await host_limits.fetch(
+                client,
+                str(target.copy_with(host=address)),
+                host=target.netloc.decode("ascii"),
+                headers={"Host": target.netloc.decode("ascii")},
+                extensions={"sni_hostname": host}
+            )
+        except httpx.HTTPError as e:
+            raise ScrapeError(f"Could not fetch the page: {type(e).__name__}") from e
+        if not response.is_redirect:
+            return response
+        target = target.join(response.headers["location"])
+    raise ScrapeError("The page redirected too many times")
+
+
+async def scrape_page(
+    url: str,
+    platform: str,
+    fields: List[str],
+    client: Optional[httpx.AsyncClient] = None
+) -> Tuple[dict, int]:
+    """Fetch and parse one page; returns the result data and record count.
+
+    Without a client nothing is fetched. Fetches only go to public
+    addresses, through the per-host limits, and run on the event loop, so
+    cancelling the task awaiting this aborts the request in flight.
+    Parsing is a placeholder.
+    """
+    result = {"scraped": True, "url": url}
+    if client is not None:
+        response = await fetch_public_page(client, url)
+        if response.status_code >= 400:
+            raise ScrapeError(f"The page returned HTTP {response.status_code}")
+        result["status_code"] = response.status_code
+        result["content_length"] = len(response.content)
+    result["data"] = {"sample": "Scraped data would appear here"}
+    return result, 1
+
+
+async def process_scrape_request(request_id: str, client: Optional[httpx.AsyncClient] = None) -> bool:
+    """Scrape a claimed (PROCESSING) request and record the result; False if it was cancelled meanwhile.
+
+    The scrape dispatcher runs this as an asyncio task and cancels the task
+    when the request is cancelled.
+    """
+    target = await asyncio.to_thread(_load_target, request_id)
+    if target is None:
+        return False
+    url, platform, fields = target
+    try:
+        result_data, result_count = await scrape_page(url, platform, fields or [], client)
+    except ScrapeError as e:
+        return await asyncio.to_thread(finish_scrape_request, request_id, ScrapeStatus.FAILED, error_message=str(e))
+    return await asyncio.to_thread(
+        finish_scrape_request, request_id, ScrapeStatus.COMPLETED,
+        result_data=result_data, result_count=result_count
+    )
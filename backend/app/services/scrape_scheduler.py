@@ -0,0 +1,225 @@
+import asyncio
+import hashlib
+import heapq
+import logging
+import math
+import secrets
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.database import engine
+from app.models.scrape_request import ScrapeRequest, ScrapeStatus
+from app.models.scrape_schedule import ScrapeSchedule
+from app.models.user import User
+from app.services.cron import CronExpression
+from app.services.invalidation import invalidation_bus
+from app.services.plan_catalog import plan_catalog
+from app.services.scrape_dispatcher import scrape_dispatcher
+from app.services.usage import EVENT_SCRAPE_REQUEST, usage_meter
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=4096)
+def _cron(expression: str) -> CronExpression:
+    return CronExpression(expression)
+
+
+def _utc(moment: datetime) -> datetime:
+    # SQLite hands back naive datetimes; every stored time is UTC
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=timezone.utc)
+
+
+def jitter_offset(schedule_id: str, jitter_seconds: int) -> timedelta:
+    """A schedule's fixed delay after its nominal times, spread evenly over [0, jitter_seconds)."""
+    if jitter_seconds <= 0:
+        return timedelta(0)
+    fraction = int.from_bytes(hashlib.blake2b(schedule_id.encode(), digest_size=8).digest(), "big") / 2 ** 64
+    return timedelta(seconds=fraction * jitter_seconds)
+
+
+def next_run(schedule: ScrapeSchedule, after: datetime) -> datetime:
+    """The schedule's first trigger strictly after `after`.
+
+    Runs missed while no scheduler was running are not replayed: the next
+    trigger is always in the future. Interval schedules keep to a grid
+    anchored at their creation time, so they do not drift.
+    """
+    offset = jitter_offset(schedule.schedule_id, schedule.jitter_seconds)
+    nominal_after = _utc(after) - offset
+    if schedule.cron:
+        return _cron(schedule.cron).next_after(nominal_after) + offset
+    anchor = _utc(schedule.created_at)
+    interval = schedule.interval_seconds
+    periods = max(math.floor((nominal_after - anchor).total_seconds() / interval) + 1, 1)
+    return anchor + timedelta(seconds=periods * interval) + offset
+
+
+class ScrapeScheduler:
+    """Fires recurring scrapes from a heap of upcoming triggers.
+
+    Only triggers due within `scrape_schedule_horizon_seconds` are held, as
+    (due time, schedule id) pairs in a min-heap that is rebuilt from the
+    (is_active, next_run_at) index once per horizon. Between reloads the
+    loop sleeps until the earliest trigger, so idle schedules cost nothing
+    per tick however many there are. Schedules created or changed meanwhile
+    arrive through the invalidation bus. Every worker runs a scheduler; a
+    run is claimed by moving next_run_at forward only while it is still
+    due, so exactly one worker fires it.
+    """
+
+    def __init__(self, bind=None):
+        self.bind = bind if bind is not None else engine
+        self._heap: List[Tuple[float, int]] = []
+        self._loaded_until = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+        self.fired = 0
+        self.loads = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._heap)
+
+    def load(self) -> Tuple[List[Tuple[float, int]], float]:
+        """Triggers due before the end of the next horizon (overdue ones included)."""
+        now = time.time()
+        until = now + settings.scrape_schedule_horizon_seconds
+        with Session(self.bind) as session:
+            rows = session.exec(
+                select(ScrapeSchedule.id, ScrapeSchedule.next_run_at).where(
+                    ScrapeSchedule.is_active == True,  # noqa: E712
+                    ScrapeSchedule.next_run_at < datetime.fromtimestamp(until, timezone.utc)
+                )
+            ).all()
+        self.loads += 1
+        heap = [(_utc(next_run_at).timestamp(), schedule_id) for schedule_id, next_run_at in rows]
+        heapq.heapify(heap)
+        return heap, until
+
+    def fire(self, ids: List[int]) -> List[Tuple[float, int]]:
+        """Start a scrape for every due schedule in `ids`; returns their next triggers."""
+        now = datetime.now(timezone.utc)
+        request_ids = []
+        upcoming = []
+        with Session(self.bind) as session:
+            rows = session.exec(
+                select(ScrapeSchedule, User.plan)
+                .join(User, User.id == ScrapeSchedule.user_id)
+                .where(
+                    ScrapeSchedule.id.in_(ids),
+                    ScrapeSchedule.is_active == True,  # noqa: E712
+                    ScrapeSchedule.next_run_at <= now
+                )
+            ).all()
+            for schedule, plan in rows:
+                next_at = next_run(schedule, now)
+                # Claim the run: only one worker can move a still-due next_run_at forward
+                claimed = session.execute(
+                    update(ScrapeSchedule)
+                    .where(
+                        ScrapeSchedule.id == schedule.id,
+                        ScrapeSchedule.is_active == True,  # noqa: E712
+                        ScrapeSchedule.next_run_at <= now
+                    )
+                    .values(next_run_at=next_at, last_run_at=now, run_count=ScrapeSchedule.run_count + 1)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                if not claimed:
+                    continue
+                upcoming.append((next_at.timestamp(), schedule.id))
+                plan_entry = plan_catalog.get(plan)
+                if plan_entry is not None and not plan_entry.custom_scraping:
+                    # Downgraded to a plan without custom scraping: the schedule idles
+                    continue
+                request_id = f"req_{secrets.token_urlsafe(12)}"
+                session.add(ScrapeRequest(
+                    request_id=request_id,
+                    user_id=schedule.user_id,
+                    url=schedule.url,
+                    platform=schedule.platform,
+                    fields=schedule.fields or [],
+                    webhook_url=schedule.webhook_url,
+                    status=ScrapeStatus.PENDING
+                ))
+                request_ids.append((request_id, schedule.user_id, plan))
+            session.commit()
+        self.fired += len(request_ids)
+        for request_id, user_id, plan in request_ids:
+            scrape_dispatcher.submit(request_id, user_id, plan)
+            usage_meter.record(user_id, EVENT_SCRAPE_REQUEST)
+        return upcoming
+
+    def on_invalidation(self, key: Optional[str], version: Optional[str]):
+        """A schedule was created, changed or deleted (version is its next_run_at, if active)."""
+        if self._loop is None:
+            return
+        if key is None:
+            # Messages may have been missed: reload
+            self._loop.call_soon_threadsafe(self._reload_soon)
+            return
+        if version is None:
+            # Deleted or paused; a stale heap entry finds nothing due when it fires
+            return
+        due = _utc(datetime.fromisoformat(version)).timestamp()
+        self._loop.call_soon_threadsafe(self._push, due, int(key))
+
+    def _reload_soon(self):
+        self._loaded_until = 0.0
+        self._wake.set()
+
+    def _push(self, due: float, schedule_id: int):
+        if due < self._loaded_until:
+            heapq.heappush(self._heap, (due, schedule_id))
+            self._wake.set()
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        self._loop = None
+
+    async def _run(self):
+        while not self._stopping:
+            retry_in = 0.05
+            try:
+                if time.time() >= self._loaded_until:
+                    self._heap, self._loaded_until = await asyncio.to_thread(self.load)
+                now = time.time()
+                due = set()
+                while self._heap and self._heap[0][0] <= now:
+                    due.add(heapq.heappop(self._heap)[1])
+                if due:
+                    for next_due, schedule_id in await asyncio.to_thread(self.fire, sorted(due)):
+                        self._push(next_due, schedule_id)
+            except Exception:
+                logger.exception("Scrape scheduler tick failed")
+                retry_in = 1.0
+            wake_at = self._loaded_until
+            if self._heap:
+                wake_at = min(wake_at, self._heap[0][0])
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=max(wake_at - time.time(), retry_in))
+            except asyncio.TimeoutError:
+                pass
+
+
+scrape_scheduler = ScrapeScheduler()
+invalidation_bus.subscribe("scrape_schedule", scrape_scheduler.on_invalidation)
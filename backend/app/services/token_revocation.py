@@ -0,0 +1,233 @@
+"""Revoked access tokens: a table of signed-out token ids behind an in-memory Bloom filter.
+
+Signing out stores the token's id (its jti claim) in revoked_tokens until
+the token would have expired. Every authenticated request has to check it,
+so each worker keeps a Bloom filter of the revoked ids. A token that is not
+revoked (almost every request) then costs a few hash probes; only probable
+hits query the table: revoked tokens, plus false positives at about
+token_revocation_false_positive_rate. A revocation enters this worker's
+filter when its transaction commits and other workers' through the
+invalidation bus, and the incremental refresh every
+token_revocation_refresh_seconds catches anything the bus missed. A Bloom
+filter cannot forget, so it is rebuilt from the unexpired rows every
+token_revocation_rebuild_seconds, or sooner once it outgrows its capacity.
+Tokens without a jti could not be revoked, so they are not accepted at all.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.database import engine
+from app.models.revoked_token import RevokedToken, add_revoked_token
+from app.services.invalidation import invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+# Refreshes re-read ids revoked this long before the previous refresh, in case their transaction committed late
+SETTLE = timedelta(seconds=30)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class BloomFilter:
+    """A fixed-size Bloom filter of strings; its k probes come from one blake2b digest by double hashing."""
+
+    def __init__(self, size: int, hashes: int):
+        self.size = max(size, 8)
+        self.hashes = max(hashes, 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def for_capacity(cls, capacity: int, false_positive_rate: float) -> "BloomFilter":
+        """The smallest filter holding `capacity` keys at the given false positive rate."""
+        capacity = max(capacity, 1)
+        size = math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+        return cls(size, round(size / capacity * math.log(2)))
+
+    def _hashes(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        # An odd step visits distinct positions
+        return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+    def add(self, key: str):
+        first, step = self._hashes(key)
+        bits, size = self.bits, self.size
+        for i in range(self.hashes):
+            position = (first + i * step) % size
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        first, step = self._hashes(key)
+        bits, size = self.bits, self.size
+        for i in range(self.hashes):
+            position = (first + i * step) % size
+            if not bits[position >> 3] >> (position & 7) & 1:
+                return False
+        return True
+
+    def false_positive_rate(self) -> float:
+        """Expected false positive rate with the keys added so far."""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class RevocationList:
+    """This worker's view of revoked token ids: a Bloom filter, confirmed against revoked_tokens on a hit.
+
+    Until the first rebuild (start()) there is no filter and every check
+    queries the table.
+    """
+
+    def __init__(self, bind=None):
+        self.bind = bind if bind is not None else engine
+        self.filter: Optional[BloomFilter] = None
+        self.capacity = 0
+        self._lock = threading.Lock()
+        # Serializes refreshes and rebuilds, which may run from the loop's thread and the bus's
+        self._refresh_lock = threading.Lock()
+        self._cursor: Optional[datetime] = None
+        self._rebuilt_at = 0.0
+        # Ids added while a rebuild runs, copied into the new filter
+        self._rebuilding: Optional[List[str]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self.checks = 0
+        self.lookups = 0
+        self.revoked = 0
+        self.rebuilds = 0
+
+    def add(self, jti: str):
+        with self._lock:
+            if self.filter is not None:
+                self.filter.add(jti)
+            if self._rebuilding is not None:
+                self._rebuilding.append(jti)
+
+    def is_revoked(self, session: Session, jti: str) -> bool:
+        """Whether the token with this id was revoked; queries the table only on a filter hit."""
+        self.checks += 1
+        bloom = self.filter
+        if bloom is not None and jti not in bloom:
+            return False
+        self.lookups += 1
+        revoked = session.exec(select(RevokedToken.id).where(RevokedToken.jti == jti)).first() is not None
+        if revoked:
+            self.revoked += 1
+        return revoked
+
+    def rebuild(self) -> int:
+        """Delete expired rows and build a new filter from the rest; returns the number of ids loaded."""
+        with self._refresh_lock:
+            started = _utcnow()
+            with self._lock:
+                self._rebuilding = []
+            try:
+                with self.bind.begin() as connection:
+                    connection.execute(delete(RevokedToken).where(RevokedToken.expires_at <= started))
+                    ids = connection.execute(
+                        select(RevokedToken.jti).where(RevokedToken.expires_at > started)
+                    ).scalars().all()
+                # Room to double before the next rebuild is forced
+                capacity = max(settings.token_revocation_capacity, 2 * len(ids))
+                bloom = BloomFilter.for_capacity(capacity, settings.token_revocation_false_positive_rate)
+                for jti in ids:
+                    bloom.add(jti)
+                with self._lock:
+                    for jti in self._rebuilding:
+                        bloom.add(jti)
+                    self.filter, self.capacity = bloom, capacity
+            finally:
+                with self._lock:
+                    self._rebuilding = None
+            self._cursor = started
+            self._rebuilt_at = time.monotonic()
+            self.rebuilds += 1
+            return len(ids)
+
+    def refresh(self) -> int:
+        """Add ids revoked since the last refresh, or rebuild when due; returns the number of ids read."""
+        if (
+            self.filter is None
+            or self.filter.count > self.capacity
+            or time.monotonic() - self._rebuilt_at >= settings.token_revocation_rebuild_seconds
+        ):
+            return self.rebuild()
+        with self._refresh_lock:
+            started = _utcnow()
+            with Session(self.bind) as session:
+                ids = session.exec(
+                    select(RevokedToken.jti)
+                    .where(RevokedToken.revoked_at >= self._cursor - SETTLE, RevokedToken.expires_at > started)
+                ).all()
+            # Re-adding an id already in the filter changes nothing
+            for jti in ids:
+                self.add(jti)
+            self._cursor = started
+            return len(ids)
+
+    def on_invalidation(self, key: Optional[str], version: Optional[str]):
+        if key is None:
+            # Messages may have been missed
+            self.refresh()
+        else:
+            self.add(key)
+
+    async def start(self):
+        await asyncio.to_thread(self.rebuild)
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.token_revocation_refresh_seconds)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                break
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception:
+                logger.exception("Token revocation refresh failed")
+
+
+def revoke_token(session: Session, claims: dict, user_id: int) -> bool:
+    """Revoke the token with these (verified) claims when `session` commits.
+
+    Returns False for tokens without a jti, which cannot be revoked.
+    """
+    jti = claims.get("jti")
+    if not jti:
+        return False
+    # Idempotent, so a token signed out twice at once is not an error
+    add_revoked_token(session.connection(), {
+        "jti": jti,
+        "user_id": user_id,
+        "expires_at": datetime.fromtimestamp(claims["exp"], timezone.utc).replace(tzinfo=None),
+        "revoked_at": _utcnow()
+    })
+    invalidation_bus.publish(session, "revoked_token", jti)
+    return True
+
+
+revocation_list = RevocationList()
+
+invalidation_bus.subscribe("revoked_token", revocation_list.on_invalidation)
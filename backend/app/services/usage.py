@@ -0,0 +1,212 @@
+"""Per-user usage metering: events counted in memory, rolled up to hourly and daily tables.
+
+Recording an event only bumps a per-minute counter in this worker's memory.
+Every usage_flush_seconds the counters are swapped out and added to
+usage_hourly and usage_daily in one batched upsert per table, so an API call
+costs no database write. Queries read daily rows for whole days and hourly
+rows for the hours at either end, plus this worker's counts not yet flushed:
+a year of usage is a few hundred rows whatever the traffic. Counts of other
+workers show up once they flush; counts not yet flushed when a worker dies
+are lost.
+"""
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.database import engine
+from app.models.usage_rollup import UsageDaily, UsageHourly, add_usage_counts
+
+logger = logging.getLogger(__name__)
+
+EVENT_API_CALL = "api_call"
+EVENT_SCRAPE_REQUEST = "scrape_request"
+EVENT_DATASET_DOWNLOAD = "dataset_download"
+EVENT_DATASET_EXPORT = "dataset_export"
+
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+
+# (user id, event, minute since the epoch) -> count
+MinuteCounts = Dict[Tuple[int, str, int], int]
+
+
+def utc_naive(moment: datetime) -> datetime:
+    """`moment` in UTC without tzinfo, as bucket starts are stored (naive values are taken as UTC)."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def floor_hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_hour(moment: datetime) -> datetime:
+    floored = floor_hour(moment)
+    return floored if floored == moment else floored + HOUR
+
+
+def floor_day(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def ceil_day(moment: datetime) -> datetime:
+    floored = floor_day(moment)
+    return floored if floored == moment else floored + DAY
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _minute_of(moment: datetime) -> int:
+    return int((utc_naive(moment) - _EPOCH).total_seconds() // 60)
+
+
+def _minute_start(minute: int) -> datetime:
+    return _EPOCH + timedelta(minutes=minute)
+
+
+class UsageMeter:
+    """Counts usage events per user and minute, and flushes them to the rollup tables in batches."""
+
+    def __init__(self, bind=None):
+        self.bind = bind if bind is not None else engine
+        self._lock = threading.Lock()
+        self._minutes: MinuteCounts = defaultdict(int)
+        # Counts swapped out by a flush in progress; still reported until they are committed
+        self._flushing: MinuteCounts = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self.recorded = 0
+        self.flushed_rows = 0
+
+    def record(self, user_id: int, event: str = EVENT_API_CALL, count: int = 1, at: Optional[datetime] = None):
+        """Count `count` events of a user (now, or at `at`)."""
+        minute = _minute_of(at or datetime.now(timezone.utc))
+        with self._lock:
+            self._minutes[(user_id, event, minute)] += count
+            self.recorded += count
+
+    @property
+    def pending(self) -> int:
+        """Minute buckets held in memory, not yet flushed."""
+        with self._lock:
+            return len(self._minutes) + len(self._flushing)
+
+    def unflushed(self, user_id: int, start: datetime, end: datetime) -> List[Tuple[datetime, str, int]]:
+        """This worker's not yet flushed counts of a user in [start, end) (naive UTC): (minute, event, count)."""
+        first, last = _minute_of(start), _minute_of(end)
+        with self._lock:
+            buckets = list(self._minutes.items()) + list(self._flushing.items())
+        return [
+            (_minute_start(minute), event, count)
+            for (owner, event, minute), count in buckets
+            if owner == user_id and first <= minute < last
+        ]
+
+    def flush(self) -> int:
+        """Add the counts gathered so far to the rollup tables; returns the number of hourly rows written."""
+        with self._lock:
+            if not self._minutes:
+                return 0
+            self._flushing, self._minutes = self._minutes, defaultdict(int)
+            flushing = self._flushing
+        hours: Dict[Tuple[int, datetime, str], int] = defaultdict(int)
+        days: Dict[Tuple[int, datetime, str], int] = defaultdict(int)
+        for (user_id, event, minute), count in flushing.items():
+            start = _minute_start(minute)
+            hours[(user_id, floor_hour(start), event)] += count
+            days[(user_id, floor_day(start), event)] += count
+        try:
+            with self.bind.begin() as connection:
+                add_usage_counts(connection, UsageHourly, _rows(hours))
+                add_usage_counts(connection, UsageDaily, _rows(days))
+        except Exception:
+            # Keep the counts for the next flush
+            with self._lock:
+                for key, count in flushing.items():
+                    self._minutes[key] += count
+                self._flushing = {}
+            raise
+        with self._lock:
+            self._flushing = {}
+        self.flushed_rows += len(hours)
+        return len(hours)
+
+    async def start(self):
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        try:
+            await asyncio.to_thread(self.flush)
+        except Exception:
+            logger.exception("Final usage flush failed; %d minute buckets lost", self.pending)
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.usage_flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                break
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception:
+                logger.exception("Usage flush failed")
+
+
+def _rows(counts: Dict[Tuple[int, datetime, str], int]) -> List[dict]:
+    return [
+        {"user_id": user_id, "bucket_start": bucket_start, "event": event, "count": count}
+        for (user_id, bucket_start, event), count in counts.items()
+    ]
+
+
+def usage_by_day(
+    session: Session,
+    user_id: int,
+    start: datetime,
+    end: datetime,
+    meter: Optional[UsageMeter] = None
+) -> Dict[datetime, Dict[str, int]]:
+    """A user's event counts per UTC day over [start, end), both whole hours (naive UTC).
+
+    Whole days come from usage_daily and the hours before the first and
+    after the last midnight from usage_hourly; the meter adds its counts
+    not yet flushed.
+    """
+    meter = meter if meter is not None else usage_meter
+    first_day, last_day = ceil_day(start), floor_day(end)
+    if first_day < last_day:
+        daily = [(first_day, last_day)]
+        hourly = [(start, first_day), (last_day, end)]
+    else:
+        daily, hourly = [], [(start, end)]
+    rows: List[Tuple[datetime, str, int]] = []
+    for model, ranges in ((UsageDaily, daily), (UsageHourly, hourly)):
+        for low, high in ranges:
+            if low < high:
+                rows.extend(session.exec(
+                    select(model.bucket_start, model.event, model.count)
+                    .where(model.user_id == user_id, model.bucket_start >= low, model.bucket_start < high)
+                ).all())
+    rows.extend(meter.unflushed(user_id, start, end))
+    days: Dict[datetime, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for bucket_start, event, count in rows:
+        days[floor_day(bucket_start)][event] += count
+    return {day: dict(events) for day, events in sorted(days.items())}
+
+
+usage_meter = UsageMeter()
@@ -0,0 +1,520 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import random
+import secrets
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import bindparam, and_, insert, or_, update
+from sqlmodel import Session, select, func
+
+from app.core.config import settings
+from app.core.database import engine as default_engine
+from app.models.webhook import Webhook
+from app.models.webhook_delivery import WebhookDelivery, DeliveryStatus
+from app.services.webhook_index import webhook_index
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "X-DataFlow-Signature"
+EVENT_HEADER = "X-DataFlow-Event"
+DELIVERY_HEADER = "X-DataFlow-Delivery"
+BATCH_EVENT = "batch"
+
+
+def _encode(payload: dict) -> bytes:
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def sign_payload(secret: str, timestamp: int, body: bytes) -> str:
+    """Compute the signature header value for a webhook body.
+
+    The signature is HMAC-SHA256 over "<timestamp>.<body>" keyed with the
+    webhook secret, so receivers can reject both tampered and replayed payloads.
+    """
+    message = f"{timestamp}.".encode() + body
+    digest = hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def verify_signature(
+    secret: str,
+    header: str,
+    body: bytes,
+    tolerance_seconds: int = 300,
+    now: Optional[float] = None
+) -> bool:
+    """Verify a signature header produced by sign_payload."""
+    try:
+        parts = dict(item.split("=", 1) for item in header.split(","))
+        timestamp = int(parts["t"])
+        received = parts["v1"]
+    except (KeyError, ValueError):
+        return False
+    current = time.time() if now is None else now
+    if abs(current - timestamp) > tolerance_seconds:
+        return False
+    expected = sign_payload(secret, timestamp, body).split("v1=", 1)[1]
+    return hmac.compare_digest(expected, received)
+
+
+def enqueue_webhook_event(session: Session, user_id: int, event: str, data: dict) -> int:
+    """Add outbox rows for every active webhook of a user subscribed to an event.
+
+    Rows are only added to the session; the caller commits them together with
+    the status change that produced the event, so an event is never lost nor
+    emitted for a write that was rolled back. Subscribers are resolved from the
+    in-memory webhook_index rather than by querying the webhooks table.
+    """
+    if not webhook_index.loaded:
+        webhook_index.load(session)
+    endpoints = webhook_index.lookup(user_id, event)
+    if not endpoints:
+        return 0
+    now = datetime.now(timezone.utc)
+    created_at = now.isoformat()
+    rows = []
+    for endpoint in endpoints:
+        delivery_id = f"dlv_{secrets.token_urlsafe(12)}"
+        # Batched endpoints open a coalescing window: the row waits up to max_delay for company
+        next_attempt_at = now
+        if endpoint.batch_enabled:
+            next_attempt_at = now + timedelta(seconds=endpoint.batch_max_delay_seconds)
+        rows.append({
+            "delivery_id": delivery_id,
+            "webhook_id": endpoint.id,
+            "event": event,
+            "payload": {"id": delivery_id, "event": event, "created_at": created_at, "data": data},
+            "status": DeliveryStatus.PENDING,
+            "attempts": 0,
+            "next_attempt_at": next_attempt_at,
+            "created_at": now
+        })
+    # One executemany rather than an ORM flush, which inserts row by row to fetch primary keys
+    session.execute(insert(WebhookDelivery), rows)
+    return len(endpoints)
+
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff (with jitter) before retry number `attempts`."""
+    ceiling = min(
+        settings.webhook_backoff_max_seconds,
+        settings.webhook_backoff_base_seconds * (2 ** (attempts - 1))
+    )
+    return random.uniform(ceiling / 2, ceiling)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for a single endpoint.
+
+    After `failure_threshold` consecutive failures the circuit opens and no
+    deliveries are attempted for `reset_seconds`; then a single probe is let
+    through, which either closes the circuit again or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    def is_open(self, now: float) -> bool:
+        """Whether the endpoint should not be scheduled at all right now."""
+        if self.opened_at is None:
+            return False
+        return self.probing or now - self.opened_at < self.reset_seconds
+
+    def allow(self, now: float) -> bool:
+        """Whether a delivery may be attempted now (claims the half-open probe)."""
+        if self.opened_at is None:
+            return True
+        if not self.probing and now - self.opened_at >= self.reset_seconds:
+            self.probing = True
+            return True
+        return False
+
+    def retry_in(self, now: float) -> float:
+        """Seconds until the circuit lets a probe through."""
+        if self.opened_at is None:
+            return 0.0
+        return max(self.reset_seconds - (now - self.opened_at), 0.0)
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self, now: float):
+        self.failures += 1
+        self.probing = False
+        if self.failures >= self.failure_threshold:
+            self.opened_at = now
+
+
+@dataclass
+class DeliveryJob:
+    """One outbound request: a claimed outbox row, or several coalesced into a batch."""
+    ids: List[int]
+    delivery_id: str
+    event: str
+    body: bytes
+    attempts: int
+    url: str
+    secret: str
+
+
+@dataclass
+class DeliveryResult:
+    """Outcome of a single delivery attempt."""
+    job: DeliveryJob
+    ok: bool = False
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+    # Set when the attempt was skipped (open circuit) and should not count as a failure
+    deferred_seconds: Optional[float] = None
+
+
+class WebhookDispatcher:
+    """Drains the webhook outbox and delivers events to customer endpoints.
+
+    Rows are claimed in batches with a lease (FOR UPDATE SKIP LOCKED on
+    Postgres) so several workers can run a dispatcher against the same outbox.
+    All requests share one pooled AsyncClient; dead endpoints are
+    short-circuited by a CircuitBreaker. Concurrency is capped per endpoint
+    when claiming: rows are only leased for endpoints with a free slot, so a
+    lease is never spent queued behind other deliveries to the same endpoint.
+    Up to webhook_batch_size rows are in flight at once, and each delivery is
+    recorded as soon as it completes, freeing its slot for the next claim.
+    Webhooks with batching enabled get all their pending events coalesced into
+    a single signed "batch" request.
+    """
+
+    def __init__(self, bind=None, client: Optional[httpx.AsyncClient] = None):
+        self.engine = bind if bind is not None else default_engine
+        self._client = client
+        self._owns_client = client is None
+        # Claimed jobs not yet recorded, per endpoint URL
+        self._active: Dict[str, int] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self.in_flight = 0
+        self.delivered = 0
+        self.failed = 0
+        self.dead = 0
+
+    async def start(self):
+        """Start the background dispatch loop."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=settings.webhook_timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=settings.webhook_max_connections,
+                    max_keepalive_connections=settings.webhook_max_connections
+                ),
+                follow_redirects=False
+            )
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the dispatch loop and close the HTTP pool."""
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _run(self):
+        tasks: Dict[asyncio.Task, DeliveryJob] = {}
+        # When to look for due rows again; 0 while the last claim suggests more are waiting
+        poll_at = 0.0
+        while not self._stopping.is_set():
+            room = settings.webhook_batch_size - len(tasks)
+            if room > 0 and time.monotonic() >= poll_at:
+                try:
+                    jobs, saturated = await asyncio.to_thread(self._claim, room, dict(self._active))
+                except Exception:
+                    logger.exception("Webhook claim failed")
+                    jobs, saturated = [], False
+                for job in jobs:
+                    self._active[job.url] = self._active.get(job.url, 0) + 1
+                    tasks[asyncio.create_task(self._deliver(job))] = job
+                poll_at = 0.0 if saturated else time.monotonic() + settings.webhook_poll_interval_seconds
+            timeout = max(poll_at - time.monotonic(), 0.0) if poll_at else None
+            if not tasks:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            await self._finish({task: tasks.pop(task) for task in done})
+        if tasks:
+            await asyncio.wait(tasks)
+            await self._finish(tasks)
+
+    async def _finish(self, tasks: Dict[asyncio.Task, DeliveryJob]):
+        """Free the slots of finished deliveries and record their outcomes."""
+        results = []
+        for task, job in tasks.items():
+            self._active[job.url] -= 1
+            if not self._active[job.url]:
+                del self._active[job.url]
+            try:
+                results.append(task.result())
+            except Exception:
+                # Left DELIVERING; the row is retried once its lease expires
+                logger.exception("Webhook delivery %s failed unexpectedly", job.delivery_id)
+        if results:
+            try:
+                await asyncio.to_thread(self._record, results)
+            except Exception:
+                logger.exception("Recording webhook deliveries failed")
+
+    def _claim(self, limit: int, active: Dict[str, int]) -> Tuple[List[DeliveryJob], bool]:
+        """Lease up to `limit` due rows for endpoints with a free slot, given the jobs `active` per URL.
+
+        Also returns whether the limit was reached, i.e. more rows are likely due.
+        """
+        now = datetime.now(timezone.utc)
+        clock = time.monotonic()
+        slots = settings.webhook_max_concurrency_per_endpoint
+        # Endpoints with an open circuit or no free slot are not claimed for at all
+        excluded = [url for url, breaker in self._breakers.items() if breaker.is_open(clock)]
+        excluded += [url for url, count in active.items() if count >= slots]
+
+        with Session(self.engine) as session:
+            # DELIVERING rows whose lease expired belong to a worker that died mid-batch
+            statement = (
+                select(WebhookDelivery, Webhook)
+                .join(Webhook, Webhook.id == WebhookDelivery.webhook_id)
+                .where(
+                    WebhookDelivery.status.in_([DeliveryStatus.PENDING, DeliveryStatus.DELIVERING]),
+                    WebhookDelivery.next_attempt_at <= now,
+                    Webhook.is_active == True
+                )
+                .order_by(WebhookDelivery.next_attempt_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True, of=WebhookDelivery)
+            )
+            if excluded:
+                statement = statement.where(Webhook.url.not_in(excluded))
+
+            groups = []
+            windows: Dict[int, Tuple[Webhook, List[WebhookDelivery]]] = {}
+            rows = session.exec(statement).all()
+            for delivery, webhook in rows:
+                if webhook.batch_enabled:
+                    windows.setdefault(webhook.id, (webhook, []))[1].append(delivery)
+                else:
+                    groups.append((webhook, [delivery]))
+            for webhook in self._full_windows(session, excluded, now):
+                windows.setdefault(webhook.id, (webhook, []))
+            for webhook, due in windows.values():
+                groups.append((webhook, self._fill_window(session, webhook, due, now)))
+
+            lease_until = now + timedelta(seconds=settings.webhook_lease_seconds)
+            jobs = []
+            taken = dict(active)
+            for webhook, deliveries in groups:
+                # Rows beyond the endpoint's free slots stay pending, unleased, for a later claim
+                if not deliveries or taken.get(webhook.url, 0) >= slots:
+                    continue
+                taken[webhook.url] = taken.get(webhook.url, 0) + 1
+                for delivery in deliveries:
+                    delivery.status = DeliveryStatus.DELIVERING
+                    delivery.next_attempt_at = lease_until
+                    session.add(delivery)
+                jobs.append(self._job(webhook, deliveries, now))
+            session.commit()
+        return jobs, len(rows) >= limit
+
+    @staticmethod
+    def _batchable(now: datetime):
+        """Pending rows a batch may take early: due ones, and ones still in their first coalescing window.
+
+        Rows waiting out a retry backoff are left alone until it elapses.
+        """
+        return and_(
+            WebhookDelivery.status == DeliveryStatus.PENDING,
+            or_(WebhookDelivery.next_attempt_at <= now, WebhookDelivery.attempts == 0)
+        )
+
+    @staticmethod
+    def _full_windows(session: Session, open_urls: List[str], now: datetime) -> List[Webhook]:
+        """Batched webhooks that already have max_events pending and need not wait out their delay."""
+        statement = (
+            select(Webhook)
+            .join(WebhookDelivery, WebhookDelivery.webhook_id == Webhook.id)
+            .where(
+                Webhook.batch_enabled == True,
+                Webhook.is_active == True,
+                WebhookDispatcher._batchable(now)
+            )
+            .group_by(Webhook.id)
+            .having(func.count(WebhookDelivery.id) >= Webhook.batch_max_events)
+        )
+        if open_urls:
+            statement = statement.where(Webhook.url.not_in(open_urls))
+        return session.exec(statement).all()
+
+    @staticmethod
+    def _fill_window(
+        session: Session,
+        webhook: Webhook,
+        due: List[WebhookDelivery],
+        now: datetime
+    ) -> List[WebhookDelivery]:
+        """Coalesce the due rows of a batched webhook with everything else pending for it.
+
+        Members are taken oldest first until batch_max_events or batch_max_bytes
+        is reached; rows that don't fit stay pending for the next cycle.
+        """
+        due_ids = [d.id for d in due]
+        statement = (
+            select(WebhookDelivery)
+            .where(WebhookDelivery.webhook_id == webhook.id, WebhookDispatcher._batchable(now))
+            .order_by(WebhookDelivery.id)
+            .limit(webhook.batch_max_events)
+            .with_for_update(skip_locked=True)
+        )
+        if due_ids:
+            statement = statement.where(WebhookDelivery.id.not_in(due_ids))
+        candidates = sorted(due + list(session.exec(statement).all()), key=lambda d: d.id)
+
+        members = []
+        size = 0
+        for delivery in candidates[:webhook.batch_max_events]:
+            size += len(_encode(delivery.payload)) + 1
+            if members and size > webhook.batch_max_bytes:
+                break
+            members.append(delivery)
+        return members
+
+    @staticmethod
+    def _job(webhook: Webhook, deliveries: List[WebhookDelivery], now: datetime) -> DeliveryJob:
+        if not webhook.batch_enabled:
+            delivery = deliveries[0]
+            return DeliveryJob(
+                ids=[delivery.id],
+                delivery_id=delivery.delivery_id,
+                event=delivery.event,
+                body=_encode(delivery.payload),
+                attempts=delivery.attempts,
+                url=webhook.url,
+                secret=webhook.secret
+            )
+        batch_id = f"bat_{secrets.token_urlsafe(12)}"
+        envelope = _encode({"id": batch_id, "event": BATCH_EVENT, "created_at": now.isoformat(), "count": len(deliveries)})
+        # Splice the already-serialized events into the envelope instead of re-encoding them
+        body = envelope[:-1] + b',"events":[' + b",".join(_encode(d.payload) for d in deliveries) + b"]}"
+        return DeliveryJob(
+            ids=[d.id for d in deliveries],
+            delivery_id=batch_id,
+            event=BATCH_EVENT,
+            body=body,
+            attempts=max(d.attempts for d in deliveries),
+            url=webhook.url,
+            secret=webhook.secret
+        )
+
+    def _breaker(self, url: str) -> CircuitBreaker:
+        breaker = self._breakers.get(url)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                settings.webhook_circuit_failure_threshold,
+                settings.webhook_circuit_reset_seconds
+            )
+            self._breakers[url] = breaker
+        return breaker
+
+    async def _deliver(self, job: DeliveryJob) -> DeliveryResult:
+        breaker = self._breaker(job.url)
+        clock = time.monotonic()
+        if not breaker.allow(clock):
+            return DeliveryResult(job, deferred_seconds=breaker.retry_in(clock))
+
+        body = job.body
+        headers = {
+            "Content-Type": "application/json",
+            "User-Agent": "DataFlow-Webhooks/1.0",
+            EVENT_HEADER: job.event,
+            DELIVERY_HEADER: job.delivery_id,
+            SIGNATURE_HEADER: sign_payload(job.secret, int(time.time()), body)
+        }
+        self.in_flight += 1
+        try:
+            response = await self._client.post(job.url, content=body, headers=headers)
+        except httpx.HTTPError as e:
+            breaker.record_failure(time.monotonic())
+            return DeliveryResult(job, error=f"{type(e).__name__}: {e}"[:500])
+        finally:
+            self.in_flight -= 1
+
+        if 200 <= response.status_code < 300:
+            breaker.record_success()
+            return DeliveryResult(job, ok=True, status_code=response.status_code)
+        breaker.record_failure(time.monotonic())
+        return DeliveryResult(job, status_code=response.status_code, error=f"HTTP {response.status_code}")
+
+    def _record(self, results: List[DeliveryResult]):
+        now = datetime.now(timezone.utc)
+        params = []
+        for result in results:
+            job = result.job
+            row = {
+                "b_status": DeliveryStatus.PENDING,
+                "b_attempts": job.attempts,
+                "b_next": now,
+                "b_response": result.status_code,
+                "b_error": result.error,
+                "b_delivered": None
+            }
+            if result.ok:
+                row["b_status"] = DeliveryStatus.DELIVERED
+                row["b_attempts"] = job.attempts + 1
+                row["b_delivered"] = now
+                self.delivered += len(job.ids)
+            elif result.deferred_seconds is not None:
+                row["b_next"] = now + timedelta(seconds=result.deferred_seconds)
+                row["b_error"] = "Circuit open"
+            else:
+                row["b_attempts"] = job.attempts + 1
+                self.failed += 1
+                if row["b_attempts"] >= settings.webhook_max_attempts:
+                    # Dead-lettered; only a manual retry puts it back in the queue
+                    row["b_status"] = DeliveryStatus.DEAD
+                    self.dead += len(job.ids)
+                else:
+                    row["b_next"] = now + timedelta(seconds=backoff_delay(row["b_attempts"]))
+            params.extend(dict(row, b_id=delivery_pk) for delivery_pk in job.ids)
+
+        table = WebhookDelivery.__table__
+        statement = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"), table.c.status == DeliveryStatus.DELIVERING)
+            .values(
+                status=bindparam("b_status"),
+                attempts=bindparam("b_attempts"),
+                next_attempt_at=bindparam("b_next"),
+                response_status=bindparam("b_response"),
+                last_error=bindparam("b_error"),
+                delivered_at=bindparam("b_delivered")
+            )
+        )
+        with Session(self.engine) as session:
+            session.connection().execute(statement, params)
+            session.commit()
+
+
+webhook_dispatcher = WebhookDispatcher()
@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlmodel import Session, select, func
+
+from app.core.config import settings
+from app.core.database import engine as default_engine
+from app.models.webhook import Webhook
+from app.services.invalidation import invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class WebhookEndpoint:
+    """The parts of a Webhook row needed to fan out an event."""
+    id: int
+    webhook_id: str
+    url: str
+    secret: str
+    batch_enabled: bool = False
+    batch_max_delay_seconds: float = 0.0
+
+
+class WebhookSubscriptionIndex:
+    """In-memory map of (user_id, event) -> active webhook endpoints.
+
+    Lookups are a single dict access on immutable tuples, so they need no lock;
+    writers rebuild the affected tuples under a lock. Changes made by this
+    worker are applied directly by register_webhook/delete_webhook; changes made
+    by other workers arrive as "webhook" invalidations. Without a cross-process
+    invalidation bus the index instead compares a cheap fingerprint of the
+    webhooks table every `webhook_index_refresh_seconds`.
+    """
+
+    def __init__(self, bind=None):
+        self.engine = bind if bind is not None else default_engine
+        self._by_key: Dict[Tuple[int, str], Tuple[WebhookEndpoint, ...]] = {}
+        self._keys_by_id: Dict[int, List[Tuple[int, str]]] = {}
+        self._lock = threading.Lock()
+        self._fingerprint: Optional[Tuple[int, int, Optional[datetime]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self.loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, user_id: int, event: str) -> Tuple[WebhookEndpoint, ...]:
+        """Endpoints of `user_id` subscribed to `event`."""
+        endpoints = self._by_key.get((user_id, event), ())
+        if endpoints:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return endpoints
+
+    def load(self, session: Session):
+        """Rebuild the whole index from the webhooks table."""
+        fingerprint = self._read_fingerprint(session)
+        webhooks = session.exec(select(Webhook).where(Webhook.is_active == True)).all()
+        by_key: Dict[Tuple[int, str], List[WebhookEndpoint]] = {}
+        keys_by_id: Dict[int, List[Tuple[int, str]]] = {}
+        for webhook in webhooks:
+            endpoint = self._endpoint(webhook)
+            keys = [(webhook.user_id, event) for event in set(webhook.events)]
+            keys_by_id[webhook.id] = keys
+            for key in keys:
+                by_key.setdefault(key, []).append(endpoint)
+        with self._lock:
+            self._by_key = {key: tuple(endpoints) for key, endpoints in by_key.items()}
+            self._keys_by_id = keys_by_id
+            self._fingerprint = fingerprint
+            self.loaded = True
+
+    def add(self, webhook: Webhook):
+        """Index a newly registered webhook."""
+        if not webhook.is_active:
+            return
+        endpoint = self._endpoint(webhook)
+        keys = [(webhook.user_id, event) for event in set(webhook.events)]
+        with self._lock:
+            replaced = self._remove_locked(webhook.id)
+            self._keys_by_id[webhook.id] = keys
+            for key in keys:
+                self._by_key[key] = self._by_key.get(key, ()) + (endpoint,)
+            # Keep the fingerprint in step with our own write so it doesn't trigger a reload
+            if self._fingerprint is not None:
+                count, max_id, updated_at = self._fingerprint
+                edited = webhook.updated_at.replace(tzinfo=None)
+                self._fingerprint = (
+                    count if replaced else count + 1,
+                    max(max_id, webhook.id),
+                    edited if updated_at is None else max(updated_at, edited)
+                )
+
+    def remove(self, webhook_pk: int):
+        """Drop a deleted or deactivated webhook from the index."""
+        with self._lock:
+            if self._remove_locked(webhook_pk) and self._fingerprint is not None:
+                count, max_id, updated_at = self._fingerprint
+                self._fingerprint = (count - 1, max_id, updated_at)
+
+    def _remove_locked(self, webhook_pk: int) -> bool:
+        keys = self._keys_by_id.pop(webhook_pk, None)
+        if keys is None:
+            return False
+        for key in keys:
+            remaining = tuple(e for e in self._by_key.get(key, ()) if e.id != webhook_pk)
+            if remaining:
+                self._by_key[key] = remaining
+            else:
+                self._by_key.pop(key, None)
+        return True
+
+    @staticmethod
+    def _endpoint(webhook: Webhook) -> WebhookEndpoint:
+        return WebhookEndpoint(
+            id=webhook.id,
+            webhook_id=webhook.webhook_id,
+            url=webhook.url,
+            secret=webhook.secret,
+            batch_enabled=webhook.batch_enabled,
+            batch_max_delay_seconds=webhook.batch_max_delay_seconds
+        )
+
+    @staticmethod
+    def _read_fingerprint(session: Session) -> Tuple[int, int, Optional[datetime]]:
+        # Any insert raises max(id); any delete or (de)activation changes the active count;
+        # in-place edits (batch settings) raise max(updated_at)
+        count, max_id, updated_at = session.exec(
+            select(
+                func.count(Webhook.id).filter(Webhook.is_active == True),
+                func.coalesce(func.max(Webhook.id), 0),
+                func.max(Webhook.updated_at)
+            )
+        ).one()
+        return count, max_id, updated_at
+
+    def refresh_if_stale(self, session: Session) -> bool:
+        """Reload if another worker changed the webhooks table. Returns True on reload."""
+        if self.loaded and self._read_fingerprint(session) == self._fingerprint:
+            return False
+        self.load(session)
+        return True
+
+    def _refresh(self):
+        with Session(self.engine) as session:
+            self.refresh_if_stale(session)
+
+    def on_invalidation(self, key: Optional[str], version: Optional[str]):
+        """Apply another worker's change to webhook `key` (None: reload everything)."""
+        with Session(self.engine) as session:
+            if key is None:
+                self.load(session)
+                return
+            webhook = session.get(Webhook, int(key))
+        if webhook is None or not webhook.is_active:
+            self.remove(int(key))
+        else:
+            self.add(webhook)
+
+    async def start(self):
+        """Load the index and start watching for changes from other workers."""
+        await asyncio.to_thread(self._refresh)
+        if invalidation_bus.cross_process:
+            return
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.webhook_index_refresh_seconds)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                break
+            try:
+                await asyncio.to_thread(self._refresh)
+            except Exception:
+                logger.exception("Webhook index refresh failed")
+
+
+webhook_index = WebhookSubscriptionIndex()
+invalidation_bus.subscribe("webhook", webhook_index.on_invalidation, own_writes=False)
@@ -0,0 +1,84 @@
+"""Throughput of column profiling at ingest.
+
+Writes a record file with an int, a float, a bool and a string column of
+`--rows` rows (skewed, like marketplace data), then profiles every column
+with app.services.column_stats. It reports values processed per minute for
+each column, vectorized with NumPy when it is installed and with the
+pure-Python fallback, and the error of the HyperLogLog distinct estimates.
+
+Usage (from the backend directory):
+    python -m benchmarks.column_stats
+    python -m benchmarks.column_stats --rows 10000000 --no-fallback
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+from app.services import column_stats
+from app.services.records import RecordFile, write_record_file
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--distinct", type=int, default=100_000, help="distinct values of the skewed columns")
+    parser.add_argument("--no-fallback", action="store_true", help="skip the pure-Python fallback")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def make_columns(rows: int, distinct: int, rng: random.Random):
+    # Pareto-skewed picks: a few values are very common, most are rare
+    picks = [min(int(rng.paretovariate(1.2)) - 1, distinct - 1) for _ in range(rows)]
+    columns = {
+        "sku": list(range(rows)),
+        "price": [round(2 + pick * 0.37, 2) for pick in picks],
+        "in_stock": [rng.random() < 0.8 for _ in range(rows)],
+        "brand": [f"brand-{pick}" for pick in picks]
+    }
+    types = {"sku": "int", "price": "float", "in_stock": "bool", "brand": "str"}
+    exact = {"sku": rows, "price": len(set(columns["price"])), "in_stock": len(set(columns["in_stock"])),
+             "brand": len(set(picks))}
+    return columns, types, exact
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    print(f"Generating {args.rows:,} rows...")
+    columns, types, exact = make_columns(args.rows, args.distinct, random.Random(args.seed))
+    path = os.path.join(tempfile.mkdtemp(prefix="dataflow-stats-"), "v1.dfrec")
+    write_record_file(path, columns, types)
+    del columns
+
+    modes = []
+    if column_stats.numpy is not None:
+        modes.append(("vectorized", True))
+    else:
+        print("NumPy is not installed: only the fallback runs")
+    if not args.no_fallback or not modes:
+        modes.append(("fallback", False))
+
+    print(f"{'mode':<12}{'column':<10}{'type':<7}{'seconds':>9}{'M values/min':>14}{'distinct':>11}{'exact':>10}{'error':>8}")
+    with RecordFile(path) as records:
+        for mode, vectorized in modes:
+            total = 0.0
+            for name in records.schema:
+                started = time.perf_counter()
+                stats = column_stats.column_stats(records, name, vectorized=vectorized)
+                elapsed = time.perf_counter() - started
+                total += elapsed
+                estimate = stats["distinct_estimate"]
+                error = abs(estimate - exact[name]) / exact[name]
+                print(f"{mode:<12}{name:<10}{stats['type']:<7}{elapsed:>9.3f}{args.rows / elapsed * 60 / 1e6:>14.1f}"
+                      f"{estimate:>11,}{exact[name]:>10,}{error:>7.2%}")
+            print(f"{mode:<12}{'all':<17}{total:>9.3f}{args.rows / total * 60 / 1e6:>14.1f}  (rows/min, every column)")
+    os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""Microbenchmark of response compression on preview-heavy catalog responses.
+
+Captures real responses from the app, then replays them through
+CompressionMiddleware by direct ASGI calls, so the numbers are the
+middleware's own cost without the query or the HTTP client. For each
+endpoint and each encoding this interpreter can produce (gzip always; br and
+zstd when brotli / zstandard are installed) it reports bytes on the wire and
+microseconds per response:
+
+  identity           the uncompressed body passed through
+  <encoding>         compressed for every request (no ETag, nothing cached)
+  <encoding> cached  served from the precompressed ETag cache
+
+Usage (from the backend directory):
+    python -m benchmarks.compression
+    python -m benchmarks.compression --datasets 500 --iterations 1000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--datasets", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=500)
+    return parser.parse_args(argv)
+
+
+def replay_app(status: int, headers: list, body: bytes):
+    """ASGI app that always answers with the captured response."""
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": status, "headers": list(headers)})
+        await send({"type": "http.response.body", "body": body})
+
+    return app
+
+
+async def _per_response_us(app, accept: str, iterations: int):
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept.encode())]}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            sent.append(len(message["body"]))
+
+    await app(scope, receive, send)  # warm up (fills the cache)
+    size = sent[-1]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await app(scope, receive, send)
+    return size, (time.perf_counter() - start) / iterations * 1e6
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'compression.db')}"
+    os.environ["WEBHOOK_DISPATCHER_ENABLED"] = "false"
+    os.environ["COMPRESSION_ENABLED"] = "false"
+
+    from fastapi.testclient import TestClient
+
+    from app.core.compression import CompressedCache, CompressionMiddleware, available_encoders
+    from app.core.config import settings
+    from app.core.database import engine
+    from app.main import app
+    from benchmarks.seed import seed_database
+
+    seed_database(engine, users=10, datasets=args.datasets, scrape_requests=10, webhooks=0)
+    encoders = available_encoders()
+    paths = ["/api/v1/datasets?limit=100", "/api/v1/datasets/1", "/api/v1/datasets/search?q=a&limit=50"]
+
+    with TestClient(app) as client:
+        captured = {path: client.get(path, headers={"Accept-Encoding": "identity"}) for path in paths}
+
+    async def run():
+        print(f"{'endpoint':<40} {'encoding':<12} {'bytes':>8} {'us/response':>12}")
+        for path, response in captured.items():
+            headers = [(k.encode(), v.encode()) for k, v in response.headers.items() if k != "content-length"]
+            headers.append((b"content-length", str(len(response.content)).encode()))
+            without_etag = [(k, v) for k, v in headers if k != b"etag"]
+            passthrough = CompressionMiddleware(replay_app(200, headers, response.content), encoders)
+            rows = [("identity", *await _per_response_us(passthrough, "identity", args.iterations))]
+            for name, encoder in encoders.items():
+                uncached = CompressionMiddleware(replay_app(200, without_etag, response.content), {name: encoder})
+                rows.append((name, *await _per_response_us(uncached, name, args.iterations)))
+                cached = CompressionMiddleware(replay_app(200, headers, response.content), {name: encoder})
+                cached.cache = CompressedCache(settings.compression_cache_max_bytes)
+                rows.append((f"{name} cached", *await _per_response_us(cached, name, args.iterations)))
+            for encoding, size, micros in rows:
+                print(f"{path:<40} {encoding:<12} {size:>8} {micros:>12.1f}")
+
+    asyncio.run(run())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Latency fairness of the scrape dispatcher under skewed load.
+
+A discrete-event simulation of the scrape workers: one heavy tenant submits
+a large batch at time zero while light tenants on every paid plan trickle
+in small batches over the run. The same arrivals are scheduled once in
+submission order (FIFO, what a single shared queue does) and once by the
+dispatcher's FairQueue with the plan weights, per-tenant caps and aging of
+app.services.scrape_dispatcher. For each policy it reports queueing delay
+percentiles of the heavy tenant and of the light tenants by plan, and the
+time the last job finished. No database or network is involved; service
+times are drawn from an exponential distribution with a fixed seed.
+
+Usage (from the backend directory):
+    python -m benchmarks.fair_queue
+    python -m benchmarks.fair_queue --heavy-jobs 100000 --light-tenants 200 --concurrency 16
+"""
+import argparse
+import heapq
+import random
+import sys
+from collections import defaultdict, deque
+from typing import Dict, List, Optional, Tuple
+
+from app.models.user import PlanType
+from app.services.scrape_dispatcher import FairQueue, Job
+
+LIGHT_PLANS = (PlanType.STARTER, PlanType.PROFESSIONAL, PlanType.ENTERPRISE)
+
+# (arrival time, user id, plan, request id)
+Arrival = Tuple[float, int, PlanType, str]
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--heavy-jobs", type=int, default=100000, help="jobs the heavy tenant submits at time zero")
+    parser.add_argument("--heavy-plan", default=PlanType.PROFESSIONAL.value, choices=[plan.value for plan in PlanType])
+    parser.add_argument("--light-tenants", type=int, default=300)
+    parser.add_argument("--light-jobs", type=int, default=5, help="jobs in each light tenant's batch")
+    parser.add_argument("--concurrency", type=int, default=16, help="jobs running at once across all tenants")
+    parser.add_argument("--service-seconds", type=float, default=0.5, help="mean time to run one job")
+    parser.add_argument("--aging-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def make_arrivals(args: argparse.Namespace, rng: random.Random) -> List[Arrival]:
+    heavy_plan = PlanType(args.heavy_plan)
+    arrivals: List[Arrival] = [(0.0, 0, heavy_plan, f"h{i}") for i in range(args.heavy_jobs)]
+    # Light batches arrive uniformly over the time the heavy batch alone would take to drain
+    span = args.heavy_jobs * args.service_seconds / args.concurrency
+    for user_id in range(1, args.light_tenants + 1):
+        at = rng.uniform(0, span)
+        plan = LIGHT_PLANS[user_id % len(LIGHT_PLANS)]
+        arrivals += [(at, user_id, plan, f"l{user_id}_{i}") for i in range(args.light_jobs)]
+    arrivals.sort(key=lambda arrival: arrival[0])
+    return arrivals
+
+
+class FifoQueue:
+    """One shared queue in submission order, no per-tenant caps."""
+
+    def __init__(self):
+        self._jobs = deque()
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def push(self, job: Job, now: float):
+        self._jobs.append(job)
+
+    def pop(self, now: float) -> Optional[Job]:
+        return self._jobs.popleft() if self._jobs else None
+
+    def done(self, job: Job):
+        pass
+
+
+def simulate(queue, arrivals: List[Arrival], concurrency: int, service_seconds: float,
+             seed: int) -> Tuple[Dict[int, List[float]], float]:
+    """Queueing delay of every job, by user id, and the time the last job finished."""
+    rng = random.Random(seed)
+    waits: Dict[int, List[float]] = defaultdict(list)
+    running: List[Tuple[float, int, Job]] = []  # (finish time, tie breaker, job)
+    sequence = 0
+    now = 0.0
+    index = 0
+    while index < len(arrivals) or running or len(queue):
+        next_arrival = arrivals[index][0] if index < len(arrivals) else float("inf")
+        next_finish = running[0][0] if running else float("inf")
+        if next_arrival <= next_finish:
+            now = next_arrival
+            while index < len(arrivals) and arrivals[index][0] <= now:
+                at, user_id, plan, request_id = arrivals[index]
+                queue.push(Job(request_id=request_id, user_id=user_id, plan=plan, enqueued_at=at), now)
+                index += 1
+        else:
+            now, _, job = heapq.heappop(running)
+            queue.done(job)
+        while len(running) < concurrency:
+            job = queue.pop(now)
+            if job is None:
+                break
+            waits[job.user_id].append(now - job.enqueued_at)
+            sequence += 1
+            heapq.heappush(running, (now + rng.expovariate(1 / service_seconds), sequence, job))
+    return waits, now
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def report(name: str, waits: Dict[int, List[float]], arrivals: List[Arrival], makespan: float):
+    plans = {user_id: plan for _, user_id, plan, _ in arrivals}
+    groups: Dict[str, List[float]] = defaultdict(list)
+    for user_id, values in waits.items():
+        label = f"heavy ({plans[user_id].value})" if user_id == 0 else f"light {plans[user_id].value}"
+        groups[label] += values
+    light = [value for user_id, values in waits.items() if user_id != 0 for value in values]
+    print(f"\n{name} (last job finished at {makespan:,.0f}s)")
+    print(f"  {'tenants':<26}{'jobs':>9}{'p50 wait':>12}{'p95 wait':>12}{'max wait':>12}")
+    for label, values in sorted(groups.items()) + [("all light tenants", light)]:
+        print(f"  {label:<26}{len(values):>9,}{percentile(values, 0.5):>11.1f}s"
+              f"{percentile(values, 0.95):>11.1f}s{max(values, default=0.0):>11.1f}s")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    arrivals = make_arrivals(args, random.Random(args.seed))
+    print(f"{args.heavy_jobs:,} heavy jobs at t=0, {args.light_tenants} light tenants x {args.light_jobs} jobs, "
+          f"{args.concurrency} slots, {args.service_seconds}s mean service time")
+    for name, queue in (("FIFO", FifoQueue()), ("Weighted fair queuing", FairQueue(args.aging_rate))):
+        waits, makespan = simulate(queue, arrivals, args.concurrency, args.service_seconds, args.seed)
+        report(name, waits, arrivals, makespan)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
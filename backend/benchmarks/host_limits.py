@@ -0,0 +1,178 @@
+"""Per-host adaptive limits of the scraper against a throttling stand-in server.
+
+Starts a local HTTP server that behaves like a marketplace protecting
+itself: it admits at most `--server-rate` requests per second and answers
+the rest with 429 and `Retry-After: 1`, its latency grows once more than
+`--server-capacity` requests are in flight, and past twice that it answers
+503. The same number of page fetches is then run with a fixed concurrency
+(low and high) and through app.services.host_limits, which adapts the
+concurrency and rate limits of the host. For each it reports fetched pages
+per second, throttled responses and the time to fetch a page (waiting for a
+slot and retries included), plus the limits the adaptive client settled on.
+
+Usage (from the backend directory):
+    python -m benchmarks.host_limits
+    python -m benchmarks.host_limits --requests 3000 --server-rate 200 --fixed 2 64
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from app.services.host_limits import THROTTLE_STATUSES, HostLimit, HostLimits, parse_retry_after
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1500, help="pages fetched per client")
+    parser.add_argument("--workers", type=int, default=200, help="scrape jobs fetching at once (client side)")
+    parser.add_argument("--server-rate", type=float, default=150.0, help="requests per second the server admits")
+    parser.add_argument("--server-capacity", type=int, default=16, help="in-flight requests served at base latency")
+    parser.add_argument("--server-latency-ms", type=float, default=20.0)
+    parser.add_argument("--fixed", type=int, nargs="*", default=[2, 64], help="fixed concurrencies to compare")
+    return parser.parse_args(argv)
+
+
+class ThrottlingServer:
+    """A minimal keep-alive HTTP/1.1 server with a rate limit and load-dependent latency."""
+
+    def __init__(self, rate: float, capacity: int, latency: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.latency = latency
+        self.tokens = rate
+        self.refilled_at = time.monotonic()
+        self.in_flight = 0
+        self.served: Dict[int, int] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def _admit(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.tokens + (now - self.refilled_at) * self.rate, self.rate)
+        self.refilled_at = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    async def _respond(self) -> bytes:
+        if self.in_flight > 2 * self.capacity:
+            status, headers = 503, b"Retry-After: 1\r\n"
+        elif not self._admit():
+            status, headers = 429, b"Retry-After: 1\r\n"
+        else:
+            status, headers = 200, b""
+            self.in_flight += 1
+            try:
+                await asyncio.sleep(self.latency * max(1.0, self.in_flight / self.capacity))
+            finally:
+                self.in_flight -= 1
+        self.served[status] = self.served.get(status, 0) + 1
+        body = b"<html>product page</html>" if status == 200 else b""
+        reason = {200: b"OK", 429: b"Too Many Requests", 503: b"Service Unavailable"}[status]
+        return (b"HTTP/1.1 %d %s\r\nContent-Length: %d\r\n%s\r\n" % (status, reason, len(body), headers)) + body
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                if not head:
+                    break
+                writer.write(await self._respond())
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def run_fixed(client: httpx.AsyncClient, url: str, args: argparse.Namespace, concurrency: int) -> List[float]:
+    """Fetch with a fixed concurrency; each job sleeps out Retry-After on its own and tries again."""
+    semaphore = asyncio.Semaphore(concurrency)
+    remaining = iter(range(args.requests))
+    latencies: List[float] = []
+
+    async def worker():
+        for _ in remaining:
+            started = time.monotonic()
+            while True:
+                async with semaphore:
+                    response = await client.get(url)
+                if response.status_code not in THROTTLE_STATUSES:
+                    break
+                await asyncio.sleep(parse_retry_after(response.headers.get("retry-after")) or 1.0)
+            latencies.append(time.monotonic() - started)
+
+    await asyncio.gather(*(worker() for _ in range(args.workers)))
+    return latencies
+
+
+async def run_adaptive(client: httpx.AsyncClient, url: str, args: argparse.Namespace, limits: HostLimits) -> List[float]:
+    remaining = iter(range(args.requests))
+    latencies: List[float] = []
+
+    async def worker():
+        for _ in remaining:
+            started = time.monotonic()
+            while (await limits.fetch(client, url)).status_code in THROTTLE_STATUSES:
+                pass
+            latencies.append(time.monotonic() - started)
+
+    await asyncio.gather(*(worker() for _ in range(args.workers)))
+    return latencies
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+async def run(args: argparse.Namespace) -> int:
+    print(f"Server admits {args.server_rate:.0f} req/s, {args.server_capacity} in flight at "
+          f"{args.server_latency_ms:.0f} ms; {args.requests} pages per client, {args.workers} jobs")
+    print(f"{'client':<22}{'pages/s':>9}{'429':>7}{'503':>7}{'p50 ms':>10}{'p95 ms':>10}")
+    clients = [(f"fixed concurrency {n}", n) for n in args.fixed] + [("adaptive (AIMD)", None)]
+    for name, concurrency in clients:
+        server = ThrottlingServer(args.server_rate, args.server_capacity, args.server_latency_ms / 1000)
+        base_url = await server.start()
+        limits = HostLimits()
+        host = httpx.URL(base_url).netloc.decode().lower()
+        limits.hosts[host] = HostLimit(
+            host, concurrency=4, max_concurrency=256, rate=5.0, max_rate=10000.0,
+            latency_tolerance=2.0, max_retry_after=60.0
+        )
+        pool = httpx.Limits(max_connections=args.workers, max_keepalive_connections=args.workers)
+        async with httpx.AsyncClient(limits=pool, timeout=60) as client:
+            started = time.monotonic()
+            if concurrency is None:
+                latencies = await run_adaptive(client, base_url + "/product", args, limits)
+            else:
+                latencies = await run_fixed(client, base_url + "/product", args, concurrency)
+            elapsed = time.monotonic() - started
+        await server.stop()
+        print(f"{name:<22}{args.requests / elapsed:>9.1f}{server.served.get(429, 0):>7}{server.served.get(503, 0):>7}"
+              f"{percentile(latencies, 0.5) * 1000:>10.0f}{percentile(latencies, 0.95) * 1000:>10.0f}")
+        if concurrency is None:
+            limit = limits.hosts[host]
+            print(f"{'':<22}settled at {limit.limit:.1f} concurrent, {limit.rate:.1f} req/s")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    return asyncio.run(run(parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
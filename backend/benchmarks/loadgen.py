@@ -0,0 +1,89 @@
+"""Concurrent async load generator and latency statistics."""
+import asyncio
+import math
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List
+
+import httpx
+
+RequestFactory = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+@dataclass
+class LoadResult:
+    """Throughput and latency percentiles of one scenario run."""
+    requests: int
+    errors: int
+    elapsed_seconds: float
+    throughput_rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "elapsed_seconds": round(self.elapsed_seconds, 4),
+            "throughput_rps": round(self.throughput_rps, 2),
+            "p50_ms": round(self.p50_ms, 3),
+            "p95_ms": round(self.p95_ms, 3),
+            "p99_ms": round(self.p99_ms, 3),
+            "max_ms": round(self.max_ms, 3)
+        }
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    make_request: RequestFactory,
+    total_requests: int,
+    concurrency: int,
+    expected_status: Callable[[int], bool] = lambda code: code < 400
+) -> LoadResult:
+    """Issue `total_requests` requests from `concurrency` workers as fast as possible.
+
+    `make_request(client, n)` sends the n-th request; latencies are measured
+    per request from send to full response body.
+    """
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total_requests))
+
+    async def worker():
+        nonlocal errors
+        for n in counter:
+            start = time.perf_counter()
+            try:
+                response = await make_request(client, n)
+                ok = expected_status(response.status_code)
+            except httpx.HTTPError:
+                ok = False
+            latencies.append((time.perf_counter() - start) * 1000)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return LoadResult(
+        requests=total_requests,
+        errors=errors,
+        elapsed_seconds=elapsed,
+        throughput_rps=total_requests / elapsed if elapsed else 0.0,
+        p50_ms=percentile(latencies, 50),
+        p95_ms=percentile(latencies, 95),
+        p99_ms=percentile(latencies, 99),
+        max_ms=latencies[-1] if latencies else 0.0
+    )
@@ -0,0 +1,199 @@
+"""Request scenarios covering every endpoint of the API routers.
+
+Scenarios run in the order listed; a few depend on earlier ones (webhook
+deletes consume webhooks registered by the register scenario, and
+subscribe restores the plan that cancel_subscription downgraded).
+"""
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+from app.core.security import create_access_token
+from benchmarks.seed import SeedInfo
+
+PLATFORMS = ["amazon", "shopify", "ebay", "walmart", "etsy"]
+
+
+@dataclass
+class BenchContext:
+    """State shared by scenarios during a run."""
+    prefix: str
+    seed: SeedInfo
+    headers: Dict[str, str] = field(default_factory=dict)
+    created_webhooks: List[str] = field(default_factory=list)
+
+    def dataset_id(self, n: int) -> int:
+        return self.seed.dataset_ids[n % len(self.seed.dataset_ids)]
+
+    def request_id(self, n: int) -> str:
+        return self.seed.request_ids[n % len(self.seed.request_ids)]
+
+
+@dataclass
+class Scenario:
+    """One endpoint under load."""
+    name: str
+    router: str
+    send: Callable[[httpx.AsyncClient, BenchContext, int], Awaitable[httpx.Response]]
+    # Fraction of the configured request count (bcrypt-bound and write-heavy endpoints run fewer)
+    scale: float = 1.0
+    expected: Callable[[int], bool] = lambda code: code < 400
+
+
+def _get(path: Callable[[BenchContext, int], str], auth: bool = False, params=None):
+    async def send(client: httpx.AsyncClient, ctx: BenchContext, n: int) -> httpx.Response:
+        return await client.get(ctx.prefix + path(ctx, n), params=params, headers=ctx.headers if auth else None)
+    return send
+
+
+async def _signin(client, ctx, n):
+    return await client.post(
+        ctx.prefix + "/auth/signin",
+        data={"username": ctx.seed.bench_email, "password": ctx.seed.bench_password}
+    )
+
+
+async def _refresh(client, ctx, n):
+    return await client.post(ctx.prefix + "/auth/refresh", headers=ctx.headers)
+
+
+async def _signout(client, ctx, n):
+    # Signing out revokes the token, so each request signs out a fresh one rather than the shared ctx.headers
+    token = create_access_token({"sub": ctx.seed.bench_email})
+    return await client.post(ctx.prefix + "/auth/signout", headers={"Authorization": f"Bearer {token}"})
+
+
+async def _reset_password(client, ctx, n):
+    return await client.post(ctx.prefix + "/auth/reset-password", json={"email": f"user{n % 500}@example.com"})
+
+
+async def _signup(client, ctx, n):
+    return await client.post(
+        ctx.prefix + "/auth/signup",
+        json={"email": f"signup{n}-{id(ctx)}@example.com", "password": "Passw0rdBench", "name": "Bench Signup"}
+    )
+
+
+async def _create_dataset(client, ctx, n):
+    return await client.post(ctx.prefix + "/datasets", headers=ctx.headers, json={
+        "name": f"Bench Dataset {n}",
+        "platform": PLATFORMS[n % len(PLATFORMS)],
+        "category": "electronics",
+        "description": "Created by the load benchmark",
+        "record_count": 1000,
+        "size": "1 MB",
+        "tags": ["bench"],
+        "preview_data": [{"sku": "SKU-1", "price": 9.99}]
+    })
+
+
+async def _download(client, ctx, n):
+    return await client.post(f"{ctx.prefix}/datasets/{ctx.dataset_id(n)}/download", headers=ctx.headers)
+
+
+async def _export(client, ctx, n):
+    return await client.post(f"{ctx.prefix}/datasets/{ctx.dataset_id(n)}/export", headers=ctx.headers, json={"format": "csv"})
+
+
+async def _submit_scrape(client, ctx, n):
+    return await client.post(ctx.prefix + "/scrape", headers=ctx.headers, json={
+        "url": f"https://www.amazon.com/item/bench-{n}",
+        "platform": "amazon",
+        "fields": ["title", "price"]
+    })
+
+
+async def _cancel_scrape(client, ctx, n):
+    return await client.delete(f"{ctx.prefix}/scrape/{ctx.request_id(n)}", headers=ctx.headers)
+
+
+async def _update_account(client, ctx, n):
+    return await client.put(ctx.prefix + "/account", headers=ctx.headers, json={"name": f"Bench User {n % 10}"})
+
+
+async def _regenerate_api_key(client, ctx, n):
+    return await client.post(ctx.prefix + "/account/api-key/regenerate", headers=ctx.headers)
+
+
+async def _subscribe(client, ctx, n):
+    return await client.post(ctx.prefix + "/billing/subscribe", params={"plan_id": "professional"}, headers=ctx.headers)
+
+
+async def _update_subscription(client, ctx, n):
+    return await client.put(ctx.prefix + "/billing/subscription", params={"plan_id": "professional"}, headers=ctx.headers)
+
+
+async def _cancel_subscription(client, ctx, n):
+    return await client.delete(ctx.prefix + "/billing/subscription", headers=ctx.headers)
+
+
+async def _register_webhook(client, ctx, n):
+    response = await client.post(ctx.prefix + "/webhooks", headers=ctx.headers, json={
+        "url": f"https://bench-hooks-{n}.example.com/dataflow",
+        "events": ["scrape.completed"]
+    })
+    if response.status_code == 200:
+        ctx.created_webhooks.append(response.json()["webhook_id"])
+    return response
+
+
+async def _update_webhook_batch(client, ctx, n):
+    webhook_id = ctx.created_webhooks[n % len(ctx.created_webhooks)]
+    return await client.put(f"{ctx.prefix}/webhooks/{webhook_id}/batch", headers=ctx.headers, json={"enabled": True})
+
+
+async def _delete_webhook(client, ctx, n):
+    webhook_id = ctx.created_webhooks.pop() if ctx.created_webhooks else "wh_missing"
+    return await client.delete(f"{ctx.prefix}/webhooks/{webhook_id}", headers=ctx.headers)
+
+
+SCENARIOS: List[Scenario] = [
+    # auth
+    Scenario("auth.signin", "auth", _signin, scale=0.05),
+    Scenario("auth.signup", "auth", _signup, scale=0.05),
+    Scenario("auth.me", "auth", _get(lambda ctx, n: "/auth/me", auth=True)),
+    Scenario("auth.refresh", "auth", _refresh),
+    Scenario("auth.signout", "auth", _signout),
+    Scenario("auth.reset_password", "auth", _reset_password),
+    # datasets
+    Scenario("datasets.list", "datasets", _get(lambda ctx, n: "/datasets")),
+    Scenario("datasets.list_filtered", "datasets", _get(
+        lambda ctx, n: "/datasets", params={"platform": "amazon", "category": "electronics", "is_premium": "false"}
+    )),
+    Scenario("datasets.list_search", "datasets", _get(lambda ctx, n: "/datasets", params={"search": "Electronics"})),
+    Scenario("datasets.list_deep_page", "datasets", _get(lambda ctx, n: "/datasets", params={"offset": "2000", "limit": "100"})),
+    Scenario("datasets.search", "datasets", _get(lambda ctx, n: "/datasets/search", params={"q": "home"})),
+    Scenario("datasets.facets", "datasets", _get(lambda ctx, n: "/datasets/facets")),
+    Scenario("datasets.facets_filtered", "datasets", _get(lambda ctx, n: "/datasets/facets", params={"platform": "amazon", "is_premium": "true"})),
+    Scenario("datasets.get", "datasets", _get(lambda ctx, n: f"/datasets/{ctx.dataset_id(n)}")),
+    Scenario("datasets.preview", "datasets", _get(lambda ctx, n: f"/datasets/{ctx.dataset_id(n)}/preview")),
+    Scenario("datasets.download", "datasets", _download),
+    Scenario("datasets.export", "datasets", _export),
+    Scenario("datasets.create", "datasets", _create_dataset, scale=0.2),
+    # scrape
+    Scenario("scrape.submit", "scrape", _submit_scrape, scale=0.2),
+    Scenario("scrape.status", "scrape", _get(lambda ctx, n: f"/scrape/{ctx.request_id(n)}", auth=True)),
+    Scenario("scrape.results", "scrape", _get(lambda ctx, n: f"/scrape/{ctx.request_id(n)}/results", auth=True)),
+    Scenario("scrape.history", "scrape", _get(lambda ctx, n: "/scrape", auth=True)),
+    # Seeded requests are mostly completed, so "not cancellable" is the expected answer
+    Scenario("scrape.cancel", "scrape", _cancel_scrape, scale=0.2, expected=lambda code: code in (200, 400)),
+    # account
+    Scenario("account.get", "account", _get(lambda ctx, n: "/account", auth=True)),
+    Scenario("account.update", "account", _update_account, scale=0.2),
+    Scenario("account.usage", "account", _get(lambda ctx, n: "/account/usage", auth=True)),
+    Scenario("account.api_key", "account", _get(lambda ctx, n: "/account/api-key", auth=True)),
+    Scenario("account.regenerate_api_key", "account", _regenerate_api_key, scale=0.2),
+    # billing
+    Scenario("billing.plans", "billing", _get(lambda ctx, n: "/billing/plans")),
+    Scenario("billing.invoices", "billing", _get(lambda ctx, n: "/billing/invoices", auth=True)),
+    Scenario("billing.update_subscription", "billing", _update_subscription, scale=0.2),
+    Scenario("billing.cancel_subscription", "billing", _cancel_subscription, scale=0.2),
+    Scenario("billing.subscribe", "billing", _subscribe, scale=0.2),
+    # webhooks
+    Scenario("webhooks.register", "webhooks", _register_webhook, scale=0.2),
+    Scenario("webhooks.list", "webhooks", _get(lambda ctx, n: "/webhooks", auth=True)),
+    Scenario("webhooks.update_batch", "webhooks", _update_webhook_batch, scale=0.2),
+    Scenario("webhooks.dead_letters", "webhooks", _get(lambda ctx, n: "/webhooks/dead-letters", auth=True)),
+    Scenario("webhooks.delete", "webhooks", _delete_webhook, scale=0.2),
+]
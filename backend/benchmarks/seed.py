@@ -0,0 +1,142 @@
+"""Seed a database with realistic volumes for the load benchmarks."""
+import random
+import secrets
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from sqlalchemy import insert
+from sqlmodel import Session
+
+from app.core.migrations import upgrade_database
+from app.core.security import get_password_hash
+from app.models.dataset import Dataset, Platform
+from app.models.dataset_change import backfill_dataset_changes
+from app.models.dataset_facet import rebuild_dataset_facets
+from app.models.scrape_request import ScrapeRequest, ScrapeStatus
+from app.models.user import User, PlanType
+from app.models.webhook import Webhook
+
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "BenchPassw0rd"
+
+CATEGORIES = ["electronics", "home", "fashion", "beauty", "toys", "sports", "books", "grocery", "automotive", "garden"]
+CHUNK_SIZE = 5000
+
+
+@dataclass
+class SeedInfo:
+    """Identifiers the scenarios need to address seeded rows."""
+    bench_email: str = BENCH_EMAIL
+    bench_password: str = BENCH_PASSWORD
+    bench_user_id: int = 1
+    dataset_ids: List[int] = field(default_factory=list)
+    request_ids: List[str] = field(default_factory=list)
+
+
+def _insert_chunks(session: Session, table, rows):
+    for start in range(0, len(rows), CHUNK_SIZE):
+        session.execute(insert(table), rows[start:start + CHUNK_SIZE])
+
+
+def seed_database(
+    engine,
+    users: int = 1000,
+    datasets: int = 5000,
+    scrape_requests: int = 50000,
+    webhooks: int = 2000,
+    seed: int = 42
+) -> SeedInfo:
+    """Migrate the schema and bulk-insert users, datasets, scrape requests and webhooks.
+
+    User 1 is the benchmark user (professional plan) and owns a tenth of the
+    scrape requests so history and status lookups hit a realistic backlog.
+    """
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    upgrade_database(engine)
+    # bcrypt is deliberately slow; hash once and share it across seeded users
+    hashed_password = get_password_hash(BENCH_PASSWORD)
+    plans = list(PlanType)
+    platforms = list(Platform)
+    info = SeedInfo()
+
+    user_rows = [{
+        "email": BENCH_EMAIL if i == 0 else f"user{i}@example.com",
+        "name": "Bench User" if i == 0 else f"User {i}",
+        "hashed_password": hashed_password,
+        "plan": PlanType.PROFESSIONAL if i == 0 else rng.choice(plans),
+        "api_key": f"sk_{secrets.token_urlsafe(32)}",
+        "is_active": True,
+        "created_at": now - timedelta(days=rng.randint(0, 720)),
+        "updated_at": now,
+        "api_calls_used": rng.randint(0, 50000)
+    } for i in range(users)]
+
+    dataset_rows = []
+    for i in range(datasets):
+        platform = rng.choice(platforms)
+        category = rng.choice(CATEGORIES)
+        dataset_rows.append({
+            "name": f"{platform.value.title()} {category.title()} Dataset {i}",
+            "platform": platform,
+            "category": category,
+            "description": f"Product listings, prices and reviews for {category} on {platform.value}.",
+            "record_count": rng.randint(1000, 5_000_000),
+            "size": f"{rng.randint(1, 900)} MB",
+            "is_premium": rng.random() < 0.3,
+            "tags": rng.sample(CATEGORIES, 3),
+            "preview_data": [
+                {"sku": f"SKU-{i}-{n}", "title": f"Item {n}", "price": round(rng.uniform(1, 500), 2), "rating": rng.randint(1, 5)}
+                for n in range(5)
+            ],
+            "last_updated": now - timedelta(hours=rng.randint(0, 2000)),
+            "created_at": now - timedelta(days=rng.randint(0, 720))
+        })
+
+    scrape_rows = []
+    for i in range(scrape_requests):
+        user_id = 1 if i % 10 == 0 else rng.randint(1, users)
+        request_id = f"req_bench_{i}"
+        created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+        status = rng.choices(
+            [ScrapeStatus.COMPLETED, ScrapeStatus.FAILED, ScrapeStatus.PROCESSING, ScrapeStatus.PENDING],
+            [85, 5, 5, 5]
+        )[0]
+        scrape_rows.append({
+            "request_id": request_id,
+            "user_id": user_id,
+            "url": f"https://www.{rng.choice(platforms).value}.com/item/{i}",
+            "platform": rng.choice(platforms).value,
+            "status": status,
+            "fields": ["title", "price"],
+            "result_data": {"scraped": True, "data": {"title": f"Item {i}"}} if status == ScrapeStatus.COMPLETED else None,
+            "result_count": 1 if status == ScrapeStatus.COMPLETED else 0,
+            "created_at": created_at,
+            "completed_at": created_at + timedelta(seconds=30) if status == ScrapeStatus.COMPLETED else None
+        })
+        if user_id == 1 and status == ScrapeStatus.COMPLETED and len(info.request_ids) < 1000:
+            info.request_ids.append(request_id)
+
+    webhook_rows = [{
+        "webhook_id": f"wh_bench_{i}",
+        "user_id": 1 if i % 20 == 0 else rng.randint(1, users),
+        "url": f"https://hooks{i}.example.com/dataflow",
+        "events": ["scrape.completed", "scrape.failed"],
+        "is_active": True,
+        "secret": secrets.token_urlsafe(32),
+        "created_at": now
+    } for i in range(webhooks)]
+
+    with Session(engine) as session:
+        _insert_chunks(session, User.__table__, user_rows)
+        _insert_chunks(session, Dataset.__table__, dataset_rows)
+        _insert_chunks(session, ScrapeRequest.__table__, scrape_rows)
+        _insert_chunks(session, Webhook.__table__, webhook_rows)
+        # Core inserts skip the ORM events that maintain facet counts and the change feed
+        rebuild_dataset_facets(session.connection())
+        backfill_dataset_changes(session.connection())
+        session.commit()
+
+    info.dataset_ids = list(range(1, datasets + 1))
+    return info
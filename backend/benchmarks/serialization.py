@@ -0,0 +1,176 @@
+"""Microbenchmark of list-endpoint serialization, before and after the fast path.
+
+For list_datasets, get_scrape_history and list_webhooks this compares:
+
+  before: ORM entities -> Pydantic response models -> FastAPI response_model
+          validation and encoding (fastapi.routing.serialize_response) -> json.dumps
+  after:  column tuples -> dicts (RowSerializer) -> orjson, no revalidation
+
+Both paths run the same queries against the same seeded SQLite database and
+must produce identical JSON. Costs are reported per row, split into fetching
+(query plus row materialization) and serializing.
+
+Usage (from the backend directory):
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --rows 100 --iterations 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, List, Optional
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100, help="Rows per response (the endpoints' page size limit)")
+    parser.add_argument("--iterations", type=int, default=200)
+    return parser.parse_args(argv)
+
+
+def _per_row_us(fn: Callable[[], object], iterations: int, rows: int) -> float:
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations / rows * 1e6
+
+
+def _render_stdlib(content) -> bytes:
+    # What starlette.responses.JSONResponse.render does
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'serialization.db')}"
+
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_model_field
+    from sqlmodel import Session, select
+
+    from app.api.datasets import dataset_list_fields
+    from app.api.scrape import scrape_history_fields
+    from app.api.webhooks import batch_settings
+    from app.core.database import engine
+    from app.core.responses import fast_json
+    from app.models.dataset import Dataset
+    from app.models.scrape_request import ScrapeRequest
+    from app.models.webhook import Webhook
+    from app.schemas.dataset import DatasetListResponse, DatasetResponse
+    from app.schemas.scrape import ScrapeHistoryResponse, ScrapeRequestResponse
+    from benchmarks.seed import seed_database
+
+    rows = args.rows
+    seed_database(engine, users=10, datasets=rows, scrape_requests=rows * 10, webhooks=rows * 20)
+    session = Session(engine)
+    loop = asyncio.new_event_loop()
+
+    def fastapi_encode(model, content):
+        field = create_model_field(name="response", type_=model, mode="serialization")
+        return loop.run_until_complete(serialize_response(field=field, response_content=content))
+
+    # Each endpoint: (before fetch, before serialize, after fetch, after serialize)
+    def datasets_before_fetch():
+        return session.exec(select(Dataset).limit(rows)).all()
+
+    def datasets_before_serialize(datasets):
+        response = DatasetListResponse(datasets=[
+            DatasetResponse(
+                id=d.id, name=d.name, platform=d.platform, category=d.category, description=d.description,
+                record_count=d.record_count, size=d.size, is_premium=d.is_premium, tags=d.tags,
+                preview_data=d.preview_data, last_updated=d.last_updated.isoformat()
+            ) for d in datasets
+        ], total=len(datasets), page=1, per_page=rows)
+        return _render_stdlib(fastapi_encode(DatasetListResponse, response))
+
+    def datasets_after_fetch():
+        return session.exec(dataset_list_fields.select().limit(rows)).all()
+
+    def datasets_after_serialize(result):
+        content = {"datasets": dataset_list_fields.serialize(result), "total": len(result), "page": 1, "per_page": rows}
+        return fast_json(content).body
+
+    history = select(ScrapeRequest).where(ScrapeRequest.user_id == 1).order_by(ScrapeRequest.created_at.desc()).limit(rows)
+
+    def history_before_fetch():
+        return session.exec(history).all()
+
+    def history_before_serialize(requests):
+        response = ScrapeHistoryResponse(requests=[
+            ScrapeRequestResponse(
+                request_id=r.request_id, url=r.url, platform=r.platform, status=r.status,
+                result_count=r.result_count, created_at=r.created_at.isoformat(),
+                completed_at=r.completed_at.isoformat() if r.completed_at else None
+            ) for r in requests
+        ], total=len(requests))
+        return _render_stdlib(fastapi_encode(ScrapeHistoryResponse, response))
+
+    def history_after_fetch():
+        return session.exec(
+            scrape_history_fields.select().where(ScrapeRequest.user_id == 1)
+            .order_by(ScrapeRequest.created_at.desc()).limit(rows)
+        ).all()
+
+    def history_after_serialize(result):
+        return fast_json({"requests": scrape_history_fields.serialize(result), "total": len(result)}).body
+
+    def webhooks_before_fetch():
+        return session.exec(select(Webhook).where(Webhook.user_id == 1).limit(rows)).all()
+
+    def webhooks_before_serialize(webhooks):
+        # list_webhooks had no response_model; FastAPI still ran jsonable_encoder over the dicts
+        content = {"webhooks": [{
+            "webhook_id": w.webhook_id, "url": w.url, "events": w.events, "is_active": w.is_active,
+            "batch": batch_settings(w), "created_at": w.created_at.isoformat()
+        } for w in webhooks]}
+        return _render_stdlib(loop.run_until_complete(serialize_response(response_content=content)))
+
+    def webhooks_after_fetch():
+        return session.exec(select(
+            Webhook.webhook_id, Webhook.url, Webhook.events, Webhook.is_active, Webhook.batch_enabled,
+            Webhook.batch_max_events, Webhook.batch_max_bytes, Webhook.batch_max_delay_seconds, Webhook.created_at
+        ).where(Webhook.user_id == 1).limit(rows)).all()
+
+    def webhooks_after_serialize(result):
+        return fast_json({"webhooks": [{
+            "webhook_id": webhook_id, "url": url, "events": events, "is_active": is_active,
+            "batch": {"enabled": enabled, "max_events": max_events, "max_bytes": max_bytes, "max_delay_seconds": max_delay},
+            "created_at": created_at
+        } for webhook_id, url, events, is_active, enabled, max_events, max_bytes, max_delay, created_at in result]}).body
+
+    cases = [
+        ("list_datasets", datasets_before_fetch, datasets_before_serialize, datasets_after_fetch, datasets_after_serialize),
+        ("get_scrape_history", history_before_fetch, history_before_serialize, history_after_fetch, history_after_serialize),
+        ("list_webhooks", webhooks_before_fetch, webhooks_before_serialize, webhooks_after_fetch, webhooks_after_serialize),
+    ]
+
+    print(f"{'endpoint':<20} {'rows':>5} {'before fetch':>13} {'before ser.':>12} {'after fetch':>12} {'after ser.':>11} {'speedup':>8}  (us/row)")
+    failed = False
+    for name, before_fetch, before_serialize, after_fetch, after_serialize in cases:
+        before_rows, after_rows = before_fetch(), after_fetch()
+        count = len(after_rows)
+        if json.loads(before_serialize(before_rows)) != json.loads(after_serialize(after_rows)):
+            print(f"{name}: fast path output differs from the original", file=sys.stderr)
+            failed = True
+            continue
+        # expire_all so every fetch materializes fresh ORM objects, as a new request session would
+        timings = [
+            _per_row_us(lambda: (session.expire_all(), before_fetch()), args.iterations, count),
+            _per_row_us(lambda: before_serialize(before_rows), args.iterations, count),
+            _per_row_us(after_fetch, args.iterations, count),
+            _per_row_us(lambda: after_serialize(after_rows), args.iterations, count),
+        ]
+        speedup = (timings[0] + timings[1]) / (timings[2] + timings[3])
+        print(f"{name:<20} {count:>5} {timings[0]:>13.2f} {timings[1]:>12.2f} {timings[2]:>12.2f} {timings[3]:>11.2f} {speedup:>7.1f}x")
+
+    session.close()
+    loop.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
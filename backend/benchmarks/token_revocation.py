@@ -0,0 +1,118 @@
+"""Token revocation: Bloom filter false positive rate and revocation check latency.
+
+First fills Bloom filters sized for `--capacity` ids at each target false
+positive rate with 0.5x, 1x and 2x their capacity, and probes them with ids
+never added, reporting the measured false positive rate against the
+target. Then revokes `--revoked` tokens in a temporary SQLite database and
+times app.services.token_revocation.RevocationList.is_revoked, the check
+run on every authenticated request, for tokens that are not revoked and
+for revoked ones, with the filter in front of the table and with the
+table alone.
+
+Usage (from the backend directory):
+    python -m benchmarks.token_revocation
+    python -m benchmarks.token_revocation --capacity 1000000 --revoked 200000 --rates 0.01 0.001
+"""
+import argparse
+import os
+import secrets
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlmodel import Session, create_engine
+
+from app.core.config import settings
+from app.core.migrations import upgrade_database
+from app.models.revoked_token import RevokedToken
+from app.models.user import User
+from app.services.token_revocation import BloomFilter, RevocationList
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--capacity", type=int, default=100_000, help="ids each filter is sized for")
+    parser.add_argument("--rates", type=float, nargs="*", default=[0.01, 0.001, 0.0001],
+                        help="target false positive rates")
+    parser.add_argument("--probes", type=int, default=200_000, help="ids never added, probed per filter")
+    parser.add_argument("--revoked", type=int, default=50_000, help="revoked tokens in the latency test")
+    parser.add_argument("--checks", type=int, default=20_000, help="checks timed per case")
+    return parser.parse_args(argv)
+
+
+def token_id() -> str:
+    return secrets.token_urlsafe(16)
+
+
+def false_positive_rates(args: argparse.Namespace):
+    print(f"{'target':>8}{'fill':>6}{'bits/id':>9}{'hashes':>8}{'expected':>10}{'measured':>10}")
+    probes = [token_id() for _ in range(args.probes)]
+    for rate in args.rates:
+        for fill in (0.5, 1.0, 2.0):
+            bloom = BloomFilter.for_capacity(args.capacity, rate)
+            for _ in range(int(args.capacity * fill)):
+                bloom.add(token_id())
+            measured = sum(1 for probe in probes if probe in bloom) / len(probes)
+            print(f"{rate:>8.4%}{fill:>6.1f}{bloom.size / args.capacity:>9.1f}{bloom.hashes:>8}"
+                  f"{bloom.false_positive_rate():>10.4%}{measured:>10.4%}")
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def check_latency(args: argparse.Namespace):
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'revocation.db')}")
+    upgrade_database(engine)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    revoked = [token_id() for _ in range(args.revoked)]
+    with Session(engine) as session:
+        user = User(email="revocation@example.com", name="Revocation", hashed_password="x")
+        session.add(user)
+        session.commit()
+        session.execute(RevokedToken.__table__.insert(), [
+            {"jti": jti, "user_id": user.id, "expires_at": now + timedelta(minutes=30), "revoked_at": now}
+            for jti in revoked
+        ])
+        session.commit()
+
+    settings.token_revocation_capacity = max(settings.token_revocation_capacity, args.revoked)
+    with_filter = RevocationList(bind=engine)
+    started = time.perf_counter()
+    with_filter.rebuild()
+    print(f"\nRebuilt the filter from {args.revoked:,} revoked ids in {time.perf_counter() - started:.2f}s "
+          f"({len(with_filter.filter.bits) / 1024:.0f} KiB)")
+    table_only = RevocationList(bind=engine)
+
+    print(f"{'case':<34}{'p50 us':>9}{'p99 us':>9}{'queries':>9}")
+    valid = [token_id() for _ in range(args.checks)]
+    cases = [
+        ("not revoked, filter + table", with_filter, valid),
+        ("not revoked, table only", table_only, valid),
+        ("revoked, filter + table", with_filter, revoked[:args.checks]),
+        ("revoked, table only", table_only, revoked[:args.checks])
+    ]
+    with Session(engine) as session:
+        for name, revocations, ids in cases:
+            lookups = revocations.lookups
+            latencies = []
+            for jti in ids:
+                started = time.perf_counter()
+                revocations.is_revoked(session, jti)
+                latencies.append(time.perf_counter() - started)
+            print(f"{name:<34}{percentile(latencies, 0.5) * 1e6:>9.1f}{percentile(latencies, 0.99) * 1e6:>9.1f}"
+                  f"{revocations.lookups - lookups:>9,}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    false_positive_rates(args)
+    check_latency(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
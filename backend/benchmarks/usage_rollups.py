@@ -0,0 +1,99 @@
+"""Usage metering: cost of recording events, of flushing rollups and of usage queries.
+
+Records `--events` usage events for `--users` users, spread over the last
+`--days` days (a few heavy users, like real API traffic), through
+app.services.usage.UsageMeter on a temporary SQLite database. Events are
+flushed to the rollup tables every `--flush-every` events, as the periodic
+flush would. It reports events recorded per second, the rows and time of
+each flush, and the latency of the /account/usage periods for the heaviest
+user; the table sizes show how far the rollups sit below one row per event.
+
+Usage (from the backend directory):
+    python -m benchmarks.usage_rollups
+    python -m benchmarks.usage_rollups --events 5000000 --users 1000 --days 365
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlmodel import Session, create_engine, func, select
+
+from app.core.migrations import upgrade_database
+from app.models.usage_rollup import UsageDaily, UsageHourly
+from app.models.user import User
+from app.services.usage import EVENT_API_CALL, EVENT_SCRAPE_REQUEST, UsageMeter, ceil_hour, usage_by_day, utc_naive
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--days", type=int, default=90, help="events are spread over this many past days")
+    parser.add_argument("--flush-every", type=int, default=100_000, help="events recorded between flushes")
+    parser.add_argument("--queries", type=int, default=50, help="repetitions of each usage query")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'usage.db')}")
+    upgrade_database(engine)
+    with Session(engine) as session:
+        users = [User(email=f"usage{i}@example.com", name=f"Usage {i}", hashed_password="x") for i in range(args.users)]
+        session.add_all(users)
+        session.commit()
+        user_ids = [user.id for user in users]
+
+    meter = UsageMeter(bind=engine)
+    now = datetime.now(timezone.utc)
+    # Pareto-skewed users, events timestamped anywhere in the window
+    picks = [user_ids[min(int(rng.paretovariate(1.1)) - 1, args.users - 1)] for _ in range(args.events)]
+    moments = [now - timedelta(seconds=rng.random() * args.days * 86400) for _ in range(args.events)]
+
+    recording = flushing = 0.0
+    flushes = 0
+    for first in range(0, args.events, args.flush_every):
+        started = time.perf_counter()
+        for n in range(first, min(first + args.flush_every, args.events)):
+            meter.record(picks[n], EVENT_SCRAPE_REQUEST if n % 20 == 0 else EVENT_API_CALL, at=moments[n])
+        recording += time.perf_counter() - started
+        started = time.perf_counter()
+        meter.flush()
+        flushing += time.perf_counter() - started
+        flushes += 1
+
+    with Session(engine) as session:
+        hourly = session.exec(select(func.count()).select_from(UsageHourly)).one()
+        daily = session.exec(select(func.count()).select_from(UsageDaily)).one()
+    print(f"{args.events:,} events, {args.users} users over {args.days} days")
+    print(f"record: {args.events / recording:,.0f} events/s ({recording / args.events * 1e6:.2f} us each)")
+    print(f"flush:  {flushes} flushes, {flushing / flushes * 1000:.1f} ms each, "
+          f"{args.events / flushing:,.0f} events/s rolled up")
+    print(f"rows:   {hourly:,} hourly + {daily:,} daily ({(hourly + daily) / args.events:.3f} per event)")
+
+    heaviest = Counter(picks).most_common(1)[0][0]
+    end = ceil_hour(utc_naive(now))
+    periods = [("current", end.replace(day=1, hour=0)), ("last_7d", end - timedelta(days=7)),
+               ("last_30d", end - timedelta(days=30)), (f"last_{args.days}d", end - timedelta(days=args.days))]
+    print(f"{'period':<12}{'ms/query':>10}{'api_calls':>12}")
+    with Session(engine) as session:
+        for name, start in periods:
+            started = time.perf_counter()
+            for _ in range(args.queries):
+                days = usage_by_day(session, heaviest, start, end, meter=meter)
+            elapsed = (time.perf_counter() - started) / args.queries
+            calls = sum(events.get(EVENT_API_CALL, 0) for events in days.values())
+            print(f"{name:<12}{elapsed * 1000:>10.2f}{calls:>12,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""Webhook delivery throughput benchmark.
+
+Drives WebhookDispatcher against an in-process receiver stand-in that checks
+every signature, with a share of endpoints permanently failing so retries,
+circuit breaking and dead-lettering are exercised alongside the happy path.
+With --batch every webhook uses batched delivery, so the request count shows
+how much coalescing saves.
+
+Usage (from the backend directory):
+    python -m benchmarks.webhook_delivery --deliveries 5000 --endpoints 20 --dead-endpoints 2
+    python -m benchmarks.webhook_delivery --deliveries 50000 --endpoints 5 --dead-endpoints 0 --batch
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+from sqlmodel import Session, create_engine, select, func
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+from app.core.config import settings
+from app.core.migrations import upgrade_database
+from app.models.user import User
+from app.models.webhook import Webhook
+from app.models.webhook_delivery import WebhookDelivery, DeliveryStatus
+from app.services.webhook_delivery import (
+    WebhookDispatcher,
+    enqueue_webhook_event,
+    verify_signature,
+    SIGNATURE_HEADER
+)
+
+
+def build_receiver(secrets_by_host: dict, dead_hosts: set, received: Counter) -> Starlette:
+    """ASGI app standing in for customer endpoints."""
+
+    async def hook(request: Request) -> Response:
+        host = request.url.hostname
+        if host in dead_hosts:
+            return Response(status_code=503)
+        body = await request.body()
+        if not verify_signature(secrets_by_host[host], request.headers.get(SIGNATURE_HEADER, ""), body):
+            received["bad_signature"] += 1
+            return Response(status_code=401)
+        payload = json.loads(body)
+        received["requests"] += 1
+        received["ok"] += len(payload["events"]) if payload["event"] == "batch" else 1
+        received["last_ok_at"] = time.perf_counter()
+        return Response(status_code=204)
+
+    return Starlette(routes=[Route("/hook", hook, methods=["POST"])])
+
+
+def seed(engine, endpoints: int, deliveries: int, batch: bool) -> dict:
+    """Create one user + webhook per endpoint and enqueue events round-robin."""
+    secrets_by_host = {}
+    with Session(engine) as session:
+        users = []
+        for i in range(endpoints):
+            user = User(email=f"bench{i}@example.com", name=f"Bench {i}", hashed_password="x")
+            session.add(user)
+            users.append(user)
+        session.flush()
+        for i, user in enumerate(users):
+            host = f"receiver-{i}.example.com"
+            webhook = Webhook(
+                webhook_id=f"wh_bench_{i}",
+                user_id=user.id,
+                url=f"https://{host}/hook",
+                events=["scrape.completed"],
+                secret=f"secret-{i}",
+                batch_enabled=batch,
+                batch_max_events=500,
+                batch_max_delay_seconds=0.1
+            )
+            session.add(webhook)
+            secrets_by_host[host] = webhook.secret
+        session.commit()
+
+        user_ids = [u.id for u in users]
+        for n in range(deliveries):
+            enqueue_webhook_event(session, user_ids[n % endpoints], "scrape.completed", {"request_id": f"req_{n}"})
+            if n % 1000 == 999:
+                session.commit()
+        session.commit()
+    return secrets_by_host
+
+
+async def run(args) -> int:
+    settings.webhook_max_attempts = args.max_attempts
+    settings.webhook_backoff_base_seconds = 0.01
+    settings.webhook_backoff_max_seconds = 0.05
+    settings.webhook_circuit_reset_seconds = 0.2
+    settings.webhook_batch_size = args.batch_size
+    settings.webhook_poll_interval_seconds = 0.01
+
+    db_path = os.path.join(tempfile.mkdtemp(), "webhooks.db")
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    upgrade_database(engine)
+
+    secrets_by_host = seed(engine, args.endpoints, args.deliveries, args.batch)
+    dead_hosts = {f"receiver-{i}.example.com" for i in range(args.dead_endpoints)}
+    received = Counter()
+    transport = httpx.ASGITransport(app=build_receiver(secrets_by_host, dead_hosts, received))
+
+    async with httpx.AsyncClient(transport=transport) as client:
+        dispatcher = WebhookDispatcher(bind=engine, client=client)
+        start = time.perf_counter()
+        await dispatcher.start()
+        # Keep going until every row is delivered or dead-lettered
+        while time.perf_counter() - start < args.max_seconds:
+            await asyncio.sleep(0.05)
+            with Session(engine) as session:
+                remaining = session.exec(
+                    select(func.count()).select_from(WebhookDelivery).where(
+                        WebhookDelivery.status.in_([DeliveryStatus.PENDING, DeliveryStatus.DELIVERING])
+                    )
+                ).one()
+            if not remaining:
+                break
+        await dispatcher.stop()
+        elapsed = time.perf_counter() - start
+
+    with Session(engine) as session:
+        by_status = dict(session.exec(
+            select(WebhookDelivery.status, func.count()).group_by(WebhookDelivery.status)
+        ).all())
+
+    delivered = by_status.get(DeliveryStatus.DELIVERED, 0)
+    print(f"deliveries enqueued : {args.deliveries} to {args.endpoints} endpoints ({args.dead_endpoints} dead)")
+    print(f"delivered           : {delivered}")
+    print(f"dead-lettered       : {by_status.get(DeliveryStatus.DEAD, 0)}")
+    print(f"still queued        : {by_status.get(DeliveryStatus.PENDING, 0) + by_status.get(DeliveryStatus.DELIVERING, 0)}")
+    print(f"HTTP requests       : {received['requests']}")
+    print(f"attempt failures    : {dispatcher.failed}")
+    print(f"bad signatures      : {received['bad_signature']}")
+    live_elapsed = received["last_ok_at"] - start if delivered else elapsed
+    print(f"live endpoints done : {live_elapsed:.2f}s")
+    print(f"outbox drained      : {elapsed:.2f}s")
+    print(f"throughput          : {delivered / live_elapsed:.0f} deliveries/sec")
+
+    expected = args.deliveries - args.deliveries * args.dead_endpoints // args.endpoints
+    if received["bad_signature"] or delivered < expected:
+        print("FAILED: missing deliveries or invalid signatures", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deliveries", type=int, default=5000)
+    parser.add_argument("--endpoints", type=int, default=20)
+    parser.add_argument("--dead-endpoints", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--batch", action="store_true", help="Enable batched delivery on every webhook")
+    parser.add_argument("--max-seconds", type=float, default=300, help="Give up on draining the outbox after this long")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()